@@ -23,8 +23,12 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
+import os
+import shutil
+import pytest
 from zeex.core.compat import QtGui
-from zeex.core.ctrls.sql import AlchemyConnection, AlchemyConnectionManager
+from zeex.core.ctrls.sql import AlchemyConnection, AlchemyConnectionManager, SchemaRevalidator
+from zeex.core.utility.schema_cache import reflect_schema
 from tests.main import MainTestClass
 
 
@@ -44,6 +48,139 @@ class TestAlchemyConnection(MainTestClass):
         print(a.engine.name)
         assert isinstance(a.get_standard_item(), QtGui.QStandardItem)
 
+    @pytest.fixture
+    def db_url(self, output_dir):
+        file_path = os.path.join(output_dir, "test_lazy_reflection.db")
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        yield "sqlite:///" + file_path
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+    def test_lazy_reflection(self, db_url):
+        a = AlchemyConnection('lazy', db_url)
+        for i in range(3):
+            a.engine.execute("CREATE TABLE t{} (id INTEGER PRIMARY KEY, name TEXT)".format(i))
+        a.refresh_schemas()
+        assert a.get_table_names() == ['t0', 't1', 't2']
+        assert not a.meta.tables
+
+        assert a.get_column_names('t1') == ['id', 'name']
+        assert 't1' in a._columns and not a.meta.tables
+        assert a.get_table('t1').name == 't1'
+        assert list(a.meta.tables.keys()) == ['t1']
+
+        # Only the requested tables get column items.
+        item = a.get_standard_item(populate=['t1'])
+        assert [item.child(r).child(0).text() for r in range(item.rowCount())] == ['', 'id', '']
+
+        cls = a.get_mapped_class('t2')
+        assert a.get_mapped_class('t2') is cls
+        session = a.Session()
+        session.add(cls(name='zeke'))
+        session.commit()
+        assert session.query(cls).count() == 1
+        session.close()
+
+        a.engine.execute("CREATE TABLE t3 (id INTEGER PRIMARY KEY)")
+        assert 't3' not in a.get_table_names()
+        a.refresh_schemas(table_name='t3')
+        assert 't3' in a.get_table_names()
+        with pytest.raises(KeyError):
+            a.get_table('missing')
+
+    def test_paged_table_model(self, db_url):
+        a = AlchemyConnection('paged', db_url)
+        a.engine.execute("CREATE TABLE keyed (id INTEGER PRIMARY KEY, name TEXT)")
+        a.engine.execute("CREATE TABLE unkeyed (name TEXT)")
+        for table in ['keyed', 'unkeyed']:
+            a.engine.execute("INSERT INTO {} (name) VALUES {}".format(
+                table, ",".join("('n{}')".format(i) for i in range(1050))))
+        a.refresh_schemas()
+
+        for table, paged_by_key in [('keyed', True), ('unkeyed', False)]:
+            window = a.get_alchemy_query_editor_window(table)
+            model = window.query_model
+            model.cache_blocks = 2
+            model.block_rows = 100
+            model.refresh()
+            assert model.paged_by_key is paged_by_key
+            assert model.rowCount() == 100
+            while model.canFetchMore():
+                model.fetchMore()
+            assert model.rowCount() == 1050
+            assert len(model._blocks) == 2
+            names = ['n{}'.format(i) for i in range(1050)]
+            if not paged_by_key:
+                # Without a primary key every column orders the rows.
+                names.sort()
+            assert [getattr(model.row(r), 'name') for r in [0, 555, 1049]] == [names[r] for r in [0, 555, 1049]]
+            assert model.total_count() == 1050
+
+    def test_sort_and_criteria(self, db_url):
+        from zeex.core.compat import QtCore
+        a = AlchemyConnection('sorted', db_url)
+        a.engine.execute("CREATE TABLE people (id INTEGER PRIMARY KEY, name TEXT, age INTEGER)")
+        a.engine.execute("INSERT INTO people (name, age) VALUES {}".format(
+            ",".join("('n{}', {})".format(i, i % 50) for i in range(1000))))
+        a.refresh_schemas()
+        session = a.Session()
+        cls = a.get_mapped_class('people')
+
+        for query in [session.query(cls), session.query(a.get_table('people'))]:
+            model = a.get_alchemy_model(session, query, a.get_column_names('people'),
+                                        key_column=cls.__table__.c.id, block_rows=100)
+            # The header's cleared sort indicator doesn't re-query.
+            query_before = model._query
+            model.sort(-1, QtCore.Qt.AscendingOrder)
+            assert model._query is query_before and model.paged_by_key
+
+            model.sort(2, QtCore.Qt.DescendingOrder)
+            assert not model.paged_by_key
+            assert model.rowCount() == 100
+            assert getattr(model.row(0), 'age') == 49
+            assert [getattr(model.row(r), 'id') for r in range(2)] == [50, 100]
+
+            model.set_criteria([{'group': '', 'field': 'age', 'condition': '<', 'value': '2', 'andor': ''},
+                                {'group': '', 'field': 'name', 'condition': 'LIKE', 'value': 'n99%', 'andor': 'OR'}])
+            while model.canFetchMore():
+                model.fetchMore()
+            assert model.rowCount() == model.total_count() == 40 + 11
+            assert getattr(model.row(0), 'name') == 'n99'
+
+            # Unknown conditions raise before the filter changes.
+            current = model.filter
+            with pytest.raises(KeyError):
+                model.set_criteria([{'group': '', 'field': 'name', 'condition': 'contains',
+                                     'value': 'n9', 'andor': ''}])
+            assert model.filter is current
+
+            model.sort(-1)
+            model.set_criteria([])
+            assert model.paged_by_key and model.filter is None
+            assert getattr(model.row(0), 'id') == 1
+
+            # Without a key column the primary key breaks ties in the sorted column.
+            model = a.get_alchemy_model(session, query, a.get_column_names('people'), block_rows=100)
+            model.sort(2, QtCore.Qt.AscendingOrder)
+            assert [str(c) for c in model.tie_breakers()] == ['people.id']
+            while model.canFetchMore():
+                model.fetchMore()
+            ids = [getattr(model.row(r), 'id') for r in range(model.rowCount())]
+            assert len(set(ids)) == len(ids) == 1000
+            assert ids[:2] == [1, 51]
+        session.close()
+
+    def test_tie_breakers_without_primary_key(self, db_url):
+        a = AlchemyConnection('no_pk', db_url)
+        a.engine.execute("CREATE TABLE events (name TEXT, age INTEGER)")
+        a.refresh_schemas()
+        session = a.Session()
+        table = a.get_table('events')
+        model = a.get_alchemy_model(session, session.query(table), a.get_column_names('events'))
+        assert [str(c) for c in model.tie_breakers()] == ['events.name', 'events.age']
+        session.close()
+
 
 class TestAlchemyConnectionManager(MainTestClass):
     def test_general_configuration(self):
@@ -58,3 +195,62 @@ class TestAlchemyConnectionManager(MainTestClass):
         con = a.remove_connection(name)
         assert isinstance(con, AlchemyConnection)
         assert not a._connections
+
+    def test_schema_cache(self, output_dir):
+        db_path = os.path.join(output_dir, "test_schema_cache.db")
+        cache_dir = os.path.join(output_dir, "test_schema_cache")
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        url = "sqlite:///" + db_path
+        a = AlchemyConnectionManager(cache_dir=cache_dir)
+        con = a.add_connection(url, name='cached')
+        a.schema_cache.remove(con.engine.url)
+        con.engine.execute("CREATE TABLE parent (id INTEGER PRIMARY KEY, name VARCHAR(20))")
+        con.engine.execute("CREATE TABLE child (id INTEGER PRIMARY KEY, "
+                           "parent_id INTEGER REFERENCES parent(id))")
+        schema = reflect_schema(con.engine)
+        assert schema['tables']['child']['foreign_keys'][0]['referred_table'] == 'parent'
+        assert schema['tables']['parent']['primary_key'] == ['id']
+        a.set_schema('cached', schema)
+
+        # A new manager lists the tables from the cache without reflecting.
+        b = AlchemyConnectionManager(cache_dir=cache_dir)
+        con2 = b.add_connection(url, name='cached')
+        assert con2.schema == schema
+        assert sorted(con2.get_table_names()) == ['child', 'parent']
+        assert 'name' in con2.get_column_names('parent')
+        # Cached columns keep their order and types are rebuilt like the inspector's.
+        assert con2.get_column_names('parent') == ['id', 'name']
+        for cached, reflected in zip(con2.get_columns('parent'), con.inspector.get_columns('parent')):
+            assert type(cached['type']) is type(reflected['type'])
+            assert str(cached['type']) == str(reflected['type'])
+
+        # Revalidating picks up tables created since the cache was saved.
+        con.engine.execute("CREATE TABLE other (id INTEGER PRIMARY KEY)")
+        changed = []
+        revalidator = SchemaRevalidator(b)
+        revalidator.signalSchemaChanged.connect(changed.append)
+        revalidator.revalidate()
+        revalidator.wait()
+        assert changed == ['cached']
+        assert 'other' in con2.get_table_names()
+        assert 'other' in AlchemyConnectionManager(cache_dir=cache_dir).add_connection(
+            url, name='cached').get_table_names()
+        os.remove(db_path)
+        shutil.rmtree(cache_dir)
+
+    def test_schema_cache_memory(self, output_dir):
+        cache_dir = os.path.join(output_dir, "test_schema_cache_memory")
+        a = AlchemyConnectionManager(cache_dir=cache_dir)
+        con = a.add_connection("sqlite://", name='memory')
+        con.engine.execute("CREATE TABLE parent (id INTEGER PRIMARY KEY)")
+        a.set_schema('memory', reflect_schema(con.engine))
+        assert not os.path.exists(cache_dir)
+
+        # Worker threads would reflect an empty database - the schema is left alone.
+        finished = []
+        revalidator = SchemaRevalidator(a)
+        revalidator.signalFinished.connect(lambda: finished.append(True))
+        revalidator.revalidate()
+        assert finished and not revalidator.pending
+        assert con.get_table_names() == ['parent']
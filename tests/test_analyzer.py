@@ -22,7 +22,10 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
+import numpy as np
+import pandas as pd
 from zeex.core.utility.pandatools import superReadFile
+from zeex.core.utility.stats import FrameStatistics, series_hashes, sketch_distinct_count
 from tests.main import MainTestClass
 
 
@@ -35,3 +38,69 @@ class TestAnalyzer(MainTestClass):
         df.reset_index(drop=False, inplace=True)
         df = df.pivot(columns="CATEGORY")
 
+    def test_frame_statistics(self, example_file_path):
+        df = superReadFile(example_file_path)
+        df.loc[:, 'number'] = np.arange(df.index.size, dtype='float64')
+        stats = FrameStatistics()
+        pd.testing.assert_frame_equal(stats.describe(df), df.describe(include='all'))
+
+        cached = {c: stats.column(df, c) for c in df.columns}
+        df.loc[df.index[0], 'number'] = -1.0
+        after = stats.describe(df)
+        assert all(stats.column(df, c) is cached[c] for c in df.columns if c != 'number')
+        assert stats.column(df, 'number') is not cached['number']
+        assert after.loc['min', 'number'] == -1.0
+
+    def test_frame_statistics_invalidate(self, monkeypatch):
+        import zeex.core.utility.stats as stats_module
+        df = pd.DataFrame({'a': np.arange(10, dtype='float64'), 'b': list('abcdefghij')})
+        stats = FrameStatistics()
+        cached_a = stats.column(df, 'a')
+
+        # Only invalidated columns are described (and nothing is hashed).
+        hashed = []
+        monkeypatch.setattr(stats_module, 'series_hashes', lambda s: hashed.append(s.name))
+        df.loc[0, 'b'] = 'z'
+        stats.invalidate(['b'])
+        result = stats.describe(df, verify=False)
+        assert hashed == []
+        assert stats.column(df, 'a', verify=False) is cached_a
+        assert result.loc['unique', 'b'] == 10 and result.loc['top', 'b'] != 'a'
+
+    def test_description_model_sync(self, monkeypatch):
+        import zeex.core.utility.stats as stats_module
+        from zeex.core.models.dataframe import DataFrameDescriptionModel, DataFrameModel
+        df = pd.DataFrame({'a': np.arange(10, dtype='float64'), 'b': list('abcdefghij')})
+        source = DataFrameModel(dataFrame=df)
+        model = DataFrameDescriptionModel(source_model=source)
+        cached_a = model.stats.column(df, 'a', verify=False)
+
+        # A sync without a range only describes columns whose dtype or length changed.
+        hashed = []
+        monkeypatch.setattr(stats_module, 'series_hashes', lambda s: hashed.append(s.name))
+        df['b'] = np.arange(10, dtype='float64')
+        source.dataChanged.emit()
+        assert hashed == []
+        assert model.stats.column(df, 'a', verify=False) is cached_a
+        assert model.stats.column(df, 'b', verify=False).loc['mean'] == 4.5
+
+        # A replaced frame is described from scratch.
+        source.setDataFrame(df * 2)
+        assert model.stats.column(source.dataFrame(), 'a', verify=False).loc['max'] == 18.0
+
+    def test_frame_statistics_approximate(self):
+        df = pd.DataFrame({'n': np.arange(20000, dtype='float64'),
+                           's': (np.arange(20000) % 50).astype(str)})
+        exact = df.describe(include='all')
+        approx = FrameStatistics(exact_rows=1000, sample_rows=5000).describe(df)
+        assert approx.index.tolist() == exact.index.tolist()
+        assert approx.loc['count', 'n'] == exact.loc['count', 'n']
+        assert approx.loc['max', 'n'] == exact.loc['max', 'n']
+        assert abs(approx.loc['50%', 'n'] - exact.loc['50%', 'n']) < 1000
+        assert approx.loc['unique', 's'] == 50
+        assert approx.loc['freq', 's'] == 400
+
+    def test_sketch_distinct_count(self):
+        hashes = series_hashes(pd.Series(np.arange(100000)))
+        assert sketch_distinct_count(hashes[:100]) == 100
+        assert abs(sketch_distinct_count(hashes) - 100000) < 5000
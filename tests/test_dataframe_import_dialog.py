@@ -25,6 +25,7 @@ SOFTWARE.
 """
 import os
 import pytest
+import pandas as pd
 from tests.main import MainTestClass
 from zeex.core.views.actions.import_file import DataFrameModelImportDialog, pandatools
 from zeex.core.ctrls.dataframe import DataFrameModel, DataFrameModelManager, SEPARATORS, ENCODINGS
@@ -49,6 +50,24 @@ class TestDataFrameModelImportDialog(MainTestClass):
     def test_parse_dates(self, dialog:DataFrameModelImportDialog):
         dialog.checkBoxParseDates.setChecked(True)
 
+    def test_parse_dates_keeps_lossy_columns(self, dialog: DataFrameModelImportDialog):
+        df = pd.DataFrame({'iso': ['2016-10-01', '2016-10-02', '2016-10-03', '2016-10-04'],
+                           'lossy': ['2016-10-01', '2016-10-02', '2016-10-03', 'bad']})
+        df = dialog.process_dataframe(df, parse_dates=True)
+        report = dialog.date_report.set_index('column')
+        assert str(df['iso'].dtype) == 'datetime64[ns]'
+        assert df['lossy'].tolist()[-1] == 'bad'
+        assert report.loc['lossy', 'lost'] == 1
+        assert not report.loc['lossy', 'converted']
+
+    def test_compact_load(self, dialog: DataFrameModelImportDialog, example_file_path):
+        dialog.checkBoxCompactLoad.setChecked(True)
+        dialog.execute()
+        df = dialog.df_manager.get_frame(example_file_path)
+        assert not dialog.compact_report.empty
+        assert (dialog.compact_report['saved_bytes'] > 0).all()
+        assert str(df[dialog.compact_report['column'].iloc[0]].dtype) == dialog.compact_report['compact_dtype'].iloc[0]
+
     @pytest.mark.parametrize('sep', list(SEPARATORS.keys()))
     def test_separators(self, dialog: DataFrameModelImportDialog, example_file_path, sep):
         out_path = os.path.splitext(example_file_path)[0] + "_sep_test.csv"
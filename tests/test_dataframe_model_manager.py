@@ -22,8 +22,10 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 import os
+import shutil
+import pandas as pd
 import pytest
-from zeex.core.ctrls.dataframe import DataFrameModelManager
+from zeex.core.ctrls.dataframe import DataFrameModelManager, DataFrameModelLoader
 from tests.main import MainTestClass
 
 
@@ -67,13 +69,128 @@ class TestClass(MainTestClass):
         assert os.path.exists(check_path)
         os.remove(check_path)
 
+    def test_loader(self, sample_file, manager):
+        loader = DataFrameModelLoader(manager, chunksize=1)
+        loaded = []
+        loader.signalFileLoaded.connect(loaded.append)
+        loader.load([sample_file])
+        loader.wait()
 
-
-
-
-
-
-
-
-
-
+        assert loaded == [sample_file]
+        assert not loader.pending
+        assert sample_file in manager.file_paths
+        assert loader.progress(sample_file) == manager.get_frame(sample_file).index.size
+
+    def test_loader_index(self, sample_file, df, output_dir):
+        cache_dir = os.path.join(output_dir, "test_dfm_loader_index")
+        try:
+            manager = DataFrameModelManager(cache_dir=cache_dir)
+            loader = DataFrameModelLoader(manager)
+            indexed = []
+            loader.signalIndexLoaded.connect(indexed.append)
+            loader.load_index(sample_file)
+            assert loader.pending_indexes == [sample_file]
+            loader.wait()
+
+            assert indexed == [sample_file]
+            assert not loader.pending_indexes
+            assert manager.row_count(sample_file) == df.index.size
+
+            # A current index is reported right away.
+            loader.load_index(sample_file)
+            assert indexed == [sample_file, sample_file]
+            assert not loader.pending_indexes
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    def test_parse_cache(self, sample_file, output_dir):
+        cache_dir = os.path.join(output_dir, "test_dfm_parse_cache")
+        try:
+            manager = DataFrameModelManager(cache_dir=cache_dir)
+            df = manager.read_file(sample_file).dataFrame()
+            cache = manager.parse_cache
+            assert cache.lookup(sample_file) is not None
+            assert cache.lookup(sample_file, dtype=str) is None
+
+            # A new manager reads the cached frame.
+            check_df = DataFrameModelManager(cache_dir=cache_dir).read_frame(sample_file)
+            assert check_df.equals(df)
+
+            # Changing the file invalidates and replaces the entry.
+            stat = os.stat(sample_file)
+            os.utime(sample_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+            assert cache.lookup(sample_file) is None
+            cache.read(sample_file)
+            assert len(cache.entries(sample_file)) == 1
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    def test_parse_cache_fallback(self, sample_file, output_dir, monkeypatch):
+        import zeex.core.utility.parse_cache as parse_cache
+        cache_dir = os.path.join(output_dir, "test_dfm_parse_cache_fallback")
+        other_path = os.path.join(cache_dir, "other.rowindex.npz")
+        try:
+            cache = parse_cache.ParseCache(cache_dir)
+            df = cache.read(sample_file)
+
+            # A frame feather can't write is pickled instead.
+            monkeypatch.setattr(parse_cache, 'FEATHER_AVAILABLE', True)
+            monkeypatch.setattr(pd.DataFrame, 'to_feather', lambda *args, **kwargs: 1 / 0)
+            cache_path = cache.put(sample_file, df, dtype=str)
+            assert cache_path.endswith('.pkl')
+            assert cache.get(sample_file, dtype=str).equals(df)
+
+            # Clearing leaves files the cache doesn't own.
+            open(other_path, 'w').close()
+            cache.clear()
+            assert not cache.entries()
+            assert os.listdir(cache_dir) == [os.path.basename(other_path)]
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    def test_memory_budget(self, df, output_dir):
+        paths = [os.path.join(output_dir, "test_dfm_budget_{}.csv".format(i)) for i in range(3)]
+        for p in paths:
+            df.to_csv(p, index=False)
+        try:
+            manager = DataFrameModelManager()
+            for p in paths:
+                manager.read_file(p)
+            size_mb = manager.model_memory(paths[0]) / 1024 ** 2
+            manager.update_file(paths[1], df.copy())
+
+            # The edited model is kept, the least recently used is evicted.
+            assert manager.set_memory_budget(size_mb * 2.5) == [paths[0]]
+            assert manager.evicted_paths == [paths[0]]
+            assert paths[0] not in manager.file_paths
+
+            report = manager.memory_report()
+            assert report['file_path'].tolist() == [paths[0], paths[2], paths[1]]
+            assert report['evicted'].tolist() == [True, False, False]
+            assert report['evictable'].tolist() == [False, True, False]
+
+            # Evicted models are read again on request.
+            assert manager.get_frame(paths[0]).index.size == df.index.size
+            assert manager.evicted_paths == [paths[2]]
+
+            # Settings values are converted - invalid ones disable the budget.
+            assert manager.set_memory_budget(str(size_mb * 10)) == []
+            assert manager.memory_budget_mb == size_mb * 10
+            assert manager.set_memory_budget('lots') == []
+            assert manager.memory_budget_mb == 0
+        finally:
+            [os.remove(p) for p in paths]
+
+    def test_row_index(self, sample_file, df, output_dir):
+        cache_dir = os.path.join(output_dir, "test_dfm_row_index")
+        try:
+            manager = DataFrameModelManager(cache_dir=cache_dir)
+            assert manager.row_count(sample_file) is None
+            index = manager.get_row_index(sample_file)
+            assert manager.get_row_index(sample_file) is index
+            assert manager.row_count(sample_file) == df.index.size
+
+            # Another manager re-uses the saved index.
+            assert DataFrameModelManager(cache_dir=cache_dir).row_count(sample_file) == df.index.size
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+MIT License
+
+Copyright (c) 2016 Zeke Barge
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import pytest
+from sqlalchemy import create_engine
+from zeex.core.models.fieldnames import FieldNames
+from tests.main import MainTestClass
+
+RENAMES = {'first name-dv': 'first_name', 'Last_Name': 'last'}
+
+
+class TestFieldNames(MainTestClass):
+
+    @pytest.fixture
+    def db(self):
+        # A throwaway database - the tracked data/fieldnames.db is never touched.
+        engine = create_engine('sqlite://')
+        db = FieldNames(engine=engine)
+        yield db
+        db.session.close()
+        FieldNames.invalidate_cache(engine)
+        engine.dispose()
+
+    def test_get_renames(self, db):
+        db.add_entries(RENAMES)
+        renames = db.get_renames(['FIRST NAME-DV', 'last_name', 'lastXname'], fill_missing=True)
+        assert renames == {'FIRST NAME-DV': 'first_name', 'last_name': 'last', 'lastXname': 'lastXname'}
+        assert db.get_renames(['lastXname'])['lastXname'] is None
+
+    def test_add_entries_upsert(self, db):
+        db.add_entries(RENAMES)
+        assert db.engine not in FieldNames._caches
+        db.get_renames(['Last_Name'])
+        entries = db.add_entries({'Last_Name': 'last_name'}, source='test')
+        assert db.engine not in FieldNames._caches
+        assert len(entries) == 1 and entries[0].source == 'test'
+        assert db.get_renames(['Last_Name']) == {'Last_Name': 'last_name'}
+        assert db.session.query(db.Field).filter(db.Field.orig_name == 'Last_Name').count() == 1
+
+    def test_add_entries_ignore_case(self, db):
+        db.add_entries(RENAMES)
+        # A different case updates the existing row rather than adding one.
+        entries = db.add_entries({'last_name': 'surname', 'NEW': 'new', 'new': 'newer'})
+        assert entries[0].orig_name == 'Last_Name'
+        assert entries[1] is entries[2] and entries[1].new_name == 'newer'
+        assert db.session.query(db.Field).count() == 3
+        assert db.get_renames(['LAST_NAME', 'Last_Name', 'new']) == \
+               {'LAST_NAME': 'surname', 'Last_Name': 'surname', 'new': 'newer'}
+
+        # Rows that only differ by case (added before upserts ignored case):
+        # the most recently updated one wins the case-insensitive lookup.
+        db.session.add(db.Field(orig_name='last_NAME', new_name='older'))
+        db.session.commit()
+        db.add_entries({'Last_Name': 'latest'})
+        assert db.get_renames(['LAST_NAME'])['LAST_NAME'] == 'latest'
@@ -57,6 +57,19 @@ class TestMergePurgeDialog(MainTestClass):
                 os.remove(p)
         return dialog
 
+    def test_open_file_failed(self, dialog: MergePurgeDialog, output_dir):
+        bad_path = os.path.join(output_dir, "test_mp_dialog_bad.xlsx")
+        with open(bad_path, 'w') as fh:
+            fh.write("not a workbook")
+        try:
+            dialog.open_file(file_names=[bad_path], model_signal=dialog.signalMergeFileOpened, wait=True)
+            assert bad_path not in dialog.df_manager.file_paths
+            assert not dialog._loader_signals
+            assert not dialog.loader.pending
+            assert bad_path in dialog._load_error_box.text()
+        finally:
+            os.remove(bad_path)
+
     def test_general_config(self, dialog: MergePurgeDialog, example_file_path):
         """
         Checks general configuration of the MergePurgeDialog
@@ -158,6 +171,7 @@ class TestMergePurgeDialog(MainTestClass):
 
         #Execute the simulation.
         dialog.btnExecute.click()
+        dialog.job.wait()
 
         assert os.path.exists(check_path)
         check_model = dialog.df_manager.read_file(check_path)
@@ -213,6 +227,7 @@ class TestMergePurgeDialog(MainTestClass):
         compare_path = dialog.destPathLineEdit.text()
         assert not os.path.exists(compare_path)
         dialog.btnExecute.click()
+        dialog.job.wait()
         assert os.path.exists(compare_path)
 
         dialog.df_manager.read_file(compare_path)
@@ -249,7 +264,7 @@ class TestMergePurgeDialog(MainTestClass):
 
         # Register the source file with the first split
         dialog.df_manager.update_file(example_file_path, df1, notes="Took first half")
-        dialog.open_file(file_names=[merge_path], model_signal=dialog.signalMergeFileOpened)
+        dialog.open_file(file_names=[merge_path], model_signal=dialog.signalMergeFileOpened, wait=True)
         assert merge_path in dialog.df_manager.file_paths
 
         # Make sure merge path made it into the MergeView's model
@@ -258,6 +273,7 @@ class TestMergePurgeDialog(MainTestClass):
         assert items
 
         dialog.btnExecute.click()
+        dialog.job.wait()
 
         try:
             assert os.path.exists(check_path)
@@ -307,7 +323,7 @@ class TestMergePurgeDialog(MainTestClass):
         # Export the updated segment to our merge_path
         update_df.to_csv(merge_path)
 
-        dialog.open_file(file_names=[merge_path], model_signal=dialog.signalMergeFileOpened)
+        dialog.open_file(file_names=[merge_path], model_signal=dialog.signalMergeFileOpened, wait=True)
         assert merge_path in dialog.df_manager.file_paths
 
         # Make sure merge path made it into the MergeView's model
@@ -333,6 +349,7 @@ class TestMergePurgeDialog(MainTestClass):
         # Set the overwrite flag & run
         dialog.gatherFieldsOverWriteCheckBox.setChecked(overwrite)
         dialog.btnExecute.click()
+        dialog.job.wait()
 
         try:
             assert os.path.exists(check_path)
@@ -386,7 +403,7 @@ class TestMergePurgeDialog(MainTestClass):
         df_kill.to_csv(kill_path)
 
         # Open the kill_path with the dialog's open file function.
-        dialog.open_file(file_names=[kill_path], model_signal=dialog.signalSFileOpened)
+        dialog.open_file(file_names=[kill_path], model_signal=dialog.signalSFileOpened, wait=True)
         assert kill_path in dialog.df_manager.file_paths
         assert df_kill.index.size > 0
 
@@ -403,6 +420,7 @@ class TestMergePurgeDialog(MainTestClass):
         dialog.dedupeOnRightButton.click()
 
         dialog.btnExecute.click()
+        dialog.job.wait()
 
         try:
             assert os.path.exists(check_path)
@@ -0,0 +1,132 @@
+"""
+MIT License
+
+Copyright (c) 2016 Zeke Barge
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from zeex.core.utility.merge_purge import MergePurgeEngine, MergePurgeCancelled, KeySet
+from tests.main import MainTestClass
+
+
+class TestMergePurgeEngine(MainTestClass):
+
+    @pytest.fixture
+    def paths(self, output_dir):
+        names = ['source', 'merge', 'purge', 'dest']
+        paths = {n: os.path.join(output_dir, "test_mp_engine_{}.csv".format(n)) for n in names}
+        yield paths
+        for p in list(paths.values()) + [os.path.splitext(paths['dest'])[0] + "_report.txt"]:
+            if os.path.exists(p):
+                os.remove(p)
+
+    def test_key_set(self):
+        keys = KeySet(max_levels=2)
+        for i in range(5):
+            keys.add(np.arange(i * 10, i * 10 + 10, dtype=np.uint64))
+        assert len(keys) == 50
+        assert keys.contains(np.array([0, 49, 50], dtype=np.uint64)).tolist() == [True, True, False]
+        assert keys.first_seen(np.array([49, 50, 50, 51], dtype=np.uint64)).tolist() == [False, True, False, True]
+
+    @pytest.mark.parametrize('chunksize', [1, 3, 1000])
+    def test_merge_purge_dedupe(self, paths, chunksize):
+        source = pd.DataFrame({'id': [1, 2, 3, 4, 4], 'zip': ['01', '02', '03', '04', '04']})
+        merge = pd.DataFrame({'id': [5, 6, 1], 'zip': ['05', '06', '01'], 'extra': ['a', 'b', 'c']})
+        purge = pd.DataFrame({'postal': ['02', '06', '99']})
+        source.to_csv(paths['source'], index=False)
+        merge.to_csv(paths['merge'], index=False)
+        purge.to_csv(paths['purge'], index=False)
+
+        engine = MergePurgeEngine(paths['source'], paths['dest'], merge_files=[paths['merge']],
+                                  purge_files=[paths['purge']],
+                                  field_map_data={paths['purge']: {'postal': 'zip'}},
+                                  dedupe_on=['id'], chunksize=chunksize)
+        report_path = engine.execute()
+        check_df = pd.read_csv(paths['dest'], dtype=str)
+
+        assert os.path.exists(report_path)
+        assert check_df.columns.tolist() == ['id', 'zip', 'extra']
+        assert check_df['zip'].tolist() == ['01', '03', '04', '05']
+        assert engine.suppressed_results[paths['purge']] == 2
+        assert engine.merged_results[paths['merge']] == 3
+        assert engine.dedupe_lost == 2
+        assert engine.source_size == 5
+        assert engine.final_size == 4
+
+    def test_sort_and_gather(self, paths):
+        source = pd.DataFrame({'id': [1, 2, 3], 'value': ['x', None, 'z'], 'rank': [10, 9, 100]})
+        merge = pd.DataFrame({'id': [2, 3, 4], 'value': ['B', 'C', 'D'], 'rank': [1, 1, 1]})
+
+        engine = MergePurgeEngine(source, paths['dest'], merge_files={paths['merge']: merge},
+                                  primary_key='id', gather_fields=['value'],
+                                  sort_on=['rank'], sort_ascending=['False'], chunksize=2)
+        engine.execute()
+        check_df = pd.read_csv(paths['dest'], dtype=str)
+
+        assert check_df['id'].tolist() == ['3', '1', '2', '4']
+        assert check_df['value'].tolist() == ['z', 'x', 'B', 'D']
+        assert engine.merged_results[paths['merge']] == 1
+        # Only the key & gather fields are held for the lookup.
+        assert engine._gather_frames[paths['merge']].columns.tolist() == ['id', 'value']
+
+    def test_cancel(self, paths):
+        source = pd.DataFrame({'id': range(10)})
+        stages = []
+
+        def callback(stage, rows):
+            stages.append(stage)
+            if rows >= 4:
+                engine.cancel()
+
+        engine = MergePurgeEngine(source, paths['dest'], chunksize=2, callback=callback)
+        with pytest.raises(MergePurgeCancelled):
+            engine.execute()
+        assert 'merge_purge' in stages
+        assert not os.path.exists(paths['dest'])
+
+    def test_report_stages(self, paths):
+        engine = MergePurgeEngine(pd.DataFrame({'id': [2, 1]}), paths['dest'], sort_on=['id'])
+        report_path = engine.execute()
+        assert list(engine.stages.keys()) == ['load_purge_keys', 'merge_purge', 'sort', 'export']
+        with open(report_path) as fh:
+            assert 'sort: ' in fh.read()
+
+    def test_command_line(self, paths, output_dir):
+        from zeex.merge_purge import main
+        from zeex.core.utility.collection import DictConfig
+        pd.DataFrame({'id': [1, 2, 2], 'zip': ['01', '02', '02']}).to_csv(paths['source'], index=False)
+        pd.DataFrame({'zip': ['01']}).to_csv(paths['purge'], index=False)
+        config_path = os.path.join(output_dir, "test_mp_engine_config.ini")
+        config = DictConfig(filename=config_path)
+        config.set_safe('MERGE_PURGE', 'source_path', paths['source'])
+        config.set_safe('MERGE_PURGE', 'dest_path', paths['dest'])
+        config.set_safe('MERGE_PURGE', 'primary_key', 'id')
+        config.set_safe('MERGE_PURGE', 'dedupe_on', ['id'])
+        config.set_safe('MERGE_PURGE', 'purge_files', [paths['purge']])
+        config.set_safe('MERGE_PURGE', 'field_map_data', {paths['purge']: {'zip': 'zip'}})
+        config.save()
+        try:
+            assert main([config_path, '--quiet', '--chunksize', '1']) == 0
+        finally:
+            os.remove(config_path)
+        assert pd.read_csv(paths['dest'], dtype=str)['zip'].tolist() == ['02']
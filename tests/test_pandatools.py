@@ -22,11 +22,14 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
+import codecs
+import hashlib
 import shutil
 
 import pytest
 
 from zeex.core.utility.pandatools import *
+from zeex.core.utility.normalize import NormalizePlan
 from tests.main import MainTestClass
 
 SAMPLE_DATE_PASSES = ['2016-10-01', '9/15/2016', '2016-01-01 12:33:45 AM', '09-15-2016', '10-05-88']
@@ -56,6 +59,22 @@ class TestPandaTools(MainTestClass):
                                                               ext, sep)
                 os.remove(filepath)
 
+    @pytest.mark.parametrize("encoding", ['utf-8', 'utf-8-sig', 'utf-16', 'iso-8859-1'])
+    def test_sniff_file(self, df, output_dir, encoding):
+        df.loc[:, 'name'] = 'zéke'
+        filepath = os.path.join(output_dir, "test_sniff_file.txt")
+        df.to_csv(filepath, sep='|', index=False, encoding=encoding)
+        try:
+            sniffed = sniff_file(filepath)
+            assert sniffed['sep'] == '|'
+            assert codecs.lookup(sniffed['encoding']).name == codecs.lookup(encoding).name
+
+            check_df = superReadFile(filepath)
+            assert check_df.columns.tolist() == df.columns.tolist()
+            assert (check_df['name'] == 'zéke').all()
+        finally:
+            os.remove(filepath)
+
     @pytest.mark.parametrize("value", SAMPLE_DATE_PASSES)
     def test_series_to_datetime_pass(self, df, value):
         df.loc[:, 'date_series'] = str(value)
@@ -79,6 +98,46 @@ class TestPandaTools(MainTestClass):
         assert pre_type == 'object'
         assert post_type == 'datetime64[ns]'
 
+    def test_dataframe_to_datetime_report(self):
+        df = pd.DataFrame({'us': ['9/15/2016', '10/1/2016', 'bad', None],
+                           'iso': ['2016-10-01', '2016-10-02', '2016-10-03', '2016-10-04'],
+                           'text': ['apples', 'pears', 'plums', 'figs']})
+        df, report = dataframe_to_datetime(df, report=True, workers=2)
+        report = report.set_index('column')
+        assert report.index.tolist() == ['us', 'iso']
+        assert report.loc['us', 'format'] == '%m/%d/%Y'
+        assert report.loc['us', 'lost'] == 1
+        assert report.loc['us', 'loss_rate'] == 1 / 3
+        assert report.loc['iso', 'loss_rate'] == 0
+        assert report.loc['iso', 'converted']
+        assert str(df['iso'].dtype) == 'datetime64[ns]'
+        assert str(df['text'].dtype) == 'object'
+
+        # Losing a third of the values is over the threshold - the column is left alone.
+        assert not report.loc['us', 'converted']
+        assert df['us'].tolist()[:3] == ['9/15/2016', '10/1/2016', 'bad']
+
+        df, report = dataframe_to_datetime(df, report=True, max_loss=0.5)
+        assert df['us'].tolist()[:2] == [pd.Timestamp('2016-09-15'), pd.Timestamp('2016-10-01')]
+
+    def test_dataframe_to_datetime_mixed_formats(self):
+        iso = ['2016-10-{:02d}'.format(i) for i in range(1, 29)]
+        us = ['9/{}/2016'.format(i) for i in range(1, 13)]
+        df = pd.DataFrame({'mostly_iso': iso + us,
+                           'mixed': ['2016-10-01', '9/15/2016', 'Oct 3 2016', '04-Oct-2016'] * 10})
+        df, report = dataframe_to_datetime(df, report=True)
+        report = report.set_index('column')
+
+        # A 70/30 mix is retried value by value rather than losing the 30%.
+        assert report.loc['mostly_iso', 'lost'] == 0
+        assert str(df['mostly_iso'].dtype) == 'datetime64[ns]'
+        assert df['mostly_iso'].tolist()[-1] == pd.Timestamp('2016-09-12')
+
+        # No single format fits but every value parses.
+        assert report.loc['mixed', 'lost'] == 0
+        assert df['mixed'].tolist()[:4] == [pd.Timestamp('2016-10-01'), pd.Timestamp('2016-09-15'),
+                                            pd.Timestamp('2016-10-03'), pd.Timestamp('2016-10-04')]
+
     def test_rename_dupe_cols(self, df):
         df.loc[:, 'NEW_COL'] = ''
         cols = df.columns.tolist()
@@ -107,6 +166,24 @@ class TestPandaTools(MainTestClass):
         out_df.drop_duplicates(['id'], inplace=True)
         assert out_df.index.size == orig_size, "Expected to have the same records as we started with..."
 
+    def test_set_frame_id_map(self, output_dir):
+        map_path = os.path.join(output_dir, "test_set_frame_id_map.csv")
+        day1 = pd.DataFrame({'name': ['a', 'b', 'a'], 'zip': [1, 2, 1]})
+        day2 = pd.DataFrame({'name': ['c', 'b', 'a'], 'zip': [3, 2, 1]})
+
+        id_map = {}
+        df1 = set_frame_id(day1, ['name', 'zip'], 'id', start=10, id_map=id_map)
+        assert df1['id'].tolist() == [10, 11, 10]
+        write_id_map(id_map, map_path, ['name', 'zip'], 'id')
+        try:
+            id_map = read_id_map(map_path, 'id')
+        finally:
+            os.remove(map_path)
+
+        df2 = set_frame_id(day2, ['name', 'zip'], 'id', id_map=id_map)
+        assert df2['id'].tolist() == [12, 11, 10]
+        assert len(id_map) == 3
+
     def test_get_frame_duplicates(self, df):
         df2 = df.copy()
         first_date = pd.Timestamp('2016-05-05')
@@ -125,6 +202,40 @@ class TestPandaTools(MainTestClass):
         assert (df5['updated'] == second_date).all()
         assert df4.index.size + df5.index.size == df3.index.size
 
+    @pytest.mark.parametrize("size", [1000, 20000])
+    def test_get_frame_duplicates_large(self, size):
+        rng = np.random.RandomState(0)
+        df = pd.DataFrame({'name': rng.randint(0, size // 2, size).astype(str),
+                           'address': rng.randint(0, 10, size),
+                           'updated': rng.randint(0, 1000, size)})
+
+        keep_df, dupe_df = get_frame_duplicates(df, 'id', ['name', 'address'], ['updated'])
+        assert keep_df.index.size + dupe_df.index.size == size
+        assert not keep_df.duplicated(['name', 'address']).any()
+
+        # The most recently updated record of each key is kept.
+        latest = df.groupby(['name', 'address'])['updated'].max()
+        kept = keep_df.set_index(['name', 'address'])['updated']
+        assert kept.sort_index().tolist() == latest.sort_index().tolist()
+
+        # Dupes share their kept record's id.
+        ids = keep_df.set_index(['name', 'address'])['id']
+        dupe_keys = pd.MultiIndex.from_frame(dupe_df[['name', 'address']])
+        assert (ids.loc[dupe_keys].values == dupe_df['id'].values).all()
+
+    def test_dataframe_anti_join(self):
+        df = pd.DataFrame({'first': ['a', 'b', 'c', 'd'], 'zip': [1, 2, 3, 4]})
+        purge1 = pd.DataFrame({'first': ['a', 'b'], 'zip': ['1', '99']})
+        purge2 = pd.DataFrame({'first': ['a', 'c', 'c'], 'zip': [1, 3, 3]})
+
+        keep, counts = dataframe_anti_join(df, OrderedDict([('p1', purge1), ('p2', purge2)]),
+                                           ['first', 'zip'])
+        assert df.loc[keep, 'first'].tolist() == ['b', 'd']
+        assert counts == {'p1': 1, 'p2': 1}
+
+        keep, counts = dataframe_anti_join(df, {'p2': purge2}, {'p2': ['first']})
+        assert keep.tolist() == [False, True, False, True]
+
     @pytest.mark.parametrize('chunksize', list(x for x in range(1, 30, 10)))
     def test_dataframe_chunks(self, example_file_path, chunksize):
         df = superReadFile(example_file_path)
@@ -135,6 +246,18 @@ class TestPandaTools(MainTestClass):
         assert count >= int(df.index.size / chunksize)
         assert size == df.index.size
 
+    @pytest.mark.parametrize('chunksize', [1, 7, 100])
+    def test_dataframe_collect_chunks(self, example_file_path, chunksize):
+        df = superReadFile(example_file_path)
+        calls = []
+        reader = superReadFile(example_file_path, chunksize=chunksize)
+        check_df = dataframe_collect_chunks(reader, callback=lambda c, r: calls.append((c, r)))
+
+        assert check_df.index.tolist() == df.index.tolist()
+        assert check_df.columns.tolist() == df.columns.tolist()
+        assert calls[-1][1] == df.index.size
+        assert len(calls) == int((df.index.size - 1) / chunksize) + 1
+
     @pytest.mark.parametrize('chunksize', list(x for x in range(1, 30, 10)))
     def test_dataframe_export_chunks(self, example_file_path, chunksize):
         df = superReadFile(example_file_path)
@@ -160,6 +283,27 @@ class TestPandaTools(MainTestClass):
             check = return_frame.loc[return_frame['policyid'] == id]
             assert not check.empty
 
+    @pytest.mark.parametrize('compression,processes', [(None, False), ('gzip', False), (None, True)])
+    def test_dataframe_export_chunks_manifest(self, output_dir, compression, processes):
+        df = pd.DataFrame({'id': range(25), 'name': ['name{}'.format(i) for i in range(25)]})
+        check_path = os.path.join(output_dir, "test_export_manifest.csv")
+        manifest = dataframe_export_chunks(df, check_path, max_size=10, workers=2, index=False,
+                                           compression=compression, manifest=True, processes=processes)
+        try:
+            assert [os.path.basename(m['path']) for m in manifest] == \
+                   [n + ('.gz' if compression else '') for n in
+                    ['test_export_manifest.csv', 'test_export_manifest2.csv', 'test_export_manifest3.csv']]
+            assert [m['rows'] for m in manifest] == [10, 10, 5]
+            for m in manifest:
+                with open(m['path'], 'rb') as fh:
+                    data = fh.read()
+                assert m['bytes'] == len(data)
+                assert m['checksum'] == hashlib.md5(data).hexdigest()
+            return_frame = pd.concat([pd.read_csv(m['path']) for m in manifest])
+            assert return_frame['id'].tolist() == list(range(25))
+        finally:
+            [os.remove(m['path']) for m in manifest if os.path.exists(m['path'])]
+
     def test_dataframe_split_to_file(self, example_file_path):
         df = superReadFile(example_file_path)
         dirname = os.path.dirname(example_file_path)
@@ -191,6 +335,53 @@ class TestPandaTools(MainTestClass):
             match = return_df.loc[return_df['policyid'] == idx]
             assert not match.empty
 
+    def test_dataframe_split_to_files_multi(self, output_dir):
+        df = pd.DataFrame({'state': ['CA', 'CA', 'NY', 'NY', 'CA', None],
+                           'county': ['Orange', 'Kern', 'Kings', 'Kings', 'Orange', 'Kern'],
+                           'kind': ['a', 'b', 'a', 'a', 'b', 'a'],
+                           'id': range(6)})
+        source_path = os.path.join(output_dir, "test_split.csv")
+        test_dir = os.path.join(output_dir, "split_multi_test")
+        try:
+            paths = dataframe_split_to_files(df, source_path, ['state', 'county', 'kind'],
+                                             dest_dirname=test_dir, chunksize=1, index=False)
+            names = [os.path.basename(p) for p in paths]
+            assert names[0] == 'test_split_state_ca_count_orange_kind_a.csv'
+            assert 'test_split_state_blank_count_kern_kind_a.csv' in names
+            # NY/Kings/a has 2 records exported 1 per file.
+            assert len(paths) == 6
+            return_df = pd.concat([pd.read_csv(p) for p in paths])
+            assert sorted(return_df['id'].tolist()) == list(range(6))
+
+            paths = dataframe_split_to_files(df, source_path, ['state'], dropna=True,
+                                             dest_dirname=test_dir, index=False)
+            assert [os.path.basename(p) for p in paths] == ['test_split_ca.csv', 'test_split_ny.csv']
+        finally:
+            shutil.rmtree(test_dir, ignore_errors=True)
+
+    def test_dataframe_compact(self):
+        df = pd.DataFrame({'state': ['CA', 'NY', 'CA', 'CA'],
+                           'name': ['a', 'b', 'c', 'd'],
+                           'count': [1, 2, 300, 4],
+                           'delta': [-1, 0, 1, 2],
+                           'score': [0.5, 1.25, np.nan, 2.0],
+                           'ratio': [0.1, 0.2, 0.3, 0.4],
+                           'active': [True, False, True, None]})
+        compact_df, report = dataframe_compact(df)
+        dtypes = compact_df.dtypes.astype(str).to_dict()
+
+        assert dtypes['state'] == 'category'
+        assert dtypes['name'] == 'object'
+        assert dtypes['count'] == 'uint16'
+        assert dtypes['delta'] == 'int8'
+        assert dtypes['score'] == 'float32'
+        assert dtypes['ratio'] == 'float64'
+        assert dtypes['active'] == 'boolean'
+        assert report['column'].tolist() == ['state', 'count', 'delta', 'score', 'active']
+        assert (report['saved_bytes'] == report['bytes'] - report['compact_bytes']).all()
+        assert str(df['state'].dtype) == 'object'
+        assert compact_df['state'].tolist() == df['state'].tolist()
+
     def test_series_split(self):
         rows = [['zeke', 'Oceanside, CA 92058'], ['john', 'San Clemente, CA 92673']]
         df = pd.DataFrame(rows, columns=['name', 'csz'], index=range(len(rows)))
@@ -213,6 +404,57 @@ class TestPandaTools(MainTestClass):
             for i in b.unique():
                 assert i == h(i)
 
+    def test_vectorized_string_kernels(self):
+        series = pd.Series(['  zeke ', 'NaN', None, 'jo\nhn\t', 'a-b_c d!', '12.5', 'x7'])
+
+        strip = series_strip(series)
+        assert strip.tolist() == [string_strip(x) for x in series]
+
+        breaks = series_remove_linebreaks(series)
+        assert breaks.tolist() == [remove_line_breaks(x) for x in series]
+
+        blanked = series_blank_na(series, value='')
+        assert blanked.tolist() == [string_blank_na(x) for x in series]
+
+        special = series_remove_special_chars(series)
+        assert special.tolist()[4] == 'abc d'
+        assert special.tolist() == [string_remove_special_chars(x) for x in series]
+        assert series_remove_special_chars(series, excludes=['-']).tolist() == \
+               [string_remove_special_chars(x, excludes=['-']) for x in series]
+
+        assert series_to_numeric(series, astype=int).tolist() == [0, 0, 0, 0, 0, 0, 7]
+        assert series_to_numeric(series, astype=float).tolist()[5] == 12.5
+
+    def test_normalize_plan(self):
+        df = pd.DataFrame({'a': [' Jo\nhn! ', 'nan', None, ' Jo\nhn! '],
+                           'b': ['x y', 'x y', 'z', None]})
+        settings = dict(columns=['a', 'b'], scrub_linebreaks_active=True, trim_spaces_active=True,
+                        remove_special_chars_active=True, remove_special_chars_keeps=' ',
+                        replace_spaces_active=True, replace_spaces='_',
+                        case_active=True, case='upper')
+        plan = NormalizePlan.from_settings(settings, max_workers=2)
+        assert len(plan.steps) == 5
+
+        df = plan.apply(df)
+        assert df['a'].tolist() == ['JO_HN', '', '', 'JO_HN']
+        assert df['b'].tolist() == ['X_Y', 'X_Y', 'Z', '']
+
+    def test_normalize_plan_nulls(self):
+        df = pd.DataFrame({'a': ['x y', np.nan, 'nan', None]})
+
+        # Without a blanking step nulls stay null rather than becoming 'NAN'.
+        plan = NormalizePlan.from_settings(dict(columns=['a'], replace_spaces_active=True,
+                                                replace_spaces='_', case_active=True, case='upper'))
+        assert plan.null_value is np.nan
+        result = plan.apply(df.copy())['a'].tolist()
+        assert result[:1] + result[2:3] == ['X_Y', 'NAN']
+        assert pd.isnull(result[1]) and pd.isnull(result[3])
+
+        # Blanking steps turn them (and 'nan' strings) into ''.
+        plan = NormalizePlan.from_settings(dict(columns=['a'], trim_spaces_active=True,
+                                                case_active=True, case='upper'))
+        assert plan.apply(df.copy())['a'].tolist() == ['X Y', '', '', '']
+
     def test_dataframe_merge_to_series(self):
         rows = [['zeke', 'barge'], ['james', 'smith']]
         columns = ['first', 'last']
@@ -279,5 +521,31 @@ class TestPandaTools(MainTestClass):
 
         assert updated_df.index.size == sample_df.index.size + 1, "Should have had 1 additional record appended."
 
+    def test_gather_frame_fields_subset(self):
+        df = pd.DataFrame({'id': [1, 2, 3], 'name': ['a', None, 'c'], 'city': ['x', 'y', 'z']})
+        other = pd.DataFrame({'id': [3, 2, 2, 4], 'name': ['C', 'B', 'B2', 'D'], 'city': ['Z', 'Y', 'Y2', 'W']})
+        other_orig = other.copy()
+
+        # Only fill nulls in the requested field, first duplicate key wins.
+        updated = gather_frame_fields(df, other, index_label='id', fields=['name'],
+                                      overwrite=False, copy_frames=True)
+        assert updated['name'].tolist() == ['a', 'B', 'c', 'D']
+        assert updated['city'].tolist() == ['x', 'y', 'z', 'W']
+        assert updated.index.tolist() == [1, 2, 3, 4]
+        assert df['name'].tolist() == ['a', None, 'c']
+        assert other.equals(other_orig)
+
+        # Overwrites in place without appending.
+        updated = gather_frame_fields(df, other.set_index('id', drop=False), index_label='id',
+                                      fields=['name'], append_missing=False)
+        assert updated is df
+        assert df['name'].tolist() == ['a', 'B', 'C']
+
+        # An empty field list gathers every shared field.
+        updated = gather_frame_fields(df, other, index_label='id', fields=[],
+                                      append_missing=False, copy_frames=True)
+        assert updated['city'].tolist() == ['x', 'Y', 'Z']
+
+
 if __name__ == '__main__':
     pytest.main()
@@ -0,0 +1,121 @@
+"""
+MIT License
+
+Copyright (c) 2016 Zeke Barge
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import os
+import shutil
+import pandas as pd
+import pytest
+from zeex.core.utility.rowindex import RowIndex, sidecar_path, ROW_INDEX_DIRECTORY
+from tests.main import MainTestClass
+
+
+class TestRowIndex(MainTestClass):
+
+    @pytest.fixture
+    def text_file(self, output_dir):
+        file_path = os.path.join(output_dir, "test_row_index.csv")
+        df = pd.DataFrame({'id': range(25), 'name': ['name{}'.format(i) for i in range(25)]})
+        df.to_csv(file_path, index=False, sep='|')
+        yield file_path
+        os.remove(file_path)
+
+    @pytest.mark.parametrize('block_size', [5, 1024])
+    def test_build(self, text_file, block_size):
+        index = RowIndex.build(text_file, block_size=block_size)
+        assert index.sep == '|'
+        assert index.row_count == 25
+        assert index.columns == ['id', 'name']
+
+        df = index.read_rows(10, 13)
+        assert df.index.tolist() == [10, 11, 12]
+        assert df['name'].tolist() == ['name10', 'name11', 'name12']
+        assert index.read_rows(24, 100)['id'].tolist() == ['24']
+        assert index.read_rows(30, 40).empty
+
+    def test_lazy_model(self, text_file):
+        from zeex.core.models.filetable import LazyFileTableModel
+        model = LazyFileTableModel(text_file, block_rows=10, cache_blocks=2)
+        assert model.rowCount() == 25
+        assert model.columnCount() == 2
+        assert model.value(0, 1) == 'name0'
+        assert model.value(24, 0) == '24'
+        assert model.value(15, 1) == 'name15'
+        # Only the 2 most recently used blocks are kept.
+        assert list(model._blocks.keys()) == [2, 1]
+
+    def test_quoted_line_breaks(self, output_dir):
+        file_path = os.path.join(output_dir, "test_row_index_quoted.csv")
+        df = pd.DataFrame({'id': ['1', '2', '3'], 'note': ['a\nb', 'say ""hi""\n', 'c']})
+        df.to_csv(file_path, index=False)
+        try:
+            index = RowIndex.build(file_path, block_size=4)
+            assert index.row_count == 3
+            assert index.read_rows(1, 3)['note'].tolist() == df['note'].tolist()[1:]
+            assert index.seek(2) == os.path.getsize(file_path) - len('3,c\n')
+            assert RowIndex.build(file_path, quotechar=None).row_count == 5
+        finally:
+            os.remove(file_path)
+
+    def test_sidecar(self, text_file, output_dir):
+        directory = os.path.join(output_dir, "test_row_index_sidecar")
+        index = RowIndex.open(text_file, directory=directory)
+        try:
+            loaded = RowIndex.load(text_file, directory=directory)
+            assert loaded.row_count == index.row_count
+            assert loaded.sep == '|'
+            assert (loaded.offsets == index.offsets).all()
+
+            sample = loaded.sample(5, random_state=1)
+            assert sample.index.size == 5 and sample.index.is_monotonic_increasing
+            assert sample['name'].tolist() == ['name{}'.format(i) for i in sample.index]
+
+            # Changing the file invalidates the saved index.
+            with open(text_file, 'a') as fh:
+                fh.write('25|name25\n')
+            assert RowIndex.load(text_file, directory=directory) is None
+            assert RowIndex.open(text_file, directory=directory).row_count == 26
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def test_default_sidecar_directory(self, text_file):
+        path = sidecar_path(text_file)
+        assert os.path.dirname(path) == ROW_INDEX_DIRECTORY
+        try:
+            RowIndex.open(text_file)
+            assert os.path.exists(path)
+            assert not [f for f in os.listdir(os.path.dirname(text_file)) if f.endswith('.rowindex.npz')]
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_empty_file(self, output_dir):
+        file_path = os.path.join(output_dir, "test_row_index_empty.csv")
+        open(file_path, 'w').close()
+        try:
+            index = RowIndex.build(file_path)
+            assert index.row_count == 0
+            assert index.columns == []
+            assert index.read_rows(0, 10).empty
+            assert index.sample(5).empty
+        finally:
+            os.remove(file_path)
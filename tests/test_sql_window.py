@@ -37,13 +37,36 @@ class TestDatabasesMainWindowAndAssociates(MainTestClass):
         """
         c = AlchemyConnection(name="con1")
         c.configure("sqlite:///" + sqlite_db_path, reset=True)
+        c.meta.reflect()
         c.meta.drop_all()
+        c.refresh_schemas()
         cm = AlchemyConnectionManager()
         cm.add_connection(connection=c)
         window = DatabasesMainWindow(df_manager=DataFrameModelManager(), connection_manager=cm)
         qtbot.addWidget(window)
         return window
 
+    def test_sync_connection_item(self, main_window: DatabasesMainWindow):
+        con = main_window.con_manager.connection('con1')
+        for name in ['sync_a', 'sync_b']:
+            con.engine.execute("CREATE TABLE {} (id INTEGER PRIMARY KEY)".format(name))
+        con.refresh_schemas()
+        main_window.sync_connection_item('con1')
+        tree = main_window.treeView
+        item = main_window.tree_model.findItems('con1')[0]
+        tree.setExpanded(item.index(), True)
+        tree.setExpanded(item.child(0).index(), True)
+
+        con.engine.execute("ALTER TABLE sync_a ADD COLUMN name TEXT")
+        con.refresh_schemas()
+        main_window.sync_connection_item('con1')
+
+        # The expanded table shows its new column, the other keeps its placeholder.
+        item = main_window.tree_model.findItems('con1')[0]
+        assert tree.isExpanded(item.index()) and tree.isExpanded(item.child(0).index())
+        assert [item.child(0).child(r).text() for r in range(item.child(0).rowCount())] == ['id', 'name']
+        assert not con.is_table_item_populated(item.child(1))
+
     def test_general_functionality(self, main_window: DatabasesMainWindow, df:pd.DataFrame):
         """
         Covers the following cases:
@@ -71,9 +94,9 @@ class TestDatabasesMainWindowAndAssociates(MainTestClass):
         df.to_sql(table_name, main_window.connection.engine, index=False)
 
         # Ensure that, after refreshing schemas,
-        # the table exists in the connection's meta data
+        # the table exists in the connection's schema
         main_window.actionRefreshSchemas.trigger()
-        assert table_name in main_window.connection.meta.tables.keys()
+        assert table_name in main_window.connection.get_table_names()
 
         # Also confirm the newly created table made it into the treeView/model
         first_item = main_window.tree_model.item(0)
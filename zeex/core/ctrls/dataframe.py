@@ -24,7 +24,15 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
+import os
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+import pandas as pd
 import zeex.core.utility.pandatools as pandatools
+from zeex.core.utility.parse_cache import ParseCache
+from zeex.core.utility.rowindex import RowIndex
+from zeex.core.compat import QtCore
 from qtpandas.models.DataFrameModel import DataFrameModel
 from qtpandas.models.DataFrameModelManager import DataFrameModelManager as DFMM
 
@@ -39,22 +47,267 @@ ENCODINGS = {'UTF-8':'UTF_8',
              'UTF-32':'UTF_32',
              'ISO-8859-1':'ISO-8859-1'}
 
+LOADER_CHUNKSIZE = 100 * 1000
+LOADER_POLL_MS = 100
 
 
+def memory_budget_megabytes(value) -> float:
+    """
+    Converts a memory budget setting (i.e. GENERAL/MEMORY_BUDGET_MB)
+    to megabytes. None, blank or invalid values are 0 (no budget).
+    """
+    try:
+        return max(0.0, float(value or 0))
+    except (TypeError, ValueError):
+        logging.warning("Ignoring invalid memory budget: {}".format(value))
+        return 0.0
+
 
 class DataFrameModelManager(DFMM):
     """
     A central storage unit for managing
     DataFrameModels.
+
+    With a memory budget, the least recently used models that were read from
+    a file, have no visible window and haven't been edited are evicted
+    when the budget is exceeded. Evicted models are read again
+    (from the parse cache when there is one) the next time they're requested.
     """
-    def __init__(self):
+    def __init__(self, cache_dir=None, memory_budget_mb=None):
+        """
+        :param cache_dir: (str, default None)
+            A directory to cache parsed files in (see ParseCache).
+            None parses files every time they're read.
+        :param memory_budget_mb: (float, default None)
+            The total DataFrame memory to keep models under.
+            None (or 0) never evicts models - strings are converted
+            (see memory_budget_megabytes).
+        """
         DFMM.__init__(self)
         self._file_table_windows = {}
+        self._lazy_windows = {}
+        self._row_indexes = {}
+        self._parse_cache = None
+        self._read_kwargs = {}
+        self._evicted = OrderedDict()
+        self._dirty = set()
+        self._model_sizes = {}
+        self._last_used = OrderedDict()
+        self.memory_budget_mb = memory_budget_megabytes(memory_budget_mb)
+        self.set_cache_directory(cache_dir)
 
     @property
     def file_table_windows(self) -> dict:
         return self._file_table_windows
 
+    @property
+    def parse_cache(self) -> ParseCache:
+        return self._parse_cache
+
+    @property
+    def evicted_paths(self) -> list:
+        """Returns the file paths of evicted models (they're read again on request)."""
+        return list(self._evicted.keys())
+
+    def set_cache_directory(self, dirname):
+        """
+        Sets (or with None, disables) the directory parsed files are cached in.
+        """
+        self._parse_cache = ParseCache(dirname) if dirname else None
+
+    def set_memory_budget(self, memory_budget_mb):
+        """
+        Sets the memory budget (None or 0 disables it) and evicts models
+        until the budget is met.
+        :return: list(evicted file paths)
+        """
+        self.memory_budget_mb = memory_budget_megabytes(memory_budget_mb)
+        return self.enforce_memory_budget()
+
+    def read_frame(self, filepath, **kwargs):
+        """
+        Parses a file into a DataFrame, re-using the parse
+        cache when the file hasn't changed since it was cached.
+        :param filepath: (str)
+        :param kwargs: pandatools.superReadFile(**kwargs)
+        :return: (pd.DataFrame)
+        """
+        if self._parse_cache is None:
+            return pandatools.superReadFile(filepath, **kwargs)
+        return self._parse_cache.read(filepath, **kwargs)
+
+    def read_file(self, filepath, **kwargs) -> DataFrameModel:
+        """
+        Reads a filepath into a DataFrameModel and registers it.
+        :param filepath: (str)
+            The filepath to read
+        :param kwargs: pandatools.superReadFile(**kwargs)
+            Evicted models are read again with their original kwargs when none are given.
+        :return: DataFrameModel
+        """
+        try:
+            model = self._models[filepath]
+            self._touch(filepath)
+            self._paths_read.append(filepath)
+        except KeyError:
+            if not kwargs:
+                kwargs = self._evicted.get(filepath, {})
+            model = DataFrameModel(dataFrame=self.read_frame(filepath, **kwargs), filePath=filepath)
+            self.set_read_model(model, filepath, **kwargs)
+        return model
+
+    def set_read_model(self, df_model: DataFrameModel, file_path, **kwargs):
+        """
+        Registers a DataFrameModel read from file_path.
+        Unlike models registered with set_model, these can be evicted.
+        :param kwargs: The read kwargs (used to read the file again after eviction).
+        :return: None
+        """
+        if self._evicted.pop(file_path, None) is not None and file_path not in self._models:
+            # Evicted models are re-registered quietly.
+            df_model._filePath = file_path
+            self._models[file_path] = df_model
+            self._register(df_model, file_path)
+        else:
+            self.set_model(df_model, file_path)
+        self._read_kwargs[file_path] = kwargs
+        self._paths_read.append(file_path)
+        self.enforce_memory_budget(keep=file_path)
+
+    def set_model(self, df_model: DataFrameModel, file_path):
+        DFMM.set_model(self, df_model, file_path)
+        self._register(df_model, file_path)
+
+    def get_model(self, filepath) -> DataFrameModel:
+        if filepath in self._evicted and filepath not in self._models:
+            return self.read_file(filepath)
+        model = DFMM.get_model(self, filepath)
+        self._touch(filepath)
+        return model
+
+    def get_frame(self, filepath):
+        return self.get_model(filepath).dataFrame()
+
+    def update_file(self, filepath, df, notes=None):
+        self.get_model(filepath)
+        DFMM.update_file(self, filepath, df, notes=notes)
+        self._mark_dirty(filepath)
+
+    def remove_file(self, filepath):
+        self._forget(filepath)
+        if filepath in self._evicted and filepath not in self._models:
+            self._evicted.pop(filepath)
+            self.signalModelDestroyed.emit(filepath)
+        else:
+            self._evicted.pop(filepath, None)
+            DFMM.remove_file(self, filepath)
+
+    def _register(self, df_model, file_path):
+        self._forget(file_path)
+        df_model.dataChanged.connect(lambda: self._mark_dirty(file_path, df_model))
+        self._touch(file_path)
+
+    def _forget(self, file_path):
+        self._read_kwargs.pop(file_path, None)
+        self._dirty.discard(file_path)
+        self._model_sizes.pop(file_path, None)
+        self._last_used.pop(file_path, None)
+
+    def _touch(self, file_path):
+        self._last_used[file_path] = None
+        self._last_used.move_to_end(file_path)
+
+    def _mark_dirty(self, file_path, df_model=None):
+        model = self._models.get(file_path, None)
+        if model is not None and (df_model is None or df_model is model):
+            self._dirty.add(file_path)
+            self._model_sizes.pop(file_path, None)
+
+    def model_memory(self, file_path) -> int:
+        """
+        Returns the bytes used by the DataFrame of a registered model
+        (0 when evicted). Sizes are cached until the model changes.
+        """
+        if file_path not in self._models:
+            return 0
+        try:
+            return self._model_sizes[file_path]
+        except KeyError:
+            df = self._models[file_path].dataFrame()
+            size = int(df.memory_usage(index=True, deep=True).sum())
+            self._model_sizes[file_path] = size
+            return size
+
+    def window_open(self, file_path) -> bool:
+        window = self._file_table_windows.get(file_path, None)
+        return window is not None and window.isVisible()
+
+    def is_evictable(self, file_path) -> bool:
+        """
+        True when the model was read from a file, hasn't been edited
+        and has no visible window.
+        """
+        return (file_path in self._models and file_path in self._read_kwargs
+                and file_path not in self._dirty and not self.window_open(file_path))
+
+    def evict(self, file_path):
+        """
+        Releases the model (and its hidden window, if any).
+        The model is read again the next time it's requested.
+        :return: (int)
+            The bytes the model's DataFrame was using.
+        """
+        size = self.model_memory(file_path)
+        kwargs = self._read_kwargs.get(file_path, {})
+        self._forget(file_path)
+        self._models.pop(file_path)
+        window = self._file_table_windows.pop(file_path, None)
+        if window is not None:
+            window.deleteLater()
+        self._evicted[file_path] = kwargs
+        logging.info("Evicted {} ({:.1f} MB)".format(file_path, size / 1024 ** 2))
+        return size
+
+    def enforce_memory_budget(self, keep=None) -> list:
+        """
+        Evicts the least recently used evictable models until the
+        total model memory is within the memory budget.
+        :param keep: (str, default None)
+            A file path to never evict (i.e. the model just read).
+        :return: list(evicted file paths)
+        """
+        if not self.memory_budget_mb:
+            return []
+        budget = self.memory_budget_mb * 1024 ** 2
+        total = sum(self.model_memory(p) for p in self._models)
+        evicted = []
+        for file_path in list(self._last_used.keys()):
+            if total <= budget:
+                break
+            if file_path != keep and self.is_evictable(file_path):
+                total -= self.evict(file_path)
+                evicted.append(file_path)
+        return evicted
+
+    def memory_report(self) -> pd.DataFrame:
+        """
+        Returns the memory used by each model (least recently used first).
+        :return: (pd.DataFrame)
+            columns: file_path, rows, memory_mb, window_open, evictable, evicted
+        """
+        records = []
+        for file_path in self.evicted_paths:
+            if file_path not in self._models:
+                records.append([file_path, 0, 0.0, False, False, True])
+        order = list(self._last_used.keys()) + [p for p in self._models if p not in self._last_used]
+        for file_path in order:
+            if file_path in self._models:
+                records.append([file_path, self._models[file_path].dataFrame().index.size,
+                                round(self.model_memory(file_path) / 1024 ** 2, 2),
+                                self.window_open(file_path), self.is_evictable(file_path), False])
+        return pd.DataFrame(records, columns=['file_path', 'rows', 'memory_mb',
+                                              'window_open', 'evictable', 'evicted'])
+
     def get_df_describe_model(self, filepath) -> DataFrameModel:
         from core.models.dataframe import DataFrameDescriptionModel
         describe_path = DataFrameDescriptionModel.get_describe_path(filepath)
@@ -66,6 +319,62 @@ class DataFrameModelManager(DFMM):
             self.set_model(dfm2, describe_path)
             return self.get_model(describe_path)
 
+    def get_row_index(self, file_path, build=True, **kwargs) -> RowIndex:
+        """
+        Returns the RowIndex of a text file, shared by everything using this manager.
+        Indexes are saved with the parse cache (or in rowindex.ROW_INDEX_DIRECTORY without one)
+        and rebuilt when the file's size or modified time changes.
+        :param build: (bool, default True)
+            False only returns an index that already exists (or None).
+        :param kwargs: RowIndex.build(**kwargs)
+        :return: (RowIndex, None)
+        """
+        index = self._row_indexes.get(file_path, None)
+        if index is not None and index.is_current():
+            return index
+        directory = None if self._parse_cache is None else self._parse_cache.directory
+        if build:
+            index = RowIndex.open(file_path, directory=directory, **kwargs)
+        else:
+            index = RowIndex.load(file_path, directory=directory)
+        if index is not None:
+            self._row_indexes[file_path] = index
+        return index
+
+    def set_row_index(self, file_path, index: RowIndex):
+        """
+        Shares a RowIndex built elsewhere (see DataFrameModelLoader.load_index).
+        """
+        self._row_indexes[file_path] = index
+
+    def row_count(self, file_path, build=False):
+        """
+        Returns the number of data rows in a text file from its RowIndex.
+        :param build: (bool, default False)
+            True builds an index if there isn't one yet.
+        :return: (int, None)
+            None when there's no index.
+        """
+        index = self.get_row_index(file_path, build=build)
+        return None if index is None else index.row_count
+
+    def get_lazy_window(self, file_path, **kwargs):
+        """
+        Returns a read-only LazyFileTableWindow for browsing a
+        large text file without reading it into a DataFrame.
+        The file is indexed when it has no current RowIndex - use
+        DataFrameModelLoader.load_index to index it in the background first.
+        :param kwargs: RowIndex.build(**kwargs)
+        """
+        from zeex.core.views.file import LazyFileTableWindow
+        from zeex.core.models.filetable import LazyFileTableModel
+        try:
+            return self._lazy_windows[file_path]
+        except KeyError:
+            model = LazyFileTableModel(file_path, row_index=self.get_row_index(file_path, **kwargs))
+            self._lazy_windows[file_path] = LazyFileTableWindow(model)
+            return self._lazy_windows[file_path]
+
     def get_fileview_window(self, file_path, **kwargs):
         from zeex.core.views.file import FileTableWindow
         model = self.read_file(file_path)
@@ -75,3 +384,202 @@ class DataFrameModelManager(DFMM):
             self._file_table_windows[file_path] = FileTableWindow(model, self, **kwargs)
             return self._file_table_windows[file_path]
 
+
+class DataFrameModelLoader(QtCore.QObject):
+    """
+    Reads files into DataFrameModels on a pool of worker threads.
+    Worker threads only parse the files - the DataFrameModels are
+    created and registered with the DataFrameModelManager
+    on the GUI thread as each read finishes.
+    """
+    signalFileProgress = QtCore.Signal(str, int) # file path, rows read so far
+    signalFileLoaded = QtCore.Signal(str) # file path
+    signalFileFailed = QtCore.Signal(str, str) # file path, error message
+    signalIndexLoaded = QtCore.Signal(str) # file path
+    signalFinished = QtCore.Signal()
+
+    def __init__(self, df_manager: DataFrameModelManager, max_workers=None,
+                 chunksize=LOADER_CHUNKSIZE, parent=None):
+        """
+        :param df_manager: (DataFrameModelManager)
+            Loaded DataFrameModels are registered here.
+        :param max_workers: (int, default None)
+            The number of files to read at once - None uses the CPU count (max 8).
+        :param chunksize: (int, default LOADER_CHUNKSIZE)
+            Text files are read this many rows at a time so progress can be reported.
+        :param parent: (QtCore.QObject, default None)
+        """
+        QtCore.QObject.__init__(self, parent)
+        self.df_manager = df_manager
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.chunksize = chunksize
+        self._pool = None
+        self._futures = OrderedDict()
+        self._index_futures = OrderedDict()
+        self._progress = {}
+        self._reported = {}
+        self._kwargs = {}
+        self._timer = QtCore.QTimer(self)
+        self._timer.setInterval(LOADER_POLL_MS)
+        self._timer.timeout.connect(self.poll)
+
+    @property
+    def pending(self) -> list:
+        """Returns a list of the file paths still being read."""
+        return list(self._futures.keys())
+
+    @property
+    def pending_indexes(self) -> list:
+        """Returns a list of the file paths still being indexed."""
+        return list(self._index_futures.keys())
+
+    def progress(self, file_path) -> int:
+        """Returns the number of rows read so far for the file path."""
+        return self._progress.get(file_path, 0)
+
+    def read(self, file_path, **kwargs):
+        """
+        Reads a file into a DataFrame - runs on a worker thread.
+        :param file_path: (str)
+        :param kwargs: pandatools.superReadFile(**kwargs)
+        :return: (pd.DataFrame)
+        """
+        cache = self.df_manager.parse_cache
+        df = None if cache is None else cache.get(file_path, **kwargs)
+        ext = os.path.splitext(file_path)[1].lower()
+        if df is None and ext not in ['.txt', '.tsv', '.csv', '.gz', '.bz2', '.zip']:
+            df = self.df_manager.read_frame(file_path, **kwargs)
+        elif df is None:
+            def callback(count, rows):
+                self._progress[file_path] = rows
+            reader = pandatools.superReadFile(file_path, chunksize=self.chunksize, **kwargs)
+            df = pandatools.dataframe_collect_chunks(reader, callback=callback)
+            if kwargs.get('compact', False):
+                df = pandatools.dataframe_compact(df)[0]
+            if cache is not None:
+                cache.put(file_path, df, **kwargs)
+        self._progress[file_path] = df.index.size
+        return df
+
+    def load(self, file_paths, **kwargs):
+        """
+        Starts reading the file paths in the background.
+        Files already registered with the DataFrameModelManager
+        are reported as loaded right away.
+
+        :param file_paths: (list)
+            The file paths to read.
+        :param kwargs: pandatools.superReadFile(**kwargs)
+        :return: None
+        """
+        for file_path in file_paths:
+            if file_path in self.df_manager.file_paths:
+                self.signalFileLoaded.emit(file_path)
+            elif file_path not in self._futures:
+                self._progress[file_path] = 0
+                self._kwargs[file_path] = kwargs
+                self._futures[file_path] = self._submit(self.read, file_path, **kwargs)
+
+        self._start()
+
+    def load_index(self, file_path, **kwargs):
+        """
+        Starts building the RowIndex of a text file in the background.
+        signalIndexLoaded is emitted once the index is shared with the
+        DataFrameModelManager (right away when it already has a current one).
+
+        :param file_path: (str)
+        :param kwargs: RowIndex.build(**kwargs)
+        :return: None
+        """
+        if self.df_manager.get_row_index(file_path, build=False) is not None:
+            self.signalIndexLoaded.emit(file_path)
+        elif file_path not in self._index_futures:
+            cache = self.df_manager.parse_cache
+            directory = None if cache is None else cache.directory
+            self._index_futures[file_path] = self._submit(RowIndex.open, file_path,
+                                                          directory=directory, **kwargs)
+        self._start()
+
+    def _submit(self, func, *args, **kwargs):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._pool.submit(func, *args, **kwargs)
+
+    def _start(self):
+        if self._futures or self._index_futures:
+            self._timer.start()
+        else:
+            self.signalFinished.emit()
+
+    @QtCore.Slot()
+    def poll(self):
+        """
+        Reports progress and registers finished reads.
+        Called by a timer on the GUI thread while files are loading.
+        :return: None
+        """
+        for file_path, future in list(self._futures.items()):
+            rows = self._progress.get(file_path, 0)
+            if rows != self._reported.get(file_path):
+                self._reported[file_path] = rows
+                self.signalFileProgress.emit(file_path, rows)
+
+            if not future.done():
+                continue
+            self._futures.pop(file_path)
+            kwargs = self._kwargs.pop(file_path, {})
+            if future.cancelled():
+                continue
+            try:
+                df = future.result()
+            except Exception as e:
+                logging.error("Failed to load {}: {}".format(file_path, e))
+                self.signalFileFailed.emit(file_path, str(e))
+                continue
+            self.df_manager.set_read_model(DataFrameModel(dataFrame=df, filePath=file_path),
+                                           file_path, **kwargs)
+            self.signalFileLoaded.emit(file_path)
+
+        for file_path, future in list(self._index_futures.items()):
+            if not future.done():
+                continue
+            self._index_futures.pop(file_path)
+            if future.cancelled():
+                continue
+            try:
+                index = future.result()
+            except Exception as e:
+                logging.error("Failed to index {}: {}".format(file_path, e))
+                self.signalFileFailed.emit(file_path, str(e))
+                continue
+            self.df_manager.set_row_index(file_path, index)
+            self.signalIndexLoaded.emit(file_path)
+
+        if not self._futures and not self._index_futures:
+            self._timer.stop()
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+            self.signalFinished.emit()
+
+    def wait(self):
+        """
+        Blocks until every pending file has been read and registered.
+        :return: None
+        """
+        wait_futures(list(self._futures.values()) + list(self._index_futures.values()))
+        self.poll()
+
+    def cancel(self):
+        """
+        Cancels reads that haven't started yet.
+        Reads already in progress finish but are not registered.
+        :return: None
+        """
+        for future in list(self._futures.values()) + list(self._index_futures.values()):
+            future.cancel()
+        self._futures.clear()
+        self._index_futures.clear()
+        self._kwargs.clear()
+        self.poll()
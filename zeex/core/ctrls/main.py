@@ -23,7 +23,7 @@ SOFTWARE.
 """
 import os
 from zeex.core.compat import QtGui
-from zeex.core.ctrls.sql import AlchemyConnectionManager
+from zeex.core.ctrls.sql import AlchemyConnectionManager, DEFAULT_SCHEMA_CACHE_DIR
 from zeex.core.ctrls.project import ProjectController
 from zeex.core.views.settings import SettingsDialog, SettingsINI
 import zeex.core.utility.widgets as widgets
@@ -45,7 +45,7 @@ class MainController(object):
         self.main_window = window
         self._settings_ini = settings_ini
         self._project_controllers = dict()
-        self._con_manager = AlchemyConnectionManager()
+        self._con_manager = AlchemyConnectionManager(cache_dir=DEFAULT_SCHEMA_CACHE_DIR)
         self._tree_view_projects = None
         self._tree_view_project = None
         self._dialog_settings_main = None
@@ -24,7 +24,8 @@ SOFTWARE.
 import os
 import logging
 from zeex.core.compat import QtGui, QtCore
-from zeex.core.ctrls.dataframe import DataFrameModelManager
+from zeex.core.ctrls.dataframe import DataFrameModelManager, memory_budget_megabytes
+from zeex.core.utility.parse_cache import PARSE_CACHE_DIRNAME
 from zeex.core.models.filetree import FileTreeModel
 from zeex.core.views.actions.export import DataFrameModelExportDialog
 from zeex.core.views.actions.merge_purge import MergePurgeDialog
@@ -43,7 +44,9 @@ class ProjectController(object):
             settings_ini.set_safe('GENERAL', 'ROOT_DIRECTORY', directory)
             settings_ini.set_safe('GENERAL', 'LOG_DIRECTORY', os.path.join(directory, 'logs'))
         self._directory = directory
-        self._df_manager = DataFrameModelManager()
+        budget = memory_budget_megabytes(settings_ini.get_safe('GENERAL', 'MEMORY_BUDGET_MB', fallback=None))
+        self._df_manager = DataFrameModelManager(cache_dir=os.path.join(directory, PARSE_CACHE_DIRNAME),
+                                                 memory_budget_mb=budget)
         self._file_tree_model = FileTreeModel(root_dir=directory, parent=self.parent)
         self._dialog_export_df_model = DataFrameModelExportDialog(self.df_manager)
         self._dialog_merge_purge = MergePurgeDialog(self.df_manager, parent=self.parent)
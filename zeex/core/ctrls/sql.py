@@ -27,14 +27,23 @@ import os
 import pandas as pd
 import sqlalchemy
 import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
 from sqlalchemy import create_engine, MetaData, inspect
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.automap import automap_base
-from zeex.core.compat import QtGui
+from zeex.core.compat import QtGui, QtCore
 from zeex.core.utility.widgets import create_standard_item
+from zeex.core.models.config import config as zeex_config
 from zeex.core.models.dataframe import DataFrameModel
 from zeex.core.utility.collection import DictConfig, get_default_config_directory
+from zeex.core.utility.schema_cache import (SchemaCache, SCHEMA_CACHE_DIRNAME, reflect_schema, column_type,
+                                            is_memory_url)
 from zeex.core.models.sql import AlchemyTableModel
+from zeex.core.views.sql.query_editor import AlchemyQueryEditorWindow
+
+DEFAULT_SCHEMA_CACHE_DIR = os.path.join(zeex_config['DATA_DIR'], SCHEMA_CACHE_DIRNAME)
+SCHEMA_POLL_MS = 250
 
 
 class AlchemyConnection(object):
@@ -79,6 +88,10 @@ class AlchemyConnection(object):
         self._meta = kwargs.pop('meta', None)
         self._inspector = kwargs.pop('inspector', None)
         self._Base = kwargs.pop('Base', None)
+        self._table_names = None # Cached inspector.get_table_names()
+        self._columns = {} # Cached inspector.get_columns(table) by table name
+        self._classes = {} # Automapped classes by table name
+        self._schema = None # The reflect_schema dict the caches were loaded from
         if args or kwargs or self._engine is not None:
             # Force reset to false if
             # we're setting the connection on __init__.
@@ -91,6 +104,9 @@ class AlchemyConnection(object):
         Configures the connection based on the current engine
         or on the engine created from the details in *args/**kwargs
 
+        Nothing is reflected here - table names, columns and mapped
+        classes are loaded (and cached) the first time they're needed.
+
         :param args: (sqlalchemy.create_engine(*args))
             Optional when reset is False and an engine is already set
         :param reset: (bool, default True)
@@ -113,11 +129,10 @@ class AlchemyConnection(object):
             if kwargs:
                 self.kwargs = kwargs
             self._meta = MetaData(bind=self.engine)
-            self._meta.reflect()
             self._inspector = inspect(self.engine)
             self._Session = sessionmaker(bind=self.engine)
             self._Base = automap_base(metadata=self.meta)
-            self._Base.prepare()
+            self.clear_schema_cache()
 
         else:
             if self._engine is None:
@@ -128,9 +143,6 @@ class AlchemyConnection(object):
             if self._meta is None:
                 self._meta = MetaData(bind=self.engine)
 
-            if not self.get_table_names():
-                self._meta.reflect()
-
             if self._inspector is None:
                 self._inspector = inspect(self.engine)
 
@@ -139,7 +151,6 @@ class AlchemyConnection(object):
 
             if self._Base is None:
                 self._Base = automap_base(metadata=self.meta)
-                self._Base.prepare()
 
     def configure_from_url(self, url):
         try:
@@ -199,10 +210,66 @@ class AlchemyConnection(object):
         :param tablename: String with name of table.
         :return: Class reference or None.
         """
-        return self.meta.tables[table]
+        return self.get_mapped_class(table)
 
     def get_table_class(self, name):
-        return self.meta.tables[name]
+        return self.get_table(name)
+
+    def get_table(self, table_name) -> sqlalchemy.Table:
+        """
+        Returns the Table reflected from the database,
+        reflecting only this table the first time it's requested.
+        :param table_name: (str)
+            A table that exists in the database.
+        :return: (sqlalchemy.Table)
+        :raises (KeyError)
+            When the table doesn't exist.
+        """
+        try:
+            return self.meta.tables[table_name]
+        except KeyError:
+            if table_name not in self.get_table_names():
+                raise
+        self.meta.reflect(bind=self.engine, only=[table_name])
+        return self.meta.tables[table_name]
+
+    def get_mapped_class(self, table_name):
+        """
+        Returns the automapped ORM class for a table.
+        Only the table (and the tables its foreign keys
+        refer to) get reflected & mapped, on their own automap base.
+        :param table_name: (str)
+            A table that exists in the database.
+        :return: (class or None)
+            None if the table can't be mapped (no primary key).
+        """
+        try:
+            return self._classes[table_name]
+        except KeyError:
+            if table_name not in self.get_table_names():
+                raise
+        base = automap_base(metadata=MetaData())
+        base.metadata.reflect(bind=self.engine, only=[table_name])
+        base.prepare()
+        cls = self._classes[table_name] = getattr(base.classes, table_name, None)
+        return cls
+
+    def get_columns(self, table_name) -> list:
+        """
+        Returns (and caches) the inspector's column
+        dictionaries for the given table.
+        :param table_name: (str)
+            A table that exists in the database.
+        :return: (list)
+            Of dicts with name, type (sqlalchemy.types.TypeEngine), nullable, default... keys.
+            Cached schemas return the same types (see AlchemyConnection.set_schema).
+        """
+        try:
+            return self._columns[table_name]
+        except KeyError:
+            # Copied - the inspector may re-sort its cached list (see schema_cache.reflect_schema).
+            columns = self._columns[table_name] = list(self.inspector.get_columns(table_name))
+            return columns
 
     def get_column_names(self, table) -> list:
         """
@@ -212,17 +279,53 @@ class AlchemyConnection(object):
         :return: (list)
             Of column names.
         """
-        return [c['name'] for c in self.inspector.get_columns(table)]
+        return [c['name'] for c in self.get_columns(table)]
 
     def get_table_names(self) -> list:
         """
         Returns a list of table names for the connection.
+        The names are read once and cached until refresh_schemas.
         :return: (list)
             Of table names.
         """
-        return list(self.meta.tables.keys())
+        if self._table_names is None:
+            self._table_names = list(self.inspector.get_table_names())
+        return list(self._table_names)
+
+    def clear_schema_cache(self):
+        self._table_names = None
+        self._columns.clear()
+        self._classes.clear()
+        self._schema = None
+
+    @property
+    def schema(self):
+        """
+        The schema_cache.reflect_schema dictionary last
+        set on the connection (or None).
+        :return: (dict)
+        """
+        return self._schema
+
+    def set_schema(self, schema: dict):
+        """
+        Loads table names and columns from a schema_cache.reflect_schema
+        dictionary so they don't have to be reflected.
+        Column types in the dictionary are strings - they're rebuilt into
+        TypeEngines so get_columns returns the same types as the inspector.
+        :param schema: (dict)
+        :return: None
+        """
+        tables = schema['tables']
+        dialect = self.engine.dialect
+        self._table_names = list(tables.keys())
+        self._columns = {name: [dict(c, type=column_type(dialect, c['type'])) for c in info['columns']]
+                         for name, info in tables.items()}
+        self._classes.clear()
+        self.meta.clear()
+        self._schema = schema
 
-    def get_standard_item(self) -> QtGui.QStandardItem:
+    def get_standard_item(self, populate=None) -> QtGui.QStandardItem:
         """
         Creates a QStandardItem for the connection
         with the following information:
@@ -234,25 +337,45 @@ class AlchemyConnection(object):
                 - Column1 (child2.child1)
                 - Column2... (child2.child2)
             - etc...
+        Other tables get a blank placeholder child until they're
+        expanded - see AlchemyConnection.populate_table_item.
+        :param populate: (list, default None)
+            Table names to add column items for (i.e. tables expanded in a view).
         :return: (QtGui.QStandardItem)
         """
+        populate = set(populate or [])
         # Create top database item.
         name_item = create_standard_item(self.name, editable=False, checkable=False)
-        for row, table in enumerate(self.meta.tables.keys()):
-            # Get a dict of all columns in the table.
-            columns = self.inspector.get_columns(table)
-            table = create_standard_item(table, editable=False, checkable=False)
-
-            # Add all columns to the table's item.
-            cnames = [c['name'] for c in columns]
-            for crow, c in enumerate(cnames):
-                c = create_standard_item(c)
-                table.setChild(crow, c)
+        for row, table in enumerate(self.get_table_names()):
+            table_item = create_standard_item(table, editable=False, checkable=False)
+            if table in populate:
+                self.populate_table_item(table_item)
+            else:
+                table_item.setChild(0, create_standard_item('', editable=False, checkable=False))
 
             # Add the table to the database's item
-            name_item.setChild(row, table)
+            name_item.setChild(row, table_item)
         return name_item
 
+    @staticmethod
+    def is_table_item_populated(table_item: QtGui.QStandardItem) -> bool:
+        return not (table_item.rowCount() == 1 and table_item.child(0).text() == '')
+
+    def populate_table_item(self, table_item: QtGui.QStandardItem):
+        """
+        Replaces a table item's placeholder with an item per column.
+        Connect this to the tree view's expanded signal.
+        :param table_item: (QtGui.QStandardItem)
+            An item from AlchemyConnection.get_standard_item.
+        :return: None
+        """
+        if table_item.hasChildren():
+            if self.is_table_item_populated(table_item):
+                return
+            table_item.removeRows(0, table_item.rowCount())
+        for crow, c in enumerate(self.get_column_names(table_item.text())):
+            table_item.setChild(crow, create_standard_item(c))
+
     def read_sql(self, sql, **kwargs) -> pd.DataFrame:
         """
         Returns a Pandas DataFrame based on given SQL-SELECT query
@@ -263,12 +386,16 @@ class AlchemyConnection(object):
         """
         return pd.read_sql(sql, self.engine, **kwargs)
 
-    def get_alchemy_model(self, session, query, columns):
-        return AlchemyTableModel(session, query, columns)
+    def get_alchemy_model(self, session, query, columns, **kwargs):
+        """
+        :param kwargs: (AlchemyTableModel(**kwargs))
+        :return: (AlchemyTableModel)
+        """
+        return AlchemyTableModel(session, query, columns, **kwargs)
 
     def get_alchemy_query_editor_window(self, table_name, session=None, query=None,
                                         model=None, columns=None, reset=False, parent=None):
-        table = self.meta.tables[table_name]
+        table = self.get_table(table_name)
         if reset:
             self._query_editor_windows.pop(table_name, None)
 
@@ -278,11 +405,18 @@ class AlchemyConnection(object):
             if session is None:
                 session = self.Session()
             if query is None:
-                query = session.query(table)
+                # Mapped objects can be edited - plain table rows can't.
+                cls = self.get_mapped_class(table_name)
+                if cls is not None:
+                    table = cls.__table__
+                query = session.query(table if cls is None else cls)
             if columns is None:
                 columns = self.get_column_names(table_name)
             if model is None:
-                model = self.get_alchemy_model(session, query, columns)
+                # A single-column primary key lets the model page by key instead of OFFSET.
+                keys = list(table.primary_key.columns)
+                model = self.get_alchemy_model(session, query, columns,
+                                               key_column=(keys[0] if len(keys) == 1 else None))
             window = AlchemyQueryEditorWindow(model, parent=parent)
             self._query_editor_windows[table_name] = window
             return window
@@ -363,16 +497,29 @@ class AlchemyConnection(object):
                 raise NotImplementedError("Not sure how to handle statement: {}".format(sql))
         return dfm
 
-    def refresh_schemas(self):
+    def refresh_schemas(self, table_name=None):
         """
-        Clears existing metadata,
-        resets the engine inspector
-        and re-reflects metadata.
+        Clears cached metadata so it's reflected
+        again the next time it's requested.
+        :param table_name: (str, default None)
+            Only forget this table.
+            None clears all metadata, resets the engine inspector
+            and the automap Base.
         :return: (None)
         """
+        if table_name is not None:
+            table = self.meta.tables.get(table_name)
+            if table is not None:
+                self.meta.remove(table)
+            self._columns.pop(table_name, None)
+            self._classes.pop(table_name, None)
+            self._table_names = None
+            self._inspector = inspect(self.engine)
+            return
         self.meta.clear()
         self._inspector = inspect(self.engine)
-        self.meta.reflect(bind=self.engine)
+        self._Base = automap_base(metadata=self.meta)
+        self.clear_schema_cache()
 
 
 class DuplicateConnectionError(Exception):
@@ -386,9 +533,61 @@ class AlchemyConnectionManager(object):
     store a reference to this container and use it to store
     and retrieve AlchemyConnections & their sessions.
     """
-    def __init__(self, dict_config=None):
+    def __init__(self, dict_config=None, cache_dir=None):
+        """
+        :param dict_config: (DictConfig, default None)
+            The connection settings - None uses zeex.configs.databases.ini
+        :param cache_dir: (str, default None)
+            A directory to cache reflected schemas in - None doesn't cache them.
+        """
         self._connections = {} # AlchemyConnections stored as key/value pairs here
         self._config = dict_config # connection configuration object stored here
+        self._schema_cache = None
+        self.set_cache_directory(cache_dir)
+
+    def set_cache_directory(self, dirname):
+        """
+        Sets (or with None, unsets) the directory reflected schemas
+        are cached in.
+        :param dirname: (str)
+        :return: None
+        """
+        self._schema_cache = None if dirname is None else SchemaCache(dirname)
+
+    @property
+    def schema_cache(self) -> SchemaCache:
+        return self._schema_cache
+
+    def load_cached_schema(self, name) -> bool:
+        """
+        Sets a connection's schema from the cache.
+        :param name: (str)
+            The name of the AlchemyConnection.
+        :return: (bool)
+            True if a cached schema was found.
+        """
+        con = self.connection(name)
+        if self._schema_cache is None or is_memory_url(con.engine.url):
+            return False
+        schema = self._schema_cache.load(con.engine.url)
+        if schema is None:
+            return False
+        con.set_schema(schema)
+        return True
+
+    def set_schema(self, name, schema: dict):
+        """
+        Sets a connection's schema and writes it to the cache.
+        :param name: (str)
+            The name of the AlchemyConnection.
+        :param schema: (dict)
+            From schema_cache.reflect_schema.
+        :return: None
+        """
+        con = self.connection(name)
+        con.set_schema(schema)
+        if self._schema_cache is not None and not is_memory_url(con.engine.url):
+            self._schema_cache.save(con.engine.url, schema)
 
     @property
     def connections(self) -> dict:
@@ -516,6 +715,8 @@ class AlchemyConnectionManager(object):
 
         # Add the connection and be done...finally.
         self._connections[name] = connection
+        if connection.schema is None:
+            self.load_cached_schema(name)
         return self._connections[name]
 
     def remove_connection(self, name) -> AlchemyConnection:
@@ -705,8 +906,101 @@ class AlchemyConnectionManager(object):
         return added
 
 
+class SchemaRevalidator(QtCore.QObject):
+    """
+    Reflects connection schemas on worker threads and updates
+    the AlchemyConnectionManager (and its schema cache) on the GUI
+    thread when a schema differs from the one the connection has.
+    """
+    signalSchemaChanged = QtCore.Signal(str) # connection name
+    signalSchemaFailed = QtCore.Signal(str, str) # connection name, error message
+    signalFinished = QtCore.Signal()
+
+    def __init__(self, con_manager: AlchemyConnectionManager, max_workers=4, parent=None):
+        """
+        :param con_manager: (AlchemyConnectionManager)
+            Connections are read from & updated here.
+        :param max_workers: (int, default 4)
+            The number of connections to reflect at once.
+        :param parent: (QtCore.QObject, default None)
+        """
+        QtCore.QObject.__init__(self, parent)
+        self.con_manager = con_manager
+        self.max_workers = max_workers
+        self._pool = None
+        self._futures = OrderedDict()
+        self._timer = QtCore.QTimer(self)
+        self._timer.setInterval(SCHEMA_POLL_MS)
+        self._timer.timeout.connect(self.poll)
 
+    @property
+    def pending(self) -> list:
+        """Returns a list of the connection names still being reflected."""
+        return list(self._futures.keys())
 
+    def revalidate(self, names=None):
+        """
+        Starts reflecting connection schemas in the background.
+        In-memory SQLite connections are skipped - a worker thread
+        would reflect its own empty database.
+        :param names: (list, default None)
+            The connection names - None revalidates every connection.
+        :return: None
+        """
+        if names is None:
+            names = list(self.con_manager.connections.keys())
+        for name in names:
+            if name in self._futures:
+                continue
+            engine = self.con_manager.connection(name).engine
+            if is_memory_url(engine.url):
+                continue
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+            self._futures[name] = self._pool.submit(reflect_schema, engine)
+
+        if self._futures:
+            self._timer.start()
+        else:
+            self.signalFinished.emit()
 
-
-
+    @QtCore.Slot()
+    def poll(self):
+        """
+        Applies finished reflections.
+        Called by a timer on the GUI thread while schemas are reflecting.
+        :return: None
+        """
+        for name, future in list(self._futures.items()):
+            if not future.done():
+                continue
+            self._futures.pop(name)
+            try:
+                schema = future.result()
+            except Exception as e:
+                logging.error("Failed to reflect schema for {}: {}".format(name, e))
+                self.signalSchemaFailed.emit(name, str(e))
+                continue
+            try:
+                current = self.con_manager.connection(name).schema
+            except KeyError:
+                # The connection was removed while reflecting.
+                continue
+            if schema != current:
+                self.con_manager.set_schema(name, schema)
+                self.signalSchemaChanged.emit(name)
+
+        if not self._futures:
+            self._timer.stop()
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+            self.signalFinished.emit()
+
+    def wait(self):
+        """
+        Blocks until every pending schema has been reflected and applied.
+        :return: None
+        """
+        wait_futures(list(self._futures.values()))
+        self.poll()
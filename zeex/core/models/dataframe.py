@@ -25,9 +25,11 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 import os
+import weakref
 import pandas as pd
 import logging
 from zeex.core.ctrls.dataframe import DataFrameModel
+from zeex.core.utility.stats import FrameStatistics
 
 
 class DataFrameDescriptionModel(DataFrameModel):
@@ -36,16 +38,21 @@ class DataFrameDescriptionModel(DataFrameModel):
     providing a consistent description of data in the DataFrame.
     The purpose of this is to make analysis more simple and interface
     pandas.DataFrame.describe information.
+    Column descriptions are cached so a sync only describes
+    the columns that changed.
     """
     def __init__(self, source_model: DataFrameModel = None, **kwargs):
         self.source_model = source_model
         self.source_model.dataChanged.connect(self.sync)
-        DataFrameModel.__init__(self, dataFrame=self.get_describe_frame(self.df_source),
+        self.stats = FrameStatistics()
+        self._source_ref = None
+        DataFrameModel.__init__(self, dataFrame=self.get_describe_frame(self._check_source(), stats=self.stats),
                                 copyDataFrame=kwargs.get('copyDataFrame', False),
                                 filePath=kwargs.get('filePath', self._get_describe_path()))
 
     def set_source_model(self, model):
         self.source_model = model
+        self.stats.clear()
         self.source_model.dataChanged.connect(self.sync)
         self.sync()
 
@@ -53,8 +60,30 @@ class DataFrameDescriptionModel(DataFrameModel):
     def df_source(self):
         return self.source_model.dataFrame()
 
-    def sync(self):
-        self.setDataFrame(self.get_describe_frame(self.df_source),
+    def _check_source(self):
+        """
+        Returns the source DataFrame, clearing the
+        cached statistics when the frame was replaced.
+        """
+        df = self.df_source
+        if self._source_ref is None or self._source_ref() is not df:
+            self.stats.clear()
+            self._source_ref = (weakref.ref(df) if df is not None else None)
+        return df
+
+    def sync(self, topLeft=None, bottomRight=None, verify=False):
+        """
+        Describes the source DataFrame again.
+        Only dirty columns are described: the columns in a
+        dataChanged(topLeft, bottomRight) range, the columns whose
+        dtype or length changed and every column of a replaced frame.
+        :param verify: (bool, default False)
+            True also hashes every column to find values changed in place.
+        """
+        df = self._check_source()
+        if topLeft is not None and bottomRight is not None and topLeft.isValid() and bottomRight.isValid():
+            self.stats.invalidate(df.columns[topLeft.column():bottomRight.column() + 1])
+        self.setDataFrame(self.get_describe_frame(df, stats=self.stats, verify=verify),
                           copyDataFrame=False,
                           filePath=self._get_describe_path())
 
@@ -70,9 +99,13 @@ class DataFrameDescriptionModel(DataFrameModel):
         return "{}_desc{}".format(base, ext)
 
     @staticmethod
-    def get_describe_frame(df, index_label='category', include='all', **kwargs):
+    def get_describe_frame(df, index_label='category', include='all', stats: FrameStatistics = None,
+                           verify=True, **kwargs):
         try:
-            df = df.describe(include=include, **kwargs)
+            if stats is not None and include == 'all' and not kwargs:
+                df = stats.describe(df, verify=verify)
+            else:
+                df = df.describe(include=include, **kwargs)
             orig_cols = df.columns.tolist()
             df.index.name = index_label
             df.reset_index(drop=False, inplace=True)
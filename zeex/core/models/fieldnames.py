@@ -28,7 +28,7 @@ import datetime
 import logging
 from zeex.core.compat import QtGui
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import (Column, Integer, String, DateTime, create_engine)
+from sqlalchemy import (Column, Integer, String, DateTime, create_engine, event, func)
 from sqlalchemy.orm import sessionmaker
 from zeex.core.models.config import config
 
@@ -58,62 +58,126 @@ class Field(Base):
                              self.orig_name, self.new_name, self.source)
         
 class FieldNames:
-    def __init__(self):
+    # Rows per IN (...) clause - SQLite allows 999 bound parameters.
+    QUERY_CHUNKSIZE = 500
+    # {engine: ({orig_name: new_name}, {orig_name.lower(): new_name})} -
+    # shared by all instances and cleared whenever the engine commits.
+    _caches = {}
+
+    def __init__(self, engine=None):
+        """
+        :param engine: (sqlalchemy.engine.Engine, default None)
+            The database to store fields in - None uses data/fieldnames.db.
+        """
         self.base = Base
-        self.engine = engine
+        self.engine = connection_info['engine'] if engine is None else engine
         self.base.metadata.create_all(self.engine)
-        self.session = Session()
+        self.session = Session() if engine is None else sessionmaker(bind=self.engine)()
         self.Field = Field
-        
+        if not event.contains(self.engine, 'commit', _invalidate_field_names):
+            event.listen(self.engine, 'commit', _invalidate_field_names)
+
+    @classmethod
+    def invalidate_cache(cls, engine=None):
+        """Clears the cached renames of an engine (or all engines when None)."""
+        if engine is None:
+            cls._caches.clear()
+        else:
+            cls._caches.pop(engine, None)
+
+    def get_cache(self) -> tuple:
+        """
+        Returns the (exact, lowercase) rename dictionaries,
+        reading the whole table in one query if they aren't cached.
+        When names differ only by case the most recently updated one
+        wins the lowercase lookup.
+        """
+        cache = FieldNames._caches.get(self.engine)
+        if cache is None:
+            exact, lower = {}, {}
+            query = self.session.query(Field.orig_name, Field.new_name).order_by(Field.updatedate, Field.id)
+            for orig_name, new_name in query:
+                exact[orig_name] = new_name
+                lower[orig_name.lower()] = new_name
+            cache = FieldNames._caches[self.engine] = (exact, lower)
+        return cache
+
     def add_entry(self, name, newname, source=None):
-        field = Field(orig_name=name, new_name=newname, source=source)
-        self.session.add(field)
-        self.session.commit()
-        return field
-        
+        return self.add_entries({name: newname}, source=source)[0]
+
     def add_entries(self, names: dict, source=None) -> list:
+        """
+        Inserts or updates a Field for each {orig_name: new_name}
+        in one transaction: existing rows are read in bulk and updated,
+        the rest are inserted together.
+        Existing rows match case-insensitively like get_renames (an exact match wins)
+        and keep their orig_name - 'last_name' updates an existing 'Last_Name'.
+        """
+        names = dict(names)
+        now = datetime.datetime.now()
+        exact, lower = {}, {}
+        for f in self._query_names(list(names.keys()), ignore_case=True):
+            exact[f.orig_name] = f
+            lower.setdefault(f.orig_name.lower(), f)
         entries = []
         for oname, nname in names.items():
-            field = Field(orig_name=oname, new_name=nname, source=source)
-            self.session.add(field)
+            field = exact.get(oname) or lower.get(oname.lower())
+            if field is None:
+                field = Field(orig_name=oname, new_name=nname, source=source,
+                              insertdate=now, updatedate=now)
+                self.session.add(field)
+                exact[oname] = lower[oname.lower()] = field
+            else:
+                field.new_name = nname
+                field.source = source
+                field.updatedate = now
             entries.append(field)
         self.session.commit()
         return entries
-        
+
+    def _query_names(self, names: list, ignore_case=False) -> list:
+        fields = []
+        column = func.lower(Field.orig_name) if ignore_case else Field.orig_name
+        if ignore_case:
+            names = list(set(n.lower() for n in names))
+        for i in range(0, len(names), self.QUERY_CHUNKSIZE):
+            fields.extend(self.session.query(Field).filter(
+                column.in_(names[i:i + self.QUERY_CHUNKSIZE])).all())
+        return fields
+
     def get_renames(self, names: list, fill_missing=False) -> dict:
         """
         Returns all names in the list
         as a dictionary like:
         {name:new_name}
-        the value is None if no match is found.
+        Names match case-insensitively (an exact match wins).
+        The value is None if no match is found
+        or the name itself when fill_missing is True.
         """
+        exact, lower = self.get_cache()
         renames = {}
-        
         for n in names:
-            try:
-                field = self.session.query(Field).filter(
-                        Field.orig_name.ilike("{}".format(n))
-                        ).one()
-                renames[n] = field.new_name
-            except:
-                renames[n] = (field if fill_missing is True else None)
-                   
+            new_name = exact.get(n, lower.get(str(n).lower()))
+            if new_name is None and fill_missing is True:
+                new_name = n
+            renames[n] = new_name
         return renames
-        
+
     def delete_entry(self, orig_name: str):
-        entry = self.session.query(Field).filter(Field.orig_name == orig_name).one()
-        if entry:
-            self.session.delete(entry)
-            self.session.commit()
-            
+        self.delete_entries([orig_name])
+
     def delete_entries(self, orig_names: list):
-        entries = self.session.query(Field).filter(Field.orig_name.in_(orig_names)).all()
+        entries = self._query_names(list(orig_names))
         for entry in entries:
             self.session.delete(entry)
         if entries:
             self.session.commit()
 
 
+def _invalidate_field_names(conn):
+    FieldNames.invalidate_cache(conn.engine)
+
+
 class FieldRenameModel(QtGui.QStandardItemModel):
     def __init__(self, *args, **kwargs):
         QtGui.QStandardItemModel.__init__(self, *args, **kwargs)
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+MIT License
+
+Copyright (c) 2016 Zeke Barge
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from collections import OrderedDict
+import pandas as pd
+from zeex.core.compat import QtCore
+from zeex.core.utility.rowindex import RowIndex
+
+LAZY_BLOCK_ROWS = 1000
+LAZY_CACHE_BLOCKS = 64
+
+
+class LazyFileTableModel(QtCore.QAbstractTableModel):
+    """
+    A read-only table model over a delimited text file that's
+    too large to load. A RowIndex is built in one streaming pass
+    and only the blocks of rows the view asks for are parsed,
+    keeping the most recently used blocks in an LRU cache.
+    """
+    def __init__(self, file_path, row_index: RowIndex=None, block_rows=LAZY_BLOCK_ROWS,
+                 cache_blocks=LAZY_CACHE_BLOCKS, parent=None, **kwargs):
+        """
+        :param file_path: (str)
+            The file to browse.
+        :param row_index: (RowIndex, default None)
+            A prebuilt index of the file (None builds one).
+        :param block_rows: (int, default LAZY_BLOCK_ROWS)
+            The number of rows parsed at a time.
+        :param cache_blocks: (int, default LAZY_CACHE_BLOCKS)
+            The max number of parsed blocks kept in memory.
+        :param kwargs: RowIndex.build(**kwargs)
+        """
+        QtCore.QAbstractTableModel.__init__(self, parent)
+        if row_index is None:
+            row_index = RowIndex.build(file_path, **kwargs)
+        self.row_index = row_index
+        self.block_rows = block_rows
+        self.cache_blocks = cache_blocks
+        self._file_path = file_path
+        self._blocks = OrderedDict()
+
+    @property
+    def filePath(self):
+        return self._file_path
+
+    @property
+    def columns(self) -> list:
+        return self.row_index.columns
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return self.row_index.row_count
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return len(self.columns)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role != QtCore.Qt.DisplayRole:
+            return None
+        if orientation == QtCore.Qt.Horizontal:
+            return str(self.columns[section])
+        return str(section)
+
+    def flags(self, index):
+        return QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or role != QtCore.Qt.DisplayRole:
+            return None
+        return self.value(index.row(), index.column())
+
+    def value(self, row, col) -> str:
+        """Returns the display value of a cell ('' for nulls)."""
+        block = self.block(row // self.block_rows)
+        value = block.iat[row % self.block_rows, col]
+        return '' if pd.isnull(value) else str(value)
+
+    def block(self, number) -> pd.DataFrame:
+        """
+        Returns a parsed block of rows from the cache or the file.
+        :param number: (int)
+            The block number (rows number * block_rows up to (number + 1) * block_rows)
+        :return: (pd.DataFrame)
+        """
+        try:
+            self._blocks.move_to_end(number)
+            return self._blocks[number]
+        except KeyError:
+            start = number * self.block_rows
+            df = self.row_index.read_rows(start, start + self.block_rows)
+            self._blocks[number] = df
+            while len(self._blocks) > self.cache_blocks:
+                self._blocks.popitem(last=False)
+            return df
+
+    def clear_cache(self):
+        self._blocks.clear()
@@ -5,6 +5,8 @@ https://gist.github.com/harvimt/4699169
 # © 2013 Mark Harviston, BSD License
 """
 import logging
+from collections import OrderedDict
+from sqlalchemy import and_, or_
 from zeex.core.compat import QtGui, QtCore
 QAbstractTableModel, QVariant, Qt = QtCore.QAbstractTableModel, str, QtCore.Qt
 
@@ -17,28 +19,115 @@ class CustomQVariant(object):
 
 QVariant = CustomQVariant
 
+ALCHEMY_BLOCK_ROWS = 500 # Rows fetched per query (and per fetchMore)
+ALCHEMY_CACHE_BLOCKS = 200 # Blocks of rows kept in memory
+
+CRITERIA_CONDITIONS = {'=': lambda c, v: c == v,
+                       '!=': lambda c, v: c != v,
+                       '>': lambda c, v: c > v,
+                       '>=': lambda c, v: c >= v,
+                       '<=': lambda c, v: c <= v,
+                       '<': lambda c, v: c < v,
+                       'LIKE': lambda c, v: c.like(v),
+                       'NOT LIKE': lambda c, v: ~c.like(v),
+                       'IS NULL': lambda c, v: c.is_(None),
+                       'IS NOT NULL': lambda c, v: c.isnot(None)}
+
+
+def criteria_to_clause(criteria: list, get_column):
+    """
+    Compiles CriteriaDialog criteria into one SQL WHERE clause.
+    Each criterion is joined to the one before it by its andor (blank means AND)
+    with AND binding tighter than OR, like SQL.
+    Criteria sharing a group name are combined (in parentheses) first
+    and the group is joined by its first criterion's andor.
+
+    :param criteria: (list)
+        Of dicts with group, field, condition, value & andor keys
+        (see CriteriaDialog.criteria_values).
+    :param get_column: (callable)
+        Returns the column expression for a field name.
+    :return: (sqlalchemy.sql.ClauseElement or None)
+        None when there are no criteria.
+    :raises (KeyError)
+        When a condition isn't one of CRITERIA_CONDITIONS or get_column has no such field.
+    """
+    def combine(terms):
+        # terms: [(andor, clause)...] -> OR of AND runs.
+        runs = [[]]
+        for andor, clause in terms:
+            if runs[-1] and str(andor).strip().upper() == 'OR':
+                runs.append([])
+            runs[-1].append(clause)
+        runs = [r[0] if len(r) == 1 else and_(*r) for r in runs]
+        return runs[0] if len(runs) == 1 else or_(*runs)
+
+    groups = OrderedDict()
+    for c in criteria:
+        condition = str(c['condition']).strip().upper()
+        if condition not in CRITERIA_CONDITIONS:
+            raise KeyError("Unknown condition '{}' - use one of {}".format(
+                           c['condition'], ", ".join(CRITERIA_CONDITIONS.keys())))
+        try:
+            column = get_column(c['field'])
+        except KeyError:
+            raise KeyError("Unknown field '{}'".format(c['field']))
+        clause = CRITERIA_CONDITIONS[condition](column, c.get('value'))
+        group = c.get('group') or None
+        key = group if group is not None else len(groups)
+        groups.setdefault(key, []).append((c.get('andor'), clause))
+
+    if not groups:
+        return None
+    return combine([(terms[0][0], combine(terms)) for terms in groups.values()])
+
+
 class AlchemyTableModel(QAbstractTableModel):
     """
     A Qt Table Model that binds to a SQL Alchemy query
+    Rows are fetched a block at a time as the view scrolls
+    (Qt's canFetchMore/fetchMore) and the most recently used
+    blocks are cached.
+    Blocks are read with LIMIT/OFFSET, or by key (WHERE key > last key)
+    when a unique key_column is given.
     Example:
     >>> model = AlchemyTableModel(Session, [('Name', Entity.name)])
     >>> table = QTableView(parent)
     >>> table.setModel(model)
     """
 
-    def __init__(self, session, query, columns):
+    def __init__(self, session, query, columns, key_column=None,
+                 block_rows=ALCHEMY_BLOCK_ROWS, cache_blocks=ALCHEMY_CACHE_BLOCKS):
+        """
+        :param session: (sqlalchemy.orm.session.Session)
+        :param query: (sqlalchemy.orm.query.Query)
+        :param columns: (list)
+            The column names to display.
+        :param key_column: (sqlalchemy.Column, default None)
+            A unique column the query can be ordered & paged by.
+            None pages with LIMIT/OFFSET.
+        :param block_rows: (int, default 500)
+            The number of rows to fetch at a time.
+        :param cache_blocks: (int, default 200)
+            The max number of blocks to keep in memory.
+        """
         super(AlchemyTableModel, self).__init__()
-        # TODO self.sort_data = None
         self.session = session
         self.fields = columns
         self.query = query
+        self.key_column = key_column
+        self.block_rows = block_rows
+        self.cache_blocks = cache_blocks
 
-        self.results = None
         self.count = None
-        self.sort = None
+        self.sort_data = None # (Qt.SortOrder, column number) or None
         self.filter = None
-        self.refresh()
         self.changes = []
+        self._query = None
+        self._blocks = OrderedDict()
+        self._after_keys = {}
+        self._exhausted = False
+        self.refresh()
 
     def headerData(self, col, orientation, role):
         if role != Qt.DisplayRole:
@@ -56,36 +145,171 @@ class AlchemyTableModel(QAbstractTableModel):
         self.filter = filter
         self.refresh()
 
+    def set_criteria(self, criteria: list):
+        """
+        Filters the query on the database with CriteriaDialog criteria.
+        :param criteria: (list)
+            See criteria_to_clause - an empty list clears the filter.
+        :return: None
+        """
+        self.setFilter(criteria_to_clause(criteria, self.column))
+
+    def column(self, name):
+        """
+        Returns the query's column expression for a field name.
+        :raises (KeyError)
+            When the query has no such column.
+        """
+        for desc in self.query.column_descriptions:
+            entity = desc.get('entity')
+            if entity is not None and desc['expr'] is entity:
+                attr = getattr(entity, name, None)
+                if attr is not None:
+                    return attr
+            elif desc['name'] == name:
+                return desc['expr']
+        raise KeyError(name)
+
+    @property
+    def paged_by_key(self) -> bool:
+        return self.key_column is not None and self.sort_data is None
+
+    def tie_breakers(self) -> list:
+        """
+        Returns the columns ordering the query's rows uniquely:
+        the key column, else the primary key columns of the queried
+        tables, else every field.
+        :return: (list)
+        """
+        if self.key_column is not None:
+            return [self.key_column]
+        columns = []
+        for desc in self.query.column_descriptions:
+            table = getattr(desc.get('entity'), '__table__', None)
+            if table is None:
+                table = getattr(desc['expr'], 'table', None)
+            for c in getattr(table, 'primary_key', []):
+                if not any(c is o for o in columns):
+                    columns.append(c)
+        if not columns:
+            for name in self.fields:
+                try:
+                    columns.append(self.column(name))
+                except KeyError:
+                    continue
+        return columns
+
     def refresh(self):
-        """Recalculates, self.results and self.count"""
+        """Clears cached rows and fetches the first block again."""
 
-        self.layoutAboutToBeChanged.emit()
+        self.beginResetModel()
         if not isinstance(self.fields, list):
             logging.info("Fields wasn't list: {}".format(self.fields))
             self.fields = [f for f in self.fields]
         q = self.query
-        if self.sort is not None:
-            order, col = self.sort
-            col = self.fields[col][1]
-            if order == Qt.DescendingOrder:
-                col = col.desc()
-        else:
-            col = None
+        # OFFSET paging needs a unique order so rows aren't skipped or repeated.
+        order_by = self.tie_breakers()
+        if self.sort_data is not None:
+            order, col = self.sort_data
+            col = self.column(self.fields[col])
+            order_by.insert(0, col.desc() if order == Qt.DescendingOrder else col.asc())
 
         if self.filter is not None:
             q = q.filter(self.filter)
 
-        q = q.order_by(col)
+        self._query = q.order_by(*order_by)
+        self._blocks.clear()
+        self._after_keys = {0: None}
+        self._exhausted = False
+        self.count = 0
+        self._append_block()
+        self.endResetModel()
+
+    def _load_block(self, block) -> tuple:
+        """
+        Queries a block of rows and caches it.
+        :return: (tuple)
+            (rows, bool) - the bool is True if there are rows after the block.
+        """
+        q = self._query
+        after = self._after_keys.get(block, False)
+        if self.paged_by_key and after is not False:
+            if after is not None:
+                q = q.filter(self.key_column > after)
+        else:
+            q = q.offset(block * self.block_rows)
+        rows = q.limit(self.block_rows + 1).all()
+        more = len(rows) > self.block_rows
+        rows = rows[:self.block_rows]
+        if self.paged_by_key and more:
+            self._after_keys[block + 1] = getattr(rows[-1], self.key_column.name)
+
+        self._blocks[block] = rows
+        self._blocks.move_to_end(block)
+        self._evict()
+        return rows, more
+
+    def _evict(self):
+        if len(self._blocks) <= self.cache_blocks:
+            return
+        # Blocks holding uncommitted edits stay cached.
+        keep = {idx.row() // self.block_rows for idx in self.changes}
+        for block in list(self._blocks.keys()):
+            if len(self._blocks) <= self.cache_blocks:
+                break
+            if block not in keep:
+                self._blocks.pop(block)
+
+    def _append_block(self) -> int:
+        rows, more = self._load_block(self.count // self.block_rows)
+        self.count += len(rows)
+        self._exhausted = not more
+        return len(rows)
+
+    def block(self, block) -> list:
+        """
+        Returns a (cached) block of rows.
+        :param block: (int)
+            The block number - row // block_rows.
+        :return: (list)
+        """
+        try:
+            self._blocks.move_to_end(block)
+            return self._blocks[block]
+        except KeyError:
+            return self._load_block(block)[0]
+
+    def row(self, row):
+        """Returns the query result at a row number."""
+        return self.block(row // self.block_rows)[row % self.block_rows]
+
+    def canFetchMore(self, parent=None):
+        return not self._exhausted
 
-        self.results = q.all()
-        self.count = q.count()
-        self.layoutChanged.emit()
+    def fetchMore(self, parent=None):
+        if self._exhausted:
+            return
+        rows, more = self._load_block(self.count // self.block_rows)
+        if rows:
+            self.beginInsertRows(QtCore.QModelIndex(), self.count, self.count + len(rows) - 1)
+            self.count += len(rows)
+            self._exhausted = not more
+            self.endInsertRows()
+        else:
+            self._exhausted = True
+
+    def total_count(self) -> int:
+        """
+        Counts every row the query returns (not just the fetched rows).
+        This runs a COUNT on the server, so it can be slow for big tables.
+        """
+        return self._query.count()
 
     def flags(self, index):
         _flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
 
-        if self.sort is not None:
-            order, col = self.sort
+        if self.sort_data is not None:
+            order, col = self.sort_data
 
             if index.column() == col:
                 _flags |= Qt.ItemIsDragEnabled | Qt.ItemIsDropEnabled
@@ -103,10 +327,10 @@ class AlchemyTableModel(QAbstractTableModel):
 
         return False
 
-    def rowCount(self, parent):
+    def rowCount(self, parent=None):
         return self.count or 0
 
-    def columnCount(self, parent):
+    def columnCount(self, parent=None):
         return len(self.fields)
 
     def data(self, index, role):
@@ -116,13 +340,13 @@ class AlchemyTableModel(QAbstractTableModel):
         elif role not in (Qt.DisplayRole, Qt.EditRole):
             return QVariant()
 
-        row = self.results[index.row()]
+        row = self.row(index.row())
         name = self.fields[index.column()]
 
         return str(getattr(row, name))
 
     def setData(self, index, value, role=None):
-        row = self.results[index.row()]
+        row = self.row(index.row())
         name = self.fields[index.column()]
         if not isinstance(value, str):
             value = value.toString()
@@ -139,9 +363,18 @@ class AlchemyTableModel(QAbstractTableModel):
             self.changes.append(index)
             return True
 
-    def sort(self, col, order):
-        """Sort table by given column number."""
-        pass
+    def sort(self, col, order=Qt.AscendingOrder):
+        """
+        Sort table by given column number.
+        The ORDER BY runs on the database and cached rows are cleared.
+        A negative column number clears the sort.
+        Nothing is re-queried when the sort hasn't changed.
+        """
+        sort_data = None if col < 0 else (order, col)
+        if sort_data == self.sort_data:
+            return
+        self.sort_data = sort_data
+        self.refresh()
 
     def commit(self):
         if self.changes:
@@ -157,4 +390,3 @@ class AlchemyTableModel(QAbstractTableModel):
             self.session.rollback()
             self.changes = []
             self.refresh()
-
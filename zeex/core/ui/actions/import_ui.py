@@ -100,6 +100,9 @@ class Ui_ImportFileDialog(object):
         self.checkBoxTrimSpaces = QtGui.QCheckBox(ImportFileDialog)
         self.checkBoxTrimSpaces.setObjectName("checkBoxTrimSpaces")
         self.gridLayout_5.addWidget(self.checkBoxTrimSpaces, 0, 3, 1, 1)
+        self.checkBoxCompactLoad = QtGui.QCheckBox(ImportFileDialog)
+        self.checkBoxCompactLoad.setObjectName("checkBoxCompactLoad")
+        self.gridLayout_5.addWidget(self.checkBoxCompactLoad, 0, 4, 1, 1)
         self.gridLayout.addLayout(self.gridLayout_5, 1, 0, 1, 1)
         self.gridLayout_7.addLayout(self.gridLayout, 0, 0, 1, 1)
 
@@ -119,4 +122,5 @@ class Ui_ImportFileDialog(object):
         self.checkBoxHasHeaders.setText(QtGui.QApplication.translate("ImportFileDialog", "Has Headers", None, QtGui.QApplication.UnicodeUTF8))
         self.checkBoxParseDates.setText(QtGui.QApplication.translate("ImportFileDialog", "Parse Dates", None, QtGui.QApplication.UnicodeUTF8))
         self.checkBoxTrimSpaces.setText(QtGui.QApplication.translate("ImportFileDialog", "Trim Spaces", None, QtGui.QApplication.UnicodeUTF8))
+        self.checkBoxCompactLoad.setText(QtGui.QApplication.translate("ImportFileDialog", "Compact Load", None, QtGui.QApplication.UnicodeUTF8))
 
@@ -49,6 +49,9 @@ class Ui_CriteriaDialog(object):
         self.btnPushDown = QtGui.QPushButton(CriteriaDialog)
         self.btnPushDown.setObjectName("btnPushDown")
         self.gridLayout_10.addWidget(self.btnPushDown, 2, 0, 1, 1)
+        self.btnApplyCriteria = QtGui.QPushButton(CriteriaDialog)
+        self.btnApplyCriteria.setObjectName("btnApplyCriteria")
+        self.gridLayout_10.addWidget(self.btnApplyCriteria, 3, 0, 1, 1)
         self.gridLayout_9.addLayout(self.gridLayout_10, 0, 0, 1, 1)
         self.tableViewCriteria = QtGui.QTableView(CriteriaDialog)
         sizePolicy = QtGui.QSizePolicy(QtGui.QSizePolicy.Expanding, QtGui.QSizePolicy.Expanding)
@@ -174,6 +177,7 @@ class Ui_CriteriaDialog(object):
         self.btnDeleteCriteria.setText(QtGui.QApplication.translate("CriteriaDialog", "Delete", None, QtGui.QApplication.UnicodeUTF8))
         self.btnPushUp.setText(QtGui.QApplication.translate("CriteriaDialog", "Up", None, QtGui.QApplication.UnicodeUTF8))
         self.btnPushDown.setText(QtGui.QApplication.translate("CriteriaDialog", "Down", None, QtGui.QApplication.UnicodeUTF8))
+        self.btnApplyCriteria.setText(QtGui.QApplication.translate("CriteriaDialog", "Apply", None, QtGui.QApplication.UnicodeUTF8))
         self.lineEditGroup.setToolTip(QtGui.QApplication.translate("CriteriaDialog", "Enter name of criteria group (or leave blank)", None, QtGui.QApplication.UnicodeUTF8))
         self.labelGroup.setText(QtGui.QApplication.translate("CriteriaDialog", "Criteria Group", None, QtGui.QApplication.UnicodeUTF8))
         self.comboBoxCondition.setItemText(0, QtGui.QApplication.translate("CriteriaDialog", "=", None, QtGui.QApplication.UnicodeUTF8))
@@ -26,7 +26,6 @@ import os
 import copy
 import shutil
 from configparser import ConfigParser
-from zeex.core.compat import QtGui
 from ast import literal_eval as Eval
 import keyring
 
@@ -100,10 +99,11 @@ class BaseConfig(ConfigParser):
 
     def get_safe(self, section, option, **kwargs):
         try:
-            option = self.get(section, option, **kwargs)
-            return Eval(option)
+            value = self.get(section, option, **kwargs)
+            return Eval(value)
         except (SyntaxError, ValueError) as e:
             try:
+                # Not a python literal - return the raw string.
                 return self[section][str(option)]
             except (KeyError, AttributeError) as e:
                 pass
@@ -207,6 +207,7 @@ def export_settings(dictconfig:DictConfig, parent=None, to=None):
     :return: None
     """
     if to is None:
+        from zeex.core.compat import QtGui
         to = QtGui.QFileDialog.getSaveFileName(parent)[0]
     dictconfig.save_as(to, set_self=True)
 
@@ -225,6 +226,7 @@ def import_settings(method, filename=None, dictconfig:DictConfig=None, parent=No
     """
     if filename is None:
         if dictconfig is None:
+            from zeex.core.compat import QtGui
             filename = QtGui.QFileDialog.getOpenFileName(parent)[0]
             dictconfig = SettingsINI(filename=filename)
     else:
@@ -0,0 +1,610 @@
+# -*- coding: utf-8 -*-
+"""
+MIT License
+
+Copyright (c) 2016 Zeke Barge
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import os
+import sys
+import time
+import logging
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from zeex.core.utility.pandatools import (superReadFile, dataframe_chunks, dataframe_anti_join,
+                                          dataframe_key_hashes, gather_frame_fields)
+
+MERGE_PURGE_CHUNKSIZE = 250 * 1000
+EXCEL_EXTENSIONS = ['.xlsx', '.xls']
+
+REPORT_TEMPLATE = """
+        Merge Purge Report
+        ==================
+        Original Size: {}
+        Final Size: {}
+        Source Path: {}
+        Output Path: {}
+
+
+        Merge:
+        ==================
+        {}
+
+
+        Purge:
+        ==================
+        {}
+
+
+        Sort:
+        ==================
+            SORT BY: {}
+            SORT ASCENDING: {}
+
+
+        Dedupe:
+        ==================
+            DEDUPE ON: {}
+            RECORDS LOST: {}
+
+
+        Stages:
+        ==================
+        {}
+
+
+
+        """
+
+
+def peak_memory_mb():
+    """
+    Returns the peak memory (MB) used by this process so far or None
+    if it can't be measured on this platform.
+    """
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / 1024 ** 2
+        except (ImportError, AttributeError):
+            return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes.
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+class MergePurgeCancelled(Exception):
+    """Raised inside MergePurgeEngine.execute when the job is cancelled."""
+    pass
+
+
+class KeySet(object):
+    """
+    A set of uint64 key hashes stored as a few sorted numpy arrays.
+    Uses 8 bytes per key (vs ~70 for a python set of ints) so
+    suppression lists with tens of millions of rows fit in memory.
+    New keys are added as a sorted level and levels are compacted
+    once there are more than max_levels of them.
+    """
+    def __init__(self, max_levels=8):
+        self.max_levels = max_levels
+        self._levels = []
+
+    def __len__(self):
+        return sum(level.size for level in self._levels)
+
+    def add(self, hashes):
+        """
+        Adds hashes to the set.
+        :param hashes: (np.ndarray)
+        :return: None
+        """
+        hashes = np.unique(hashes)
+        if hashes.size:
+            self._levels.append(hashes)
+        if len(self._levels) > self.max_levels:
+            self._levels = [np.unique(np.concatenate(self._levels))]
+
+    def contains(self, hashes):
+        """
+        Returns a boolean mask of the hashes that are in the set.
+        :param hashes: (np.ndarray)
+        :return: (np.ndarray)
+        """
+        mask = np.zeros(len(hashes), dtype=bool)
+        for level in self._levels:
+            pos = np.minimum(np.searchsorted(level, hashes), level.size - 1)
+            mask |= level[pos] == hashes
+        return mask
+
+    def first_seen(self, hashes):
+        """
+        Returns a boolean mask of the hashes that have not been seen before
+        (only the first of any repeats within :param hashes counts)
+        and adds them to the set.
+        :param hashes: (np.ndarray)
+        :return: (np.ndarray)
+        """
+        new = ~self.contains(hashes) & ~pd.Series(hashes).duplicated().values
+        self.add(hashes[new])
+        return new
+
+
+class MergePurgeEngine(object):
+    """
+    Runs a merge/purge job without holding the whole job in memory.
+        - The source and merge files are streamed in chunks.
+        - Purge (suppression) files are reduced to KeySets of hashed key columns.
+        - Dedupe keeps a KeySet of the keys already written.
+        - Output is appended to the destination file chunk by chunk.
+
+    Sorting needs every surviving record at once, so when sort_on is set
+    the purged records are collected in memory, sorted, deduped and then written.
+
+    Sources (source, merge files, purge files) can be file paths or DataFrames.
+    """
+    def __init__(self, source, dest_path, merge_files=None, purge_files=None, field_map_data=None,
+                 primary_key=None, dedupe_on=None, sort_on=None, sort_ascending=None,
+                 gather_fields=None, gather_fields_overwrite=False, source_path=None,
+                 chunksize=MERGE_PURGE_CHUNKSIZE, read_kwargs=None, callback=None, workers=None):
+        """
+        :param source: (str, pd.DataFrame)
+            The source file path or DataFrame.
+        :param dest_path: (str)
+            The file path to write the results to.
+        :param merge_files: (list, dict, default None)
+            A list of file paths or a dictionary of {file_path: DataFrame} to merge.
+        :param purge_files: (list, dict, default None)
+            A list of file paths or a dictionary of {file_path: DataFrame} to purge with.
+        :param field_map_data: (dict, default None)
+            {purge_file_path: {purge_column: source_column}}
+            Purge files without a mapping are matched on :param dedupe_on.
+        :param primary_key: (str, default None)
+            The column to gather fields on.
+        :param dedupe_on: (list, default None)
+            The columns to dedupe on.
+        :param sort_on: (list, default None)
+            The columns to sort on.
+        :param sort_ascending: (list, default None)
+            A bool for each column in :param sort_on.
+        :param gather_fields: (list, default None)
+            Fields to update on the source from the merge files (by :param primary_key).
+            Merge file records without a match are appended.
+            None appends all merge file records to the source.
+        :param gather_fields_overwrite: (bool, default False)
+            True overwrites existing source values with gathered values.
+        :param source_path: (str, default None)
+            The source path to report - defaults to :param source if it's a path.
+        :param chunksize: (int, default MERGE_PURGE_CHUNKSIZE)
+            The number of rows to process at a time.
+        :param read_kwargs: (dict, default {'dtype': str})
+            Keyword arguments for superReadFile when reading file paths.
+        :param callback: (callable, default None)
+            Called like callback(stage, rows) when a stage starts and
+            after each chunk is processed.
+        :param workers: (int, default None)
+            The number of threads used to load purge files concurrently
+            and to read the next chunk while the current one is processed.
+            None uses the CPU count - 1 disables both.
+        """
+        self.source = source
+        self.source_path = source_path or (source if isinstance(source, str) else '')
+        self.dest_path = dest_path
+        self.merge_files = self._as_sources(merge_files)
+        self.purge_files = self._as_sources(purge_files)
+        self.field_map_data = field_map_data or {}
+        self.primary_key = primary_key or None
+        self.dedupe_on = list(dedupe_on or [])
+        self.sort_on = list(sort_on or [])
+        # The dialog's push grids hold 'True'/'False' strings.
+        self.sort_ascending = [a if isinstance(a, bool) else str(a).lower() == 'true'
+                               for a in sort_ascending or []]
+        self.gather_fields = list(gather_fields or [])
+        self.gather_fields_overwrite = gather_fields_overwrite
+        self.chunksize = chunksize
+        self.read_kwargs = {'dtype': str} if read_kwargs is None else read_kwargs
+        self.callback = callback
+        self.workers = workers or os.cpu_count() or 1
+
+        # Make sure ascending/sort_on lists are equal.
+        while len(self.sort_on) < len(self.sort_ascending):
+            self.sort_ascending.pop()
+        while len(self.sort_on) > len(self.sort_ascending):
+            self.sort_ascending.append(False)
+
+        self.columns = None
+        self.source_size = 0
+        self.final_size = 0
+        self.dedupe_lost = 0
+        self.merged_results = OrderedDict()
+        self.suppressed_results = OrderedDict()
+        self._purge_keys = OrderedDict()
+        self._gather_frames = OrderedDict()
+        self._dedupe_keys = KeySet()
+        self._gathered_keys = KeySet()
+        self._cancelled = False
+        self.stages = OrderedDict()
+
+    @classmethod
+    def from_config(cls, config, section='MERGE_PURGE', **kwargs):
+        """
+        Returns a MergePurgeEngine from the settings
+        MergePurgeDialog.get_settings() exports.
+
+        :param config: (DictConfig, SettingsINI)
+        :param section: (str, default 'MERGE_PURGE')
+        :param kwargs: MergePurgeEngine(**kwargs) overrides.
+        :return: (MergePurgeEngine)
+        """
+        settings = dict(source=config.get(section, 'source_path'),
+                        dest_path=config.get(section, 'dest_path'),
+                        primary_key=config.get(section, 'primary_key', fallback=None),
+                        dedupe_on=config.get_safe(section, 'dedupe_on', fallback=None),
+                        sort_on=config.get_safe(section, 'sort_on', fallback=None),
+                        sort_ascending=config.get_safe(section, 'sort_ascending', fallback=None),
+                        gather_fields=config.get_safe(section, 'gather_fields', fallback=None),
+                        gather_fields_overwrite=config.getboolean(section, 'gather_fields_overwrite',
+                                                                  fallback=False),
+                        merge_files=config.get_safe(section, 'merge_files', fallback=[]),
+                        purge_files=config.get_safe(section, 'purge_files', fallback=[]),
+                        field_map_data=config.get_safe(section, 'field_map_data', fallback={}))
+        settings.update(kwargs)
+        return cls(**settings)
+
+    @staticmethod
+    def _as_sources(files):
+        if files is None:
+            return OrderedDict()
+        if isinstance(files, dict):
+            return OrderedDict(files)
+        return OrderedDict((f, f) for f in files)
+
+    def read_chunks(self, source, usecols=None):
+        """
+        Yields DataFrame chunks from a file path or DataFrame.
+        :param source: (str, pd.DataFrame)
+        :param usecols: (list, default None)
+            An optional subset of columns to read.
+        :return: (generator)
+        """
+        if isinstance(source, pd.DataFrame):
+            if usecols is not None:
+                source = source.loc[:, usecols]
+            for chunk in dataframe_chunks(source, chunksize=self.chunksize):
+                yield chunk
+            return
+
+        kwargs = dict(self.read_kwargs)
+        if usecols is not None:
+            kwargs['usecols'] = usecols
+        if os.path.splitext(source)[1].lower() in EXCEL_EXTENSIONS:
+            # No chunked reader for excel files.
+            for chunk in dataframe_chunks(superReadFile(source, **kwargs), chunksize=self.chunksize):
+                yield chunk
+        else:
+            for chunk in superReadFile(source, chunksize=self.chunksize, **kwargs):
+                yield chunk
+
+    def read_columns(self, source):
+        """
+        Returns the column names of a file path or DataFrame.
+        """
+        if isinstance(source, pd.DataFrame):
+            return source.columns.tolist()
+        kwargs = dict(self.read_kwargs)
+        if os.path.splitext(source)[1].lower() not in EXCEL_EXTENSIONS:
+            kwargs['nrows'] = 0
+        return superReadFile(source, **kwargs).columns.tolist()
+
+    def get_output_columns(self):
+        """
+        Returns the union of the source & merge file columns (in order).
+        """
+        columns = self.read_columns(self.source)
+        for merge_source in self.merge_files.values():
+            columns.extend(c for c in self.read_columns(merge_source) if c not in columns)
+        return columns
+
+    def load_purge_keys(self):
+        """
+        Streams each purge file into a KeySet of hashed key columns.
+        Purge files are loaded concurrently when workers > 1.
+        :return: None
+        """
+        items = list(self.purge_files.items())
+        if self.workers > 1 and len(items) > 1:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                results = list(pool.map(lambda item: self.load_purge_file(*item), items))
+        else:
+            results = [self.load_purge_file(*item) for item in items]
+
+        for (file_path, purge_source), (key_cols, keys) in zip(items, results):
+            self._purge_keys[file_path] = (key_cols, keys)
+            self.suppressed_results[file_path] = 0
+            logging.info("Loaded {} suppression keys from {}".format(len(keys), file_path))
+
+    def load_purge_file(self, file_path, purge_source):
+        """
+        Reads the key columns of a purge file into a KeySet.
+        :param file_path: (str)
+        :param purge_source: (str, pd.DataFrame)
+        :return: (list, KeySet)
+            The source key columns and the KeySet of hashed keys.
+        """
+        map_dict = self.field_map_data.get(file_path, {})
+        if map_dict:
+            # A mapping exists - read the purge columns, match on the source columns.
+            read_cols, key_cols = list(map_dict.keys()), list(map_dict.values())
+        else:
+            # No mapping exists - Try to use the dedupe_on cols as key_cols
+            read_cols = key_cols = self.dedupe_on.copy()
+            missing = [x for x in key_cols if x not in self.read_columns(purge_source)]
+            if missing or not key_cols:
+                raise KeyError("Suppression file {} must have a field mapping or \
+                                have the dedupe column labels, it has neither!.".format(file_path))
+        keys = KeySet()
+        for chunk in self.read_chunks(purge_source, usecols=read_cols):
+            keys.add(dataframe_key_hashes(chunk, read_cols))
+            self.tick('load_purge_keys', len(keys))
+        return key_cols, keys
+
+    def load_gather_frames(self):
+        """
+        Indexes each merge file by the primary key for gathering fields.
+        Only the primary key and gather_fields columns are read into the lookup -
+        unmatched merge records are streamed again later by iter_merged_chunks.
+        :return: None
+        """
+        for file_path, merge_source in self.merge_files.items():
+            columns = self.read_columns(merge_source)
+            assert self.primary_key in columns, "DataFrameModel for {} missing column {}".format(
+                                                 file_path, self.primary_key)
+            usecols = [self.primary_key] + [f for f in self.gather_fields
+                                            if f in columns and f != self.primary_key]
+            chunks = list(self.read_chunks(merge_source, usecols=usecols))
+            other_df = pd.concat(chunks) if chunks else pd.DataFrame(columns=usecols)
+            del chunks
+            # First record per key wins - the index's hash table is built once and reused for every chunk.
+            other_df = other_df.loc[~other_df[self.primary_key].duplicated(keep='first'), :]
+            other_df = other_df.set_index(self.primary_key, drop=False)
+            self._gather_frames[file_path] = other_df
+            self.merged_results[file_path] = 0
+
+    def gather(self, chunk, after=None):
+        """
+        Updates the chunk's gather_fields from each merge file.
+        :param chunk: (pd.DataFrame)
+        :param after: (str, default None)
+            Only gather from merge files after this one.
+        :return: (pd.DataFrame)
+        """
+        paths = list(self._gather_frames.keys())
+        if after is not None:
+            paths = paths[paths.index(after) + 1:]
+        chunk = chunk.copy()
+        for file_path in paths:
+            chunk = gather_frame_fields(chunk, self._gather_frames[file_path],
+                                        index_label=self.primary_key, fields=self.gather_fields,
+                                        append_missing=False, overwrite=self.gather_fields_overwrite)
+        return chunk
+
+    def purge(self, chunk):
+        """
+        Drops rows of the chunk that have keys in any of the purge files.
+        :param chunk: (pd.DataFrame)
+        :return: (pd.DataFrame)
+        """
+        if not self._purge_keys or chunk.empty:
+            return chunk
+        others = OrderedDict((p, keys) for p, (cols, keys) in self._purge_keys.items())
+        key_cols = {p: cols for p, (cols, keys) in self._purge_keys.items()}
+        keep, counts = dataframe_anti_join(chunk, others, key_cols)
+        for file_path, count in counts.items():
+            self.suppressed_results[file_path] += count
+        return chunk.loc[keep, :]
+
+    def dedupe(self, chunk):
+        """
+        Drops rows of the chunk with dedupe_on keys that have already been seen.
+        :param chunk: (pd.DataFrame)
+        :return: (pd.DataFrame)
+        """
+        if not self.dedupe_on or chunk.empty:
+            return chunk
+        new = self._dedupe_keys.first_seen(dataframe_key_hashes(chunk, self.dedupe_on))
+        self.dedupe_lost += int((~new).sum())
+        return chunk.loc[new, :]
+
+    def iter_merged_chunks(self):
+        """
+        Yields source chunks followed by merge file chunks.
+        Fields are gathered onto source chunks and only
+        unmatched merge records are appended when gather_fields are set.
+        """
+        for chunk in self.read_chunks(self.source):
+            self.source_size += chunk.index.size
+            if self._gather_frames:
+                chunk = self.gather(chunk)
+                self._gathered_keys.add(dataframe_key_hashes(chunk, [self.primary_key]))
+            yield chunk
+
+        for file_path, merge_source in self.merge_files.items():
+            self.merged_results[file_path] = 0
+            for chunk in self.read_chunks(merge_source):
+                if self._gather_frames:
+                    new = self._gathered_keys.first_seen(dataframe_key_hashes(chunk, [self.primary_key]))
+                    chunk = self.gather(chunk.loc[new, :], after=file_path)
+                self.merged_results[file_path] += chunk.index.size
+                yield chunk
+
+    def prefetch(self, chunks):
+        """
+        Reads the next chunk on a background thread while the
+        caller processes the current one (when workers > 1).
+        :param chunks: (iterable)
+        :return: (generator)
+        """
+        if self.workers <= 1:
+            for chunk in chunks:
+                yield chunk
+            return
+        chunks = iter(chunks)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            future = pool.submit(next, chunks, None)
+            while True:
+                chunk = future.result()
+                if chunk is None:
+                    return
+                future = pool.submit(next, chunks, None)
+                yield chunk
+
+    def sort(self, df):
+        """
+        Sorts the DataFrame by sort_on/sort_ascending.
+        Columns that are numeric (even when read as strings) sort numerically.
+        """
+        def sort_key(series):
+            try:
+                return pd.to_numeric(series)
+            except (TypeError, ValueError):
+                return series
+        return df.sort_values(self.sort_on, ascending=self.sort_ascending, key=sort_key, kind='mergesort')
+
+    def cancel(self):
+        """
+        Asks a running job to stop - execute raises MergePurgeCancelled
+        after the current chunk. Safe to call from another thread.
+        :return: None
+        """
+        self._cancelled = True
+
+    def tick(self, stage, rows=0):
+        """
+        Reports progress to the callback and stops the job if it's been cancelled.
+        :param stage: (str)
+        :param rows: (int, default 0)
+        :return: None
+        """
+        if self._cancelled:
+            raise MergePurgeCancelled("Merge/purge cancelled during {}".format(stage))
+        if self.callback is not None:
+            self.callback(stage, rows)
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Records the wall time and the peak memory at the end of a stage.
+        :param name: (str)
+        """
+        self.tick(name)
+        begin = time.perf_counter()
+        yield
+        self.stages[name] = dict(seconds=time.perf_counter() - begin, peak_mb=peak_memory_mb())
+
+    def execute(self):
+        """
+        Runs the merge/purge and writes the destination file & report.
+        The destination file is removed if the job fails or is cancelled.
+        :return: (str)
+            The report file path.
+        """
+        try:
+            self._execute()
+        except BaseException:
+            if os.path.exists(self.dest_path):
+                os.remove(self.dest_path)
+            raise
+        logging.info("Exported: {}".format(self.dest_path))
+        return self.write_report()
+
+    def _execute(self):
+        self.columns = self.get_output_columns()
+        with self.stage('load_purge_keys'):
+            self.load_purge_keys()
+        if self.gather_fields and self.merge_files:
+            with self.stage('load_merge_files'):
+                self.load_gather_frames()
+
+        collected = []
+        processed = 0
+        with open(self.dest_path, 'w', newline='') as fh:
+            header = True
+            with self.stage('merge_purge'):
+                for chunk in self.prefetch(self.iter_merged_chunks()):
+                    processed += chunk.index.size
+                    chunk = self.purge(chunk.reindex(columns=self.columns))
+                    if self.sort_on:
+                        collected.append(chunk)
+                    else:
+                        header = self.write(self.dedupe(chunk), fh, header)
+                    self.tick('merge_purge', processed)
+
+            if self.sort_on:
+                with self.stage('sort'):
+                    df = pd.concat(collected) if collected else pd.DataFrame(columns=self.columns)
+                    del collected
+                    df = self.sort(df)
+                with self.stage('export'):
+                    for chunk in dataframe_chunks(df, chunksize=self.chunksize):
+                        header = self.write(self.dedupe(chunk), fh, header)
+                        self.tick('export', self.final_size)
+
+            if header:
+                # Nothing was written - still give the file a header.
+                pd.DataFrame(columns=self.columns).to_csv(fh, index=False)
+
+    def write(self, chunk, fh, header):
+        """
+        Appends a chunk to the open destination file.
+        :return: (bool) False - the header has been written.
+        """
+        chunk.to_csv(fh, index=False, header=header)
+        self.final_size += chunk.index.size
+        return False
+
+    def report(self):
+        """
+        Returns the merge/purge report text.
+        """
+        merge_string = "\n".join("Gained {} merging {}".format(v, k) for k, v in self.merged_results.items())
+        suppress_string = "\n".join("Lost {} suppressing {}".format(v, k) for k, v in self.suppressed_results.items())
+        stage_string = "\n".join("{}: {:.2f} seconds, peak memory {}".format(
+                                  k, v['seconds'], 'n/a' if v['peak_mb'] is None else "{:,.1f} MB".format(v['peak_mb']))
+                                  for k, v in self.stages.items())
+        return REPORT_TEMPLATE.format(self.source_size, self.final_size, self.source_path,
+                                      self.dest_path, merge_string, suppress_string,
+                                      self.sort_on, self.sort_ascending, self.dedupe_on, self.dedupe_lost,
+                                      stage_string)
+
+    def write_report(self, report_path=None):
+        """
+        Writes the report next to the destination file.
+        :return: (str) The report file path.
+        """
+        if report_path is None:
+            report_path = os.path.splitext(self.dest_path)[0] + "_report.txt"
+        with open(report_path, "w") as fh:
+            fh.write(self.report())
+        return report_path
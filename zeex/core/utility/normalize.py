@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+MIT License
+
+Copyright (c) 2016 Zeke Barge
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+import zeex.core.utility.pandatools as pandatools
+
+
+def _setting(settings, key, fallback=None):
+    value = settings.get(key, fallback)
+    return fallback if value is None else value
+
+
+class NormalizePlan(object):
+    """
+    Compiles column normalization settings into a single
+    fused transform that is applied to each column in one pass.
+
+    The string operations run in this order:
+        - Scrub line breaks
+        - Trim spaces
+        - Remove special characters
+        - Replace spaces
+        - Set case
+
+    Each column is factorized first so the fused transform only
+    runs once per unique value. Columns are processed in a thread pool.
+    Drop/fill NA runs before the string operations and merge/split runs after.
+    """
+    def __init__(self, columns=None, scrub_linebreaks=False, trim_spaces=False,
+                 remove_special_chars=False, remove_special_chars_keeps='',
+                 replace_spaces=None, case=None, drop_or_fill=None,
+                 drop_or_fill_how='any', drop_or_fill_with='',
+                 merge_or_split=None, merge_or_split_sep='', max_workers=None):
+        """
+        :param columns: (list, default None)
+            The columns to normalize. None normalizes all object columns.
+        :param scrub_linebreaks: (bool, default False)
+            Replaces line breaks & tabs with spaces.
+        :param trim_spaces: (bool, default False)
+            Strips leading/trailing whitespace.
+        :param remove_special_chars: (bool, default False)
+            Removes all non-alphanumeric characters.
+        :param remove_special_chars_keeps: (str, default '')
+            Special characters to keep when remove_special_chars is True.
+        :param replace_spaces: (str, default None)
+            Replaces spaces with this string. None does nothing.
+        :param case: (str, default None)
+            'lower', 'upper', or 'proper'. None leaves the case alone.
+        :param drop_or_fill: (str, default None)
+            'drop' drops NA rows, 'fill' fills NA cells. None does nothing.
+        :param drop_or_fill_how: (str, default 'any')
+            'any' or 'all' - how to drop NA rows across columns.
+        :param drop_or_fill_with: (str, default '')
+            The value to fill NA cells with.
+        :param merge_or_split: (str, default None)
+            'merge' merges the columns into one, 'split' splits the first column.
+        :param merge_or_split_sep: (str, default '')
+            The separator to merge or split on.
+        :param max_workers: (int, default None)
+            The number of threads to normalize columns with.
+            None uses one per column up to the CPU count.
+        :return: None
+        """
+        self.columns = columns
+        self.scrub_linebreaks = scrub_linebreaks
+        self.trim_spaces = trim_spaces
+        self.remove_special_chars = remove_special_chars
+        self.remove_special_chars_keeps = [e for e in remove_special_chars_keeps or ''
+                                           if not e.isalnum()]
+        self.replace_spaces = replace_spaces
+        self.case = str(case).lower() if case not in (None, '', 'default') else None
+        self.drop_or_fill = str(drop_or_fill).lower() if drop_or_fill else None
+        self.drop_or_fill_how = drop_or_fill_how
+        self.drop_or_fill_with = drop_or_fill_with
+        self.merge_or_split = str(merge_or_split).lower() if merge_or_split else None
+        self.merge_or_split_sep = merge_or_split_sep
+        self.max_workers = max_workers
+        self.steps = self.compile()
+
+    @classmethod
+    def from_settings(cls, settings: dict, **kwargs):
+        """
+        Returns a NormalizePlan from a dictionary like
+        ColumnNormalizerDialog.get_settings() returns.
+        """
+        s = settings
+        active = lambda k: bool(_setting(s, '{}_active'.format(k), False))
+        return cls(columns=_setting(s, 'columns', []) or None,
+                   scrub_linebreaks=active('scrub_linebreaks'),
+                   trim_spaces=active('trim_spaces'),
+                   remove_special_chars=active('remove_special_chars'),
+                   remove_special_chars_keeps=_setting(s, 'remove_special_chars_keeps', ''),
+                   replace_spaces=_setting(s, 'replace_spaces', '') if active('replace_spaces') else None,
+                   case=_setting(s, 'case') if active('case') else None,
+                   drop_or_fill=_setting(s, 'drop_or_fill') if active('drop_or_fill') else None,
+                   drop_or_fill_how=_setting(s, 'drop_or_fill_how', 'any'),
+                   drop_or_fill_with=_setting(s, 'drop_or_fill_with', ''),
+                   merge_or_split=_setting(s, 'merge_or_split') if active('merge_or_split') else None,
+                   merge_or_split_sep=_setting(s, 'merge_or_split_sep', ''),
+                   **kwargs)
+
+    @classmethod
+    def from_config(cls, config, section='NORMALIZE', **kwargs):
+        """
+        Returns a NormalizePlan from a DictConfig/SettingsINI section.
+        """
+        flags = ['case_active', 'merge_or_split_active', 'replace_spaces_active',
+                 'trim_spaces_active', 'drop_or_fill_active',
+                 'remove_special_chars_active', 'scrub_linebreaks_active']
+        options = ['case', 'drop_or_fill', 'drop_or_fill_how', 'drop_or_fill_with',
+                   'remove_special_chars_keeps', 'merge_or_split',
+                   'merge_or_split_sep', 'replace_spaces']
+        settings = {f: config.getboolean(section, f, fallback=False) for f in flags}
+        settings.update({o: config.get_safe(section, o, fallback=None) for o in options})
+        settings['columns'] = config.get_safe(section, 'columns', fallback=[])
+        return cls.from_settings(settings, **kwargs)
+
+    def compile(self):
+        """
+        Builds the list of scalar string operations
+        to be fused into one transform.
+        :return: (list)
+        """
+        steps = []
+        if self.scrub_linebreaks:
+            breaks_rx = pandatools.LINE_BREAKS_RX
+            steps.append(lambda x: pandatools.string_blank_na(breaks_rx.sub(' ', x).strip()))
+        if self.trim_spaces:
+            steps.append(lambda x: pandatools.string_blank_na(x.strip()))
+        if self.remove_special_chars:
+            special_rx = pandatools.special_chars_regex(self.remove_special_chars_keeps)
+            steps.append(lambda x: special_rx.sub('', x))
+        if self.replace_spaces is not None:
+            replace_with = self.replace_spaces
+            steps.append(lambda x: x.replace(' ', replace_with))
+        if self.case is not None:
+            steps.append(pandatools.case_map.get(self.case, pandatools.case_map['default']))
+        return steps
+
+    @property
+    def null_value(self):
+        """
+        The value null cells end up with after the transform.
+        The blanking operations (scrub linebreaks, trim spaces, remove special
+        characters) turn nulls into ''. The others leave them as NaN - they
+        used to stringify them ('nan', or 'NAN' with upper case).
+        """
+        if self.scrub_linebreaks or self.trim_spaces or self.remove_special_chars:
+            return ''
+        return np.nan
+
+    def fused(self, x):
+        """
+        Runs every compiled step on a single (non-null) value.
+        NormalizePlan.transform never passes nulls - see NormalizePlan.null_value.
+        """
+        x = str(x)
+        for step in self.steps:
+            x = step(x)
+        return x
+
+    def transform(self, series: pd.Series):
+        """
+        Applies the fused transform to a Series.
+        The transform runs once per unique value and
+        the results are broadcast back with the factorized codes.
+        :param series: (pd.Series)
+        :return: (pd.Series)
+        """
+        if not self.steps:
+            return series
+        codes, uniques = pd.factorize(series)
+        # Null cells have code -1 which picks up the trailing null_value.
+        values = np.empty(len(uniques) + 1, dtype=object)
+        values[:-1] = [self.fused(x) for x in uniques]
+        values[-1] = self.null_value
+        return pd.Series(values[codes], index=series.index, name=series.name)
+
+    def _drop_or_fill(self, df, columns):
+        if 'drop' in self.drop_or_fill:
+            frame = df.loc[:, columns]
+            if self.drop_or_fill_how == 'any':
+                drop = (frame.isnull() | frame.isin([''])).any(axis=1)
+            else:
+                drop = frame.isnull().all(axis=1)
+            df = df.take(np.flatnonzero(~drop.values))
+        else:
+            value = self.drop_or_fill_with
+            for dtype in (int, float):
+                try:
+                    value = dtype(value)
+                    break
+                except (TypeError, ValueError):
+                    pass
+            df.loc[:, columns] = df.loc[:, columns].fillna(value=value)
+        return df
+
+    def _merge_or_split(self, df, columns):
+        if self.merge_or_split == 'merge':
+            frame = pandatools.dataframe_merge_to_series(df, columns, sep=self.merge_or_split_sep).to_frame()
+        elif self.merge_or_split == 'split':
+            frame = pandatools.series_split(df.loc[:, columns[0]], sep=self.merge_or_split_sep)
+        else:
+            return df
+        df = pd.merge(df, frame, left_index=True, right_index=True)
+        df.columns = pandatools.rename_dupe_cols(df.columns)
+        return df
+
+    def apply(self, df: pd.DataFrame):
+        """
+        Applies the plan to a DataFrame.
+        :param df: (pd.DataFrame)
+        :return: (pd.DataFrame)
+            The updated DataFrame - it may be a new object if rows were dropped
+            or columns were merged/split.
+        """
+        columns = self.columns
+        if not columns:
+            columns = [c for c in df.columns if str(df[c].dtype) == 'object']
+
+        if self.drop_or_fill:
+            df = self._drop_or_fill(df, columns)
+
+        if self.steps and columns:
+            workers = self.max_workers or min(len(columns), os.cpu_count() or 1)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(self.transform, [df.loc[:, c] for c in columns]))
+            for c, series in zip(columns, results):
+                df[c] = series
+
+        if self.merge_or_split:
+            df = self._merge_or_split(df, columns)
+
+        return df
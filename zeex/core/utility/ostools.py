@@ -33,7 +33,27 @@ try:
     DEFAULT_COMPRESSION = zipfile.ZIP_DEFLATED
 except ImportError:
     DEFAULT_COMPRESSION = zipfile.ZIP_STORED
-from zeex.core.compat import QtGui
+
+def path_increment(p):
+    """
+    Increments a file path by 1 whether it exists or not.
+    :param p: (str)
+        The file path to increment
+    :return: (str)
+        file.csv -> file2.csv, file2.csv -> file3.csv
+    """
+    dirname = os.path.dirname(p)
+    name, ext = os.path.splitext(os.path.basename(p))
+    val = ''.join(e for e in str(name)[-3:] if e.isdigit())
+    if val:
+        count = int(val) + 1
+        name = name.replace(val, str(count))
+        if str(count) not in name:
+            name = "{}{}".format(name, count)
+    else:
+        name = "{}{}".format(name, 2)
+    return os.path.join(dirname, name + ext)
+
 
 def path_incremented(p, overwrite=False):
     """
@@ -48,23 +68,11 @@ def path_incremented(p, overwrite=False):
         The original file path if it doesn't exist.
         The file path incremented by 1 until it doesn't exist.
     """
-    dirname = os.path.dirname(p)
-    error = 2
+    tries = 0
     while os.path.exists(p):
-        name = os.path.basename(p)
-        name, ext = os.path.splitext(name)
-
-        try:
-            val = ''.join(e for e in str(name)[-3:] if e.isdigit())
-            count = int(val) + 1
-            name = name.replace(val, str(count))
-            if str(count) not in name:
-                name = "{}{}".format(name, count)
-        except ValueError:
-            name = "{}{}".format(name, error)
-            error += 1
-        p = os.path.join(dirname, name + ext)
-        if overwrite is True or error > 2500:
+        p = path_increment(p)
+        tries += 1
+        if overwrite is True or tries > 2500:
             break
     return p
 
@@ -152,6 +160,7 @@ def zipfile_compress(from_path, to=None, **kwargs):
 
 def zipfile_unzip(file_path=None, extract_dir=None, **filedialog_kwargs):
     if file_path is None:
+        from zeex.core.compat import QtGui
         file_path = QtGui.QFileDialog.getOpenFileName(**filedialog_kwargs)[0]
     if extract_dir is None:
         extract_dir = os.path.dirname(file_path)
@@ -24,13 +24,23 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
+import io
 import re
 import os
+import bz2
+import gzip
+import lzma
+import codecs
+import hashlib
+import zipfile
 import logging
 import datetime
+from collections import OrderedDict
+from concurrent.futures import (ThreadPoolExecutor, ProcessPoolExecutor,
+                                wait as wait_futures, FIRST_COMPLETED)
 import pandas as pd
 import numpy as np
-from zeex.core.utility.ostools import path_incremented
+from zeex.core.utility.ostools import path_increment
 
 
 NA_VALUES = ['nan', 'na', 'none', 'null']
@@ -41,8 +51,25 @@ def string_blank_na(x, value=''):
                                    else x)
 
 
+def _na_mask(strings: pd.Series):
+    """
+    Returns a boolean mask of the cells in a Series of strings
+    that match NA_VALUES (case insensitive).
+    """
+    return strings.str.lower().isin(NA_VALUES)
+
+
 def series_blank_na(series, value=''):
-    return series.apply(string_blank_na, args=[[value]])
+    """
+    Vectorized string_blank_na.
+    Replaces null cells and cells matching NA_VALUES with :param value.
+    """
+    mask = series.isnull() | _na_mask(series.astype(str))
+    if not mask.any():
+        return series
+    series = series.astype(object)
+    series[mask.values] = value
+    return series
 
 
 def force_int(integer):
@@ -53,6 +80,21 @@ def force_int(integer):
         return 0
 
 
+def dataframe_chunk_bounds(size, chunksize=None):
+    """
+    Returns the (start, stop) row positions of each chunk.
+
+    :param size: (int)
+        The number of rows to chunk.
+    :param chunksize: (int, default None)
+        The max rows for each chunk.
+    :return: list((start, stop))
+    """
+    if chunksize is None or chunksize <= 0 or chunksize >= size:
+        return [(0, size)]
+    return [(start, min(start + chunksize, size)) for start in range(0, size, chunksize)]
+
+
 def dataframe_chunks(df, chunksize=None):
     """
     Yields chunks from a dataframe as large as chunksize until
@@ -67,10 +109,34 @@ def dataframe_chunks(df, chunksize=None):
     if chunksize is None or chunksize <= 0 or chunksize >= df.index.size:
         yield df
     else:
-        while df.index.size > 0:
-            take = df.iloc[0: chunksize]
-            df = df.iloc[chunksize: df.index.size]
-            yield take
+        for start, stop in dataframe_chunk_bounds(df.index.size, chunksize):
+            yield df.iloc[start:stop]
+
+
+def dataframe_collect_chunks(chunks, callback=None):
+    """
+    Collects an iterable of DataFrame chunks into one DataFrame
+    with a single concatenation at the end (rather than
+    re-copying the growing frame on every chunk).
+
+    :param chunks: (iterable)
+        Yields pd.DataFrame chunks (a pd.read_csv chunk reader or a generator).
+    :param callback: (callable, default None)
+        Called after each chunk like callback(chunk_count, row_count).
+        Returning False stops reading more chunks.
+    :return: (pd.DataFrame)
+    """
+    frames, rows = [], 0
+    for count, chunk in enumerate(chunks, start=1):
+        frames.append(chunk)
+        rows += chunk.index.size
+        if callback is not None and callback(count, rows) is False:
+            break
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, copy=False)
 
 
 def dataframe_export(df, filepath, **kwargs):
@@ -88,7 +154,7 @@ def dataframe_export(df, filepath, **kwargs):
     """
     filebase, ext = os.path.splitext(filepath)
     ext = ext.lower()
-    if ext is '.xlsx':
+    if ext == '.xlsx':
         df.to_excel(filepath, **kwargs)
     elif ext in ['.txt','.csv']:
         df.to_csv(filepath, **kwargs)
@@ -96,9 +162,94 @@ def dataframe_export(df, filepath, **kwargs):
         raise NotImplementedError("Not sure how to export '{}' files.".format(ext))
 
 
-def dataframe_export_chunks(df, filepath, max_size=None, overwrite=True, **kwargs):
+EXPORT_BUFFER_SIZE = 1024 * 1024
+EXPORT_CHECKSUM = 'md5'
+
+
+class _ChecksumWriter(io.RawIOBase):
+    """
+    Counts and hashes the bytes written through it to a file handle.
+    """
+    def __init__(self, fh, checksum=EXPORT_CHECKSUM):
+        io.RawIOBase.__init__(self)
+        self.fh = fh
+        self.hash = hashlib.new(checksum)
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.hash.update(b)
+        self.size += len(b)
+        return self.fh.write(b)
+
+
+def _file_checksum(filepath, checksum=EXPORT_CHECKSUM):
+    digest = hashlib.new(checksum)
+    with open(filepath, 'rb') as fh:
+        for block in iter(lambda: fh.read(EXPORT_BUFFER_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _export_chunk(chunk, filepath, compression=None, kwargs=None):
+    """
+    Writes one chunk and returns its manifest entry.
+    CSV/text chunks are streamed through a buffered (optionally gzip) writer
+    that computes the checksum as it goes.
+    """
+    kwargs = dict(kwargs or {})
+    base, ext = os.path.splitext(filepath.lower())
+    if ext == '.gz':
+        ext = os.path.splitext(base)[1]
+
+    if ext not in ['.txt', '.csv']:
+        dataframe_export(chunk, filepath, **kwargs)
+        return dict(path=filepath, rows=chunk.index.size,
+                    bytes=os.path.getsize(filepath), checksum=_file_checksum(filepath))
+
+    encoding = kwargs.pop('encoding', None) or 'utf-8'
+    with open(filepath, 'wb') as fh:
+        counter = _ChecksumWriter(fh)
+        buffered = io.BufferedWriter(counter, buffer_size=EXPORT_BUFFER_SIZE)
+        stream = buffered
+        if compression == 'gzip':
+            stream = gzip.GzipFile(filename='', fileobj=buffered, mode='wb',
+                                   compresslevel=kwargs.pop('compresslevel', 6))
+        text = io.TextIOWrapper(stream, encoding=encoding, newline='')
+        chunk.to_csv(text, **kwargs)
+        text.flush()
+        text.detach()
+        if stream is not buffered:
+            stream.close()
+        buffered.close()
+    return dict(path=filepath, rows=chunk.index.size,
+                bytes=counter.size, checksum=counter.hash.hexdigest())
+
+
+def dataframe_export_paths(filepath, count, overwrite=True):
+    """
+    Returns the :param count filepaths dataframe_export_chunks will write to.
+    Each path after the first is the previous one incremented by 1.
+    :param overwrite: (bool, default True)
+        False skips paths that already exist.
+    """
+    paths = [filepath]
+    while len(paths) < count:
+        p = path_increment(paths[-1])
+        while overwrite is not True and os.path.exists(p):
+            p = path_increment(p)
+        paths.append(p)
+    return paths
+
+
+def dataframe_export_chunks(df, filepath, max_size=None, overwrite=True, workers=None,
+                            compression=None, manifest=False, processes=False, **kwargs):
     """
     Exports a dataframe into chunks and returns the filepaths.
+    The chunk boundaries are computed up front and chunks are
+    written in parallel worker threads (or processes).
 
     :param df: (pd.DataFrame)
         The DataFrame to export in chunks.
@@ -106,42 +257,226 @@ def dataframe_export_chunks(df, filepath, max_size=None, overwrite=True, **kwarg
         The base filepath (will be incremented by 1 for each export)
     :param max_size: (int, default None)
         The max size of each dataframe to export.
+    :param workers: (int, default None)
+        The max # of workers (None uses the CPU count).
+        1 writes each chunk in this thread.
+    :param compression: (str, default None)
+        'gzip' compresses csv/txt chunks and adds the .gz extension.
+        Inferred when :param filepath ends with .gz.
+    :param manifest: (bool, default False)
+        True returns a manifest entry for each chunk rather than just the paths:
+        dict(path=str, rows=int, bytes=int, checksum=str (md5 hex digest))
+    :param processes: (bool, default False)
+        True writes chunks in worker processes - each chunk is pickled to its process.
+        Frozen apps must call multiprocessing.freeze_support() at startup to use this.
     :param kwargs: (pd.to_csv/pd.to_excel kwargs)
         Look at pandas documentation for kwargs.
-    :return: list(filepaths exported)
+    :return: list(filepaths exported) or list(dict) when :param manifest is True.
     """
-    paths = []
-    for chunk in dataframe_chunks(df, chunksize=max_size):
-        dataframe_export(chunk, filepath, **kwargs)
-        paths.append(filepath)
-        filepath = path_incremented(filepath, overwrite=overwrite)
+    if filepath.lower().endswith('.gz'):
+        compression = 'gzip'
+        filepath = filepath[:-3]
+
+    bounds = dataframe_chunk_bounds(df.index.size, max_size)
+    paths = dataframe_export_paths(filepath, len(bounds), overwrite=overwrite)
+    if compression == 'gzip':
+        paths = [p + '.gz' for p in paths]
+
+    chunks = (df.iloc[start:stop] for start, stop in bounds)
+    count = len(paths)
+    if workers is None:
+        workers = min(count, os.cpu_count() or 1)
+
+    if workers <= 1 or count == 1:
+        results = [_export_chunk(c, p, compression, kwargs) for c, p in zip(chunks, paths)]
+    else:
+        # Only a few chunks are queued at a time so they aren't all pickled at once.
+        results, pending = [None] * count, {}
+        executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        with executor(max_workers=workers) as pool:
+            for i, (chunk, path) in enumerate(zip(chunks, paths)):
+                if len(pending) >= workers * 2:
+                    done, _ = wait_futures(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        results[pending.pop(future)] = future.result()
+                pending[pool.submit(_export_chunk, chunk, path, compression, kwargs)] = i
+            for future in wait_futures(pending)[0]:
+                results[pending[future]] = future.result()
+
+    if manifest:
+        return results
+    return [r['path'] for r in results]
+
+
+SNIFF_SAMPLE_SIZE = 1024 * 1024
+SNIFF_CODECS = ['utf8', 'utf-16', 'utf-32', 'iso-8859-1']
+SNIFF_SEPS = ['|', ';', ',', '\t', ':']
+SNIFF_BOMS = [(codecs.BOM_UTF32_LE, 'utf-32'),
+              (codecs.BOM_UTF32_BE, 'utf-32'),
+              (codecs.BOM_UTF8, 'utf-8-sig'),
+              (codecs.BOM_UTF16_LE, 'utf-16'),
+              (codecs.BOM_UTF16_BE, 'utf-16')]
+SNIFF_OPENERS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+
+def _read_sample(filepath, size=SNIFF_SAMPLE_SIZE):
+    """
+    Reads up to :param size bytes from the (decompressed) start of a file.
+    .zip archives are sampled from their first member.
+    """
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext == '.zip':
+        with zipfile.ZipFile(filepath) as zf:
+            with zf.open(zf.namelist()[0]) as fh:
+                return fh.read(size)
+    opener = SNIFF_OPENERS.get(ext, open)
+    with opener(filepath, 'rb') as fh:
+        return fh.read(size)
 
-    return paths
+
+def _decodes(sample, codec):
+    """
+    True if the byte sample decodes with the codec.
+    A multi-byte character cut off at the end of the sample is not an error.
+    """
+    try:
+        codecs.getincrementaldecoder(codec)().decode(sample, final=False)
+        return True
+    except (UnicodeError, LookupError):
+        return False
+
+
+def sniff_encoding(sample, first_codec='utf8'):
+    """
+    Identifies the codec of a byte sample.
+    A byte-order-mark always wins, otherwise :param first_codec
+    is tried before the codecs in SNIFF_CODECS.
+
+    :param sample: (bytes)
+        The first bytes of a file.
+    :param first_codec: (str, default 'utf8')
+        The codec to try first.
+    :return: (str)
+        The codec name.
+    """
+    for bom, codec in SNIFF_BOMS:
+        if sample.startswith(bom):
+            return codec
+    candidates = [first_codec] + [c for c in SNIFF_CODECS if c != first_codec]
+    if b'\x00' not in sample:
+        # UTF-16/32 text (without a BOM) is full of null bytes,
+        # don't let a lucky decode pick them for plain text.
+        candidates = [c for c in candidates if c.replace('_', '-').lower()
+                      not in ('utf-16', 'utf-32')]
+    for codec in candidates:
+        if _decodes(sample, codec):
+            return codec
+    return 'iso-8859-1'
+
+
+def sniff_sep(header, maybe_seps=None):
+    """
+    Counts supported separators in a header line and returns the most frequent.
+
+    :param header: (str)
+        The first line of a text file.
+    :param maybe_seps: (list, default SNIFF_SEPS)
+        The separators to count.
+    :return: (str)
+        The separator.
+    """
+    if maybe_seps is None:
+        maybe_seps = SNIFF_SEPS
+    count_seps_header = {sep: _count(sep, header) for sep in maybe_seps}
+    count_seps_header = {sep: count for sep, count in count_seps_header.items() if count > 0}
+
+    if count_seps_header:
+        return max(count_seps_header.__iter__(),
+                   key=(lambda key: count_seps_header[key]))
+    else:
+        raise Exception("Couldn't identify the sep from the header... here's the information:\n HEADER: {}\n SEPS SEARCHED: {}".format(header, maybe_seps))
+
+
+def sniff_file(filepath, first_codec='utf8', sample_size=SNIFF_SAMPLE_SIZE, sep=True):
+    """
+    Reads one bounded sample from the start of a file and
+    identifies the codec and (optionally) the column separator.
+    The file is only opened once no matter how many guesses are made.
+
+    :param filepath: (str)
+        The file to sniff.
+    :param first_codec: (str, default 'utf8')
+        The codec to try first (a byte-order-mark overrides this).
+    :param sample_size: (int, default 1MB)
+        The max number of bytes to read.
+    :param sep: (bool, default True)
+        True identifies the separator from the header line.
+    :return: (dict)
+        {'encoding': codec, 'sep': separator or None}
+    """
+    sample = _read_sample(filepath, size=sample_size)
+    encoding = sniff_encoding(sample, first_codec=first_codec)
+    found_sep = None
+    if sep:
+        text = codecs.getincrementaldecoder(encoding)(errors='replace').decode(sample, final=False)
+        found_sep = sniff_sep(text.lstrip('\ufeff').splitlines()[0] if text else '')
+    return dict(encoding=encoding, sep=found_sep)
+
+
+def estimate_row_count(filepath, sample_size=SNIFF_SAMPLE_SIZE):
+    """
+    Estimates the number of lines in a text file from the
+    average line length of a sample at the start of the file.
+
+    :param filepath: (str)
+        The file to estimate.
+    :param sample_size: (int, default 1MB)
+        The max number of bytes to sample.
+    :return: (int, None)
+        The estimated line count or None for compressed/empty files.
+    """
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext in SNIFF_OPENERS or ext == '.zip':
+        return None
+    sample = _read_sample(filepath, size=sample_size)
+    lines = sample.count(b'\n')
+    if not sample:
+        return None
+    if lines == 0 or len(sample) < sample_size:
+        return max(lines, 1)
+    return int(os.path.getsize(filepath) / (len(sample) / lines))
 
 
 def superReadCSV(filepath, first_codec='utf8', verbose=False, **kwargs):
-        """ A wrap to pandas read_csv with mods to accept a dataframe or filepath. returns dataframe untouched, reads filepath and returns dataframe based on arguments."""
+        """
+        A wrap to pandas read_csv with mods to accept a dataframe or filepath.
+        returns dataframe untouched, reads filepath and returns dataframe based on arguments.
+
+        Unless an encoding is passed, the codec is sniffed from a
+        sample at the start of the file so the file is parsed once.
+        """
         if isinstance(filepath, pd.DataFrame):
             return filepath
         assert isinstance(first_codec, str), "first_codec parameter must be a string"
         kwargs['sep'] = kwargs.get('sep', ',')
         kwargs['low_memory'] = kwargs.get('low_memory', False)
-        codecs = list(set([first_codec] + ['utf8', 'iso-8859-1', 'ascii', 'utf-16', 'utf-32']))
-        
-        for c in codecs:
-            try:
-                kwargs['encoding'] = c
-                return pd.read_csv(filepath, **kwargs)
-            except (UnicodeError, UnicodeDecodeError, UnboundLocalError) as e:
-                if verbose: 
-                    logging.info(e)
-            except Exception as e:
-                if 'tokenizing' in str(e):
-                    pass
-                else:
-                    raise
-        raise Exception("Tried {} codecs and failed on all: \n CODECS: {} \n FILENAME: {}".format(
-                        len(codecs), codecs, os.path.basename(filepath)) )
+
+        if kwargs.get('encoding', None) is None:
+            if isinstance(filepath, str) and os.path.isfile(filepath):
+                kwargs['encoding'] = sniff_file(filepath, first_codec=first_codec, sep=False)['encoding']
+            else:
+                kwargs['encoding'] = first_codec
+        try:
+            return pd.read_csv(filepath, **kwargs)
+        except (UnicodeError, UnicodeDecodeError) as e:
+            # The bad bytes were past the sniffed sample.
+            # iso-8859-1 maps every byte so this can't fail again.
+            if verbose:
+                logging.info(e)
+            logging.warning("Codec {} failed past the sniffed sample of {}, re-reading as iso-8859-1".format(
+                            kwargs['encoding'], os.path.basename(str(filepath))))
+            kwargs['encoding'] = 'iso-8859-1'
+            return pd.read_csv(filepath, **kwargs)
 
 
 def _count(item,string):
@@ -159,23 +494,8 @@ def identify_sep(filepath):
     assert ext in ['.csv', '.txt'], "Unexpected file extension {}. \
                                     Supported extensions {}\n filename: {}".format(
                                     ext, allowed_exts, os.path.basename(filepath))
-    maybe_seps = ['|',
-                  ';',
-                  ',',
-                  '\t',
-                  ':']
-                  
-    with open(filepath,'r') as fp:
-        header = fp.__next__()
-        
-    count_seps_header = {sep:_count(sep,header) for sep in maybe_seps}
-    count_seps_header = {sep:count for sep,count in count_seps_header.items() if count > 0}
-    
-    if count_seps_header:
-        return max(count_seps_header.__iter__(), 
-                   key=(lambda key: count_seps_header[key]))
-    else:
-        raise Exception("Couldn't identify the sep from the header... here's the information:\n HEADER: {}\n SEPS SEARCHED: {}".format(header,maybe_seps))
+    return sniff_file(filepath)['sep']
+
 
 def superReadText(filepath,**kwargs):
     """ 
@@ -184,7 +504,8 @@ def superReadText(filepath,**kwargs):
     .tsv files are assumed to have a \t (tab) separation
     .csv files are assumed to have a comma separation.
     .txt (or any other type) get the first line of the file opened 
-        and get tested for various separators as defined in the identify_sep function.   
+        and get tested for various separators as defined in the sniff_sep function.
+        The codec is sniffed from the same sample so the file is only opened once before parsing.
     """
     if isinstance(filepath,pd.DataFrame): 
         return filepath
@@ -199,38 +520,122 @@ def superReadText(filepath,**kwargs):
             kwargs['sep'] = ','
             
         else:
-            found_sep = identify_sep(filepath)
-            kwargs['sep'] = found_sep
+            sniffed = sniff_file(filepath, first_codec=kwargs.get('first_codec', 'utf8'),
+                                 sep=True)
+            kwargs['sep'] = sniffed['sep']
+            if kwargs.get('encoding', None) is None:
+                kwargs['encoding'] = sniffed['encoding']
             
     return superReadCSV(filepath,**kwargs)
 
 
+COMPACT_CATEGORY_RATIO = 0.5
+
+
+def series_compact(series: pd.Series, category_ratio: float=COMPACT_CATEGORY_RATIO):
+    """
+    Returns the series converted to a more compact dtype
+    (or the series itself if there isn't one).
+        - integers are downcast to the smallest (unsigned when possible) integer type.
+        - floats are downcast to float32 only when no precision is lost.
+        - object columns of booleans become bool (or the nullable boolean type with nulls).
+        - object columns of strings with few distinct values become category.
+
+    :param series: (pd.Series)
+    :param category_ratio: (float, default COMPACT_CATEGORY_RATIO)
+        The max ratio of distinct values to rows for a string column to become a category.
+    :return: (pd.Series)
+    """
+    kind = series.dtype.kind
+    if kind in 'iu':
+        unsigned = series.empty or series.min() >= 0
+        return pd.to_numeric(series, downcast='unsigned' if unsigned else 'integer')
+
+    elif kind == 'f':
+        down = pd.to_numeric(series, downcast='float')
+        if down.dtype != series.dtype and np.array_equal(down.values.astype(series.dtype),
+                                                         series.values, equal_nan=True):
+            return down
+
+    elif kind == 'O' and not series.empty:
+        inferred = pd.api.types.infer_dtype(series, skipna=True)
+        if inferred == 'boolean':
+            return series.astype('boolean' if series.hasnans else bool)
+        elif inferred == 'string' and series.nunique() <= series.size * category_ratio:
+            return series.astype('category')
+
+    return series
+
+
+def dataframe_compact(df: pd.DataFrame, category_ratio: float=COMPACT_CATEGORY_RATIO, columns: list=None):
+    """
+    Converts each column with series_compact and reports the memory saved.
+    The original frame isn't modified.
+
+    :param df: (pd.DataFrame)
+    :param category_ratio: (float, default COMPACT_CATEGORY_RATIO)
+        See series_compact.
+    :param columns: (list, default None)
+        A subset of columns to convert (None converts all of them).
+    :return: (pd.DataFrame, pd.DataFrame)
+        The compacted frame and a report with a row per converted column:
+        column, dtype, compact_dtype, bytes, compact_bytes, saved_bytes
+    """
+    if columns is None:
+        columns = df.columns.tolist()
+    df = df.copy(deep=False)
+    records = []
+    for col in columns:
+        series = df[col]
+        compact = series_compact(series, category_ratio=category_ratio)
+        if compact is series:
+            continue
+        before = int(series.memory_usage(index=False, deep=True))
+        after = int(compact.memory_usage(index=False, deep=True))
+        df[col] = compact
+        records.append([col, str(series.dtype), str(compact.dtype), before, after, before - after])
+    report = pd.DataFrame(records, columns=['column', 'dtype', 'compact_dtype',
+                                            'bytes', 'compact_bytes', 'saved_bytes'])
+    return df, report
+
+
 def superReadFile(filepath,**kwargs):
     """ 
     Uses pandas.read_excel (on excel files) and returns a dataframe of the first sheet (unless sheet is specified in kwargs)
     Uses superReadText (on .txt,.tsv, or .csv files) and returns a dataframe of the data.
     One function to read almost all types of data files.    
+
+    :param compact: (bool, default False)
+        True converts the columns to compact dtypes (see dataframe_compact).
+        Ignored for chunked reads.
     """
     if isinstance(filepath, pd.DataFrame):
         return filepath
 
+    compact = kwargs.pop('compact', False)
     ext = os.path.splitext(filepath)[1].lower()
     
     if ext in ['.xlsx', '.xls']:
         kwargs.pop('dtype', None)
-        return pd.read_excel(filepath,**kwargs)
+        df = pd.read_excel(filepath,**kwargs)
 
     elif ext in ['.txt','.tsv','.csv']:
-        return superReadText(filepath, **kwargs)
+        df = superReadText(filepath, **kwargs)
 
     elif ext in ['.gz', '.bz2', '.zip', 'xz']:
-        return superReadCSV(filepath, **kwargs)
+        df = superReadCSV(filepath, **kwargs)
 
     elif ext in ['.h5']:
-        return pd.read_hdf(filepath)
+        df = pd.read_hdf(filepath)
 
     else:
         raise NotImplementedError("Unable to read '{}' files".format(ext))
+
+    if compact and isinstance(df, pd.DataFrame):
+        df, report = dataframe_compact(df)
+        logging.info("Compact load of {} saved {:.1f} MB".format(
+                     filepath, report['saved_bytes'].sum() / 1024 ** 2))
+    return df
     
   
 def dedupe_cols(df):
@@ -308,9 +713,81 @@ def rename_dupe_cols(cols):
     return new_cols
 
 
-def set_frame_id(df, unique_cols, id_label, start=1):
+def frame_key_codes(df, unique_cols):
+    """
+    Factorizes the unique columns of a DataFrame into one integer code per row.
+    Codes are assigned in order of first appearance and NaNs count as a key.
+
+    :param df: (pd.DataFrame)
+    :param unique_cols: (list)
+        The columns that make each record unique.
+    :return: (np.ndarray, np.ndarray)
+        The code of each row and the position of the first row for each code.
+    """
+    codes = df.groupby(list(unique_cols), sort=False, dropna=False).ngroup().values
+    first = np.unique(codes, return_index=True)[1]
+    return codes, first
+
+
+def dataframe_key_hashes(df, key_cols):
+    """
+    Hashes the key columns of each row into one uint64.
+    Values are compared as strings so keys read from different
+    files (or parsed into different dtypes) still match.
+
+    :param df: (pd.DataFrame)
+    :param key_cols: (list)
+        The columns that make up the key.
+    :return: (np.ndarray)
+        A uint64 hash for each row.
+    """
+    keys = df.loc[:, list(key_cols)].astype(str)
+    return pd.util.hash_pandas_object(keys, index=False).values
+
+
+def dataframe_anti_join(df, others, key_cols):
+    """
+    Finds the rows of a DataFrame whose keys are not in any of the other frames.
+    The key columns are hashed once (see dataframe_key_hashes) and matched
+    with a hash lookup - no joined frame is built.
+
+    :param df: (pd.DataFrame)
+        The DataFrame to filter.
+    :param others: (dict)
+        {label: other} where other is a DataFrame with the key columns
+        or any object with a contains(hashes) method returning a boolean mask
+        (like zeex.core.utility.merge_purge.KeySet).
+        Others are applied in order - rows removed by one are not counted by the next.
+    :param key_cols: (list, dict)
+        The key columns shared by :param df and the other frames.
+        A dictionary of {label: key_cols} sets the columns for each other.
+    :return: (np.ndarray, OrderedDict)
+        A boolean keep-mask for :param df and {label: rows removed}.
+    """
+    keep = np.ones(df.index.size, dtype=bool)
+    counts = OrderedDict()
+    hashes = {}
+    for label, other in others.items():
+        cols = list(key_cols[label] if isinstance(key_cols, dict) else key_cols)
+        try:
+            df_hashes = hashes[tuple(cols)]
+        except KeyError:
+            df_hashes = hashes[tuple(cols)] = dataframe_key_hashes(df, cols)
+
+        if isinstance(other, pd.DataFrame):
+            bad = pd.Series(df_hashes).isin(dataframe_key_hashes(other, cols)).values
+        else:
+            bad = other.contains(df_hashes)
+        bad &= keep
+        counts[label] = int(bad.sum())
+        keep &= ~bad
+    return keep, counts
+
+
+def set_frame_id(df, unique_cols, id_label, start=1, id_map=None):
     """
     Assigns a numeric id to a dataframe based on unique columns.
+    Records sharing the same unique columns share the same id.
 
     df (DataFrame) the dataframe to assign the id to.
     unique_cols (list) the list of columns that must be unique.
@@ -318,73 +795,82 @@ def set_frame_id(df, unique_cols, id_label, start=1):
     start (int) the start id of the new DataFrame
                 This is overridden to the max_id + 1 if
                 the *arg::id_label already exists.
+    id_map (dict, default None) a mapping of key tuples (stringified
+                unique column values) to ids from a previous run.
+                Keys without an id look here before getting a new id,
+                and the mapping is updated with every key in the frame.
+                See read_id_map/write_id_map to persist it.
 
     Returns: A DataFrame with a unique numeric key named id_label
     """
-
     df = df.copy()
-    key_cols = unique_cols.copy()
-
-    orig_order = df.columns.tolist()
-
-    if id_label not in df.columns:
-        # We want the id_label to be added
-        # to the end of the column order.
-        orig_order.append(id_label)
+    key_cols = [c for c in unique_cols if c != id_label]
+    codes, first = frame_key_codes(df, key_cols)
 
-    elif id_label not in unique_cols:
-        # We want to take the id
-        # and preserve it with the unique records.
-        unique_cols.append(id_label)
-
-    # Split off unique columns to a frame/dedupe
-    df_unique = df.loc[:, unique_cols]
-    df_unique.drop_duplicates(subset=key_cols, inplace=True)
-
-    if id_label in df_unique.columns:
-        # find out if records are missing an id.
-        # Coerce the id_label into numeric digits.
-        df_unique.loc[:, id_label] = df_unique.loc[:, id_label].apply(force_int).astype(int)
-
-        # Drop NaNs and take all > 0
-        id_mask = df_unique[id_label] > 0
-        has_ids = df_unique.loc[id_mask, id_label].dropna()
+    if id_label in df.columns:
+        # Existing ids are kept - the first record of each key wins.
+        key_ids = series_int_force(df[id_label]).values[first].astype(np.int64)
+        next_id = max(int(key_ids.max()) + 1, 1) if key_ids.size else start
+    else:
+        key_ids = np.zeros(first.size, dtype=np.int64)
+        next_id = start
+
+    keys = None
+    if id_map is not None:
+        keys = list(df.iloc[first].loc[:, key_cols].astype(str).itertuples(index=False, name=None))
+        missing = np.flatnonzero(key_ids <= 0)
+        key_ids[missing] = [id_map.get(keys[i], 0) for i in missing]
+        if id_map:
+            next_id = max(next_id, max(id_map.values()) + 1)
+
+    # Hand out new ids to keys that still don't have one.
+    missing = key_ids <= 0
+    key_ids[missing] = np.arange(next_id, next_id + missing.sum())
+
+    guarantee = np.unique(key_ids).size == key_ids.size
+    assert guarantee, "Not all record IDs were unique - we failed somehow. Investigate."
 
-        # Now we can count missing IDs
-        count_missing = df_unique.index.size - has_ids.index.size
+    if id_map is not None:
+        id_map.update(zip(keys, key_ids.tolist()))
 
-        if count_missing > 0:
-            # yes records are missing an id.
-            # Get the max id and add 1 to it for our start.
-            start = df_unique.loc[:, id_label].max() + 1
-            new_ids = list(range(start, count_missing + start))
+    df[id_label] = key_ids[codes]
+    return df
 
-            # Get the positions that need updating.
-            fill_mask = [x for x in df_unique.index
-                         if x not in has_ids.index]
 
-            # Assign the new ids to the positions.
-            df_unique.loc[fill_mask, id_label] = new_ids
+def read_id_map(filepath, id_label, **kwargs):
+    """
+    Reads a key -> id mapping written by write_id_map.
 
-    else:
-        # We just need to create a new range from start to size.
-        df_unique.loc[:, id_label] = list(range(start, df_unique.index.size + start))
+    :param filepath: (str)
+        The path to the mapping file. A missing file returns an empty mapping.
+    :param id_label: (str)
+        The name of the id column - all other columns are key columns.
+    :return: (dict)
+    """
+    if not os.path.exists(filepath):
+        return {}
+    df = pd.read_csv(filepath, dtype=str, keep_default_na=False, **kwargs)
+    ids = pd.to_numeric(df.pop(id_label)).astype(np.int64).tolist()
+    return dict(zip(df.itertuples(index=False, name=None), ids))
 
-    # Get rid of the ID on the original dataframe if it exists.
-    df = df.drop([id_label], axis=1, errors='ignore')
 
-    # Guarantee that all records have unique ids:
-    guarantee = len(df_unique.loc[:, id_label].unique()) == df_unique.index.size
-    assert guarantee, "Not all record IDs were unique - we failed somehow. Investigate."
+def write_id_map(id_map, filepath, unique_cols, id_label, **kwargs):
+    """
+    Writes a key -> id mapping from set_frame_id to a CSV file.
 
-    # Return a new dataframe of the records
-    # merged together on the unique_key columns.
-    # Formats to the original dataframe
-    # column order (+ id_label if it didnt exist).
-    return pd.merge(df_unique, df,
-                 left_on=key_cols,
-                 right_on=key_cols,
-                 how='left').loc[:, orig_order]
+    :param id_map: (dict)
+    :param filepath: (str)
+    :param unique_cols: (list)
+        The key column names (in key tuple order).
+    :param id_label: (str)
+        The name of the id column.
+    :return: (str) The filepath.
+    """
+    key_cols = [c for c in unique_cols if c != id_label]
+    df = pd.DataFrame(list(id_map.keys()), columns=key_cols)
+    df[id_label] = list(id_map.values())
+    df.to_csv(filepath, index=False, **kwargs)
+    return filepath
 
 
 def get_frame_duplicates(df, id_label, unique_cols, sort_cols, ascending=None):
@@ -418,47 +904,41 @@ def get_frame_duplicates(df, id_label, unique_cols, sort_cols, ascending=None):
     """
 
     if ascending is not None:
-        pre_asc = ascending.copy()
-        post_asc = [(True if b is False else False) for b in pre_asc]
+        post_asc = [(True if b is False else False) for b in ascending]
     else:
-        pre_asc = [True for b in sort_cols]
         post_asc = [False for b in sort_cols]
 
+    # One stable sort in the dedupe order.
+    # Reading it backwards gives the id assignment order.
+    df = df.sort_values(sort_cols, ascending=post_asc, kind='mergesort')
+    df = set_frame_id(df.iloc[::-1], unique_cols, id_label).iloc[::-1]
 
-    # Do the pre-sort
-    df.sort_values(sort_cols, ascending=pre_asc, inplace=True)
-
-    # Apply the ID assignment algo
-    df = set_frame_id(df, unique_cols, id_label)
-
-    # Do the post-sort and dedupe.
-    df.sort_values(sort_cols, ascending=post_asc, inplace=True)
-    df_deduped = df.drop_duplicates(subset=unique_cols)
+    # The first record of each key survives, the rest are dupes.
+    dupe_mask = df.duplicated(subset=unique_cols, keep='first').values
 
-    # Get index ids of records that were deduped (in)
-    in_mask = [x for x in df.index if x not in df_deduped.index]
-    # versus not deduped (out)
-    out_mask = [x for x in df.index if x not in in_mask]
+    return [df.loc[~dupe_mask, :], df.loc[dupe_mask, :]]
 
-    # Store records that died
-    dupe_df = df.loc[in_mask, :]
 
-    # Replace the df with out_mask records.
-    df = df.loc[out_mask, :]
-
-    return [df, dupe_df]
+def _frame_keys(df, index_label):
+    # Prefer an existing index (its hash table is cached between calls).
+    if index_label is None or df.index.name == index_label or index_label not in df.columns:
+        return df.index
+    return pd.Index(df[index_label], name=index_label)
 
 
 def gather_frame_fields(df: pd.DataFrame, other_df: pd.DataFrame, index_label: str=None,
                         fields: list=None, copy_frames: bool=False,
-                        append_missing: bool=True, **kwargs):
+                        append_missing: bool=True, overwrite: bool=True, **kwargs):
     """
     Updates a dataframe from another based on common index (or index_label) keys.
+    Keys are matched through a hash lookup on the other frame's keys and only
+    the requested fields are written (in place) - other_df is never copied or modified.
 
     :param df: (pd.DataFrame)
         The master dataframe to be updated
     :param other_df: (pd.DataFrame)
         The other dataframe to gather data from
+        If its keys are duplicated the first record for each key is used.
     :param index_label: (str, default None)
         The name of the index column
         This column will be set to the index of the dataFrame if it's not already.
@@ -466,130 +946,287 @@ def gather_frame_fields(df: pd.DataFrame, other_df: pd.DataFrame, index_label: s
         The current index's name will be set to index_label.
     :param fields: (list, default None)
         An optional subset of field names to gather data from rather than updating from all
-        fields in the :param other_df.
+        fields in the :param other_df. None or an empty list gathers all fields.
     :param copy_frames: (bool, default False)
-        True creates a copy of the data before doing any operations (safer?)
+        True copies :param df before updating it.
     :param append_missing: (bool, default True)
         True appends records to :param df from :param other_df with an index did not exist in :param df.
-    :param kwargs: pd.DataFrame.update(**kwargs)
+    :param overwrite: (bool, default True)
+        True overwrites existing values in :param df with non-null values from :param other_df.
+        False only fills null values in :param df.
+    :param kwargs: Accepted for backwards compatibility (pd.DataFrame.update kwargs) and ignored.
 
     :return: (pd.DataFrame)
         :param df that has updated data from :param other_df
     """
     if copy_frames:
         df = df.copy()
-        other_df = other_df.copy()
-
-    if index_label is not None:
-        for frame in [df, other_df]:
-            if frame.index.name is not index_label and index_label in frame.columns:
-                frame.set_index(index_label, drop=False, inplace=True)
-            else:
-                frame.index.name = index_label
-
-    if fields:
-        other_df_orig = other_df.copy()
-        if isinstance(fields, str):
-            fields = [fields]
-        elif not hasattr(fields, '__iter__'):
-            raise Exception("Fields must be iterable or a string.. not {}".format(type(fields)))
-        elif not isinstance(fields, list):
-            fields = list(fields)
-        other_df = other_df.loc[:, fields]
-    else:
-        other_df_orig = other_df
 
-    df.update(other_df, **kwargs)
+    if not fields:
+        # None or empty gathers every shared field.
+        fields = other_df.columns.tolist()
+    elif isinstance(fields, str):
+        fields = [fields]
+    elif not hasattr(fields, '__iter__'):
+        raise Exception("Fields must be iterable or a string.. not {}".format(type(fields)))
+    fields = [f for f in fields if f in df.columns and f != index_label]
+
+    df_keys = _frame_keys(df, index_label)
+    other_keys = _frame_keys(other_df, index_label)
+    if not other_keys.is_unique:
+        first = ~other_keys.duplicated(keep='first')
+        other_df, other_keys = other_df.loc[first, :], other_keys[first]
+
+    pos = other_keys.get_indexer(df_keys)
+    hit = np.flatnonzero(pos >= 0)
+    pos = pos[hit]
+
+    for field in fields:
+        loc = df.columns.get_loc(field)
+        values = other_df[field].values[pos]
+        valid = pd.notnull(values)
+        if not overwrite:
+            valid &= pd.isnull(df.iloc[hit, loc].values)
+        if valid.any():
+            df.iloc[hit[valid], loc] = values[valid]
+
+    df.index = df_keys.rename(index_label) if index_label is not None else df_keys
 
     if append_missing is True:
-        df_add = other_df_orig.loc[~other_df_orig.index.isin(df.index), :]
-        df = pd.concat([df, df_add])
+        missing = ~other_keys.isin(df_keys)
+        if missing.any():
+            df_add = other_df.loc[missing, :]
+            df_add.index = other_keys[missing].rename(index_label)
+            df = pd.concat([df, df_add])
 
     return df
 
 
-def series_is_datetime(series: pd.Series, check_num: int=5, dropna: bool=True):
+DATETIME_SAMPLE_SIZE = 200
+DATETIME_MIN_RATE = 0.5
+# Columns losing a larger share of their values to NaT are left unconverted.
+DATETIME_MAX_LOSS = 0.01
+# Tried (after formats guessed from the sample) when inferring a column's datetime format.
+DATETIME_FORMATS = ['%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %I:%M:%S %p', '%Y-%m-%dT%H:%M:%S',
+                    '%Y/%m/%d', '%m/%d/%Y', '%m/%d/%Y %H:%M:%S', '%m/%d/%Y %I:%M:%S %p',
+                    '%m/%d/%y', '%m-%d-%Y', '%m-%d-%y', '%d-%b-%Y', '%d %b %Y', '%b %d %Y']
+
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError:
+    from pandas._libs.tslibs.parsing import guess_datetime_format
+
+# pandas >= 2.0 parses every value with the first value's format unless the column is marked mixed.
+DATETIME_MIXED_KWARGS = ({'format': 'mixed'} if int(pd.__version__.split('.')[0]) >= 2 else {})
+
+
+def infer_datetime_format(series: pd.Series, sample_size: int=DATETIME_SAMPLE_SIZE, dropna: bool=True,
+                          min_rate: float=DATETIME_MIN_RATE):
     """
-    Checks random rows in a Series comparing rows that coerce to datetime.
-    :param series:
-    :param check_num:
-    :param dropna:
-    :return:
+    Samples a Series once and finds the datetime format that parses
+    the most sampled values.
+
+    :param series: (pd.Series)
+        The series to check.
+    :param sample_size: (int, default 200)
+        The max number of random rows to test.
+    :param dropna: (bool, default True)
+        True drops na values from the series before sampling.
+    :param min_rate: (float, default 0.5)
+        The share of sampled values a format must parse.
+    :return: (tuple)
+        (format, rate) - rate is 0.0 when nothing parses more than
+        :param min_rate of the sample. Format is None for datetime
+        objects (rather than strings) and for samples that only
+        parse as a mix of formats.
     """
     if dropna:
-        series = series.dropna(axis=0)
-    got, lost = 0, 0
-    size = (check_num if series.index.size > check_num else series.index.size)
-
-    if size > 0:
-        checks = np.random.randint(0, high=series.index.size, size=size)
-        for x in series[checks].tolist():
-            try:
-                x = pd.Timestamp(x)
-                if pd.notnull(x):
-                    got += 1
-            except (ValueError, OverflowError):
-                lost += 1
-
-    return got > lost
+        series = series.dropna()
+    size = min(sample_size, series.index.size)
+    if size == 0:
+        return None, 0.0
+    if size == series.index.size:
+        sample = series
+    else:
+        sample = series.iloc[np.random.randint(0, high=series.index.size, size=size)]
+
+    is_str = sample.map(type).values == str
+    if not is_str.any():
+        is_dt = sample.map(lambda x: isinstance(x, (datetime.date, np.datetime64))).values
+        rate = float(is_dt.mean())
+        return (None, rate) if rate > min_rate else (None, 0.0)
+
+    sample = sample[is_str].str.strip()
+    formats = []
+    for value in sample.unique()[:3]:
+        guess = guess_datetime_format(value)
+        if guess and guess not in formats:
+            formats.append(guess)
+    formats.extend(f for f in DATETIME_FORMATS if f not in formats)
+
+    best, best_rate = None, 0.0
+    for fmt in formats:
+        parsed = pd.to_datetime(sample, format=fmt, errors='coerce')
+        rate = float(parsed.notnull().sum()) / size
+        if rate > best_rate:
+            best, best_rate = fmt, rate
+            if rate == 1.0:
+                break
+    if best_rate > min_rate:
+        return best, best_rate
+
+    # No single format fits - check whether the values parse one by one.
+    parsed = pd.to_datetime(sample, errors='coerce', **DATETIME_MIXED_KWARGS)
+    rate = float(parsed.notnull().sum()) / size
+    return (None, rate) if rate > min_rate else (None, 0.0)
+
+
+def series_is_datetime(series: pd.Series, check_num: int=DATETIME_SAMPLE_SIZE, dropna: bool=True):
+    """
+    Checks random rows in a Series for values that parse as datetimes.
+    :param series: (pd.Series)
+    :param check_num: (int, default 200)
+        The max number of rows to test.
+    :param dropna: (bool, default True)
+        True drops na values from the series before checking random rows.
+    :return: (bool)
+        True if more than half of the checked rows share a datetime format.
+    """
+    return infer_datetime_format(series, sample_size=check_num, dropna=dropna)[1] > 0
 
 
-def series_to_datetime(series, check_num: int=5, dropna: bool=True, **kwargs):
+def series_to_datetime(series, check_num: int=DATETIME_SAMPLE_SIZE, dropna: bool=True, **kwargs):
     """
 
     :param series: (pd.Series)
         The series object to modify.
-    :param check_num: (int, default 10)
+    :param check_num: (int, default 200)
         The max number of rows to test for coerceable datetime values.
     :param dropna: (bool, default True)
         True drops na values from the series before checking random rows.
     :param kwargs: pd.to_datetime(**kwargs)
         errors: defaults to 'coerce'
+        format: defaults to the format inferred from the checked rows.
     :return: (pd.Series)
         With dtype converted to a datetime if possible.
     """
-    if series_is_datetime(series, check_num=check_num, dropna=dropna):
-        kwargs['errors'] = kwargs.get('errors', 'coerce')
-        series = pd.to_datetime(series, **kwargs)
+    converted, info = _column_to_datetime(series, check_num, dropna, 1.0, kwargs)
+    if converted is not None:
+        series = converted
     return series
 
 
-def dataframe_to_datetime(df, dtypes=['object'], check_num:int = 5, dropna: bool=True, raise_on_error=False, **kwargs):
+def _column_to_datetime(series, check_num, dropna, max_loss, kwargs):
+    """
+    Converts a series with the format inferred from a sample.
+    When that format coerces values to NaT the series is also parsed
+    value by value and whichever result keeps more values is used.
+
+    :return: (tuple)
+        (converted, info) - converted is None when the series doesn't hold
+        datetimes or loses more than :param max_loss of its values.
+        info is None when the series doesn't hold datetimes.
+    """
+    fmt, rate = infer_datetime_format(series, sample_size=check_num, dropna=dropna)
+    if rate == 0:
+        return None, None
+    kwargs = dict(kwargs)
+    kwargs['errors'] = kwargs.get('errors', 'coerce')
+    if 'format' not in kwargs:
+        kwargs.update({'format': fmt} if fmt is not None else DATETIME_MIXED_KWARGS)
+    converted = pd.to_datetime(series, **kwargs)
+    rows = int(series.notnull().sum())
+    lost = rows - int(converted.notnull().sum())
+
+    if lost and fmt is not None and kwargs['format'] == fmt:
+        flexible = dict(kwargs)
+        del flexible['format']
+        flexible.update(DATETIME_MIXED_KWARGS)
+        retry = pd.to_datetime(series, **flexible)
+        retry_lost = rows - int(retry.notnull().sum())
+        if retry_lost < lost:
+            converted, lost, kwargs = retry, retry_lost, flexible
+
+    loss_rate = (lost / rows if rows else 0.0)
+    info = {'format': kwargs.get('format'), 'rows': rows, 'lost': lost,
+            'loss_rate': loss_rate, 'converted': loss_rate <= max_loss}
+    return (converted if info['converted'] else None), info
+
+
+def dataframe_to_datetime(df, dtypes=['object'], check_num: int=DATETIME_SAMPLE_SIZE, dropna: bool=True,
+                          raise_on_error=False, workers: int=None, report: bool=False,
+                          max_loss: float=DATETIME_MAX_LOSS, **kwargs):
     """
     Scans columns in a dataframe looking for columns to convert into a DateTime.
+    Each column is sampled once to infer a single format which is then
+    used to convert the whole column. Values that format coerces to NaT
+    are retried value by value. Columns are converted in parallel.
 
     :param df: (pd.DataFrame)
         The dataframe to modify.
     :param dtypes: (list, default ['object'])
         A list of data types to check.
-    :param check_num: (int, default 10)
+    :param check_num: (int, default 200)
         The max number of rows to test for coerceable datetime values.
     :param dropna: (bool, default True)
         True drops na values from the series before checking random rows.
     :param raise_on_error: (bool, default False)
         True raises ValueError or OverflowError if any occur doing the conversion.
+    :param workers: (int, default None)
+        The number of threads converting columns - None uses the
+        ThreadPoolExecutor default.
+    :param report: (bool, default False)
+        True also returns a pd.DataFrame with a row per datetime column:
+        column, format, rows, lost, loss_rate, converted - lost being the
+        non-null values that coerced to NaT.
+    :param max_loss: (float, default 0.01)
+        Columns losing a larger share of their non-null values
+        are left unconverted. 0 converts lossless columns only.
     :param kwargs: pd.to_datetime(**kwargs)
         errors: defaults to 'coerce'
     :return: (pd.DataFrame)
         DataFrame with found datetime columns converted.
+        (pd.DataFrame, pd.DataFrame) when :param report is True.
     """
-    for column in df.columns:
-        dtype = str(df[column].dtype)
-        if dtype in dtypes:
-            try:
-                converted = series_to_datetime(df.loc[:, column], check_num=check_num, dropna=dropna, **kwargs)
-                df.loc[:, column] = converted
-            except (ValueError, OverflowError):
-                if raise_on_error:
-                    raise
+    columns = [c for c in df.columns if str(df[c].dtype) in dtypes]
+    results = []
+    if columns:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [(c, executor.submit(_column_to_datetime, df[c], check_num, dropna, max_loss, kwargs))
+                       for c in columns]
+            for column, future in futures:
+                try:
+                    converted, info = future.result()
+                except (ValueError, OverflowError):
+                    if raise_on_error:
+                        raise
+                    continue
+                if converted is not None:
+                    df[column] = converted
+                if info is not None:
+                    info['column'] = column
+                    results.append(info)
+    if report:
+        return df, pd.DataFrame(results, columns=['column', 'format', 'rows', 'lost', 'loss_rate', 'converted'])
     return df
 
 
+def _split_name(split_on, key):
+    if len(split_on) == 1:
+        name = str(key[0])
+    else:
+        name = '_'.join("{}_{}".format(str(col)[:5], val) for col, val in zip(split_on, key))
+    return ''.join(e for e in name if e.isalnum() or e == '_').strip().lower()
+
+
 def dataframe_split_to_files(df: pd.DataFrame, source_path: str, split_on: list,
                              fields: list=None, dropna: bool=False, dest_dirname:str =None,
-                             chunksize: int=None, **kwargs):
+                             chunksize: int=None, workers: int=None, **kwargs):
     """
-    Somewhat intelligently splits and exports a DataFrame into separate files based on the given parameters.
+    Splits and exports a DataFrame into a file for each unique
+    combination of values in the split_on column(s).
+    The partitions are found in a single groupby pass and written
+    concurrently by a pool of writer threads.
 
     :param df: (pd.DataFrame)
         The dataframe to split
@@ -598,19 +1235,22 @@ def dataframe_split_to_files(df: pd.DataFrame, source_path: str, split_on: list,
         (and directory name if dest_dirname is None)
     :param split_on: (list)
         The list of column(s) to split the dataframe on.
-        Each value in a split_on column will be paired with a value from
-        the other column(s) (if any) and will
+        Any number of columns can be given - each distinct combination
+        of their values gets its own file(s).
     :param fields: (list, default None)
         A subset of fields to export in each split.
         If None, all fields will be exported.
     :param dropna: (bool, default False)
-        NA values are either dropped or filled with the word 'blank'
+        NA values are either dropped or named 'blank'
         which will show up in the filename.
     :param dest_dirname: (str, default None)
         A destination directory to store the splits.
         If None is specified, the source_path's directory will be used.
     :param chunksize: (int, default None)
         The max # of records to export per file.
+    :param workers: (int, default None)
+        The max # of files to write at once (None uses the ThreadPoolExecutor default).
+    :param kwargs: (pd.to_csv/pd.to_excel kwargs)
     :return: list(exported filepaths)
     """
     source_base, source_ext = os.path.splitext(os.path.basename(source_path))
@@ -623,66 +1263,44 @@ def dataframe_split_to_files(df: pd.DataFrame, source_path: str, split_on: list,
 
     if not fields:
         fields = df.columns.tolist()
-
-    if dropna:
-        if not split_on:
-            subset = None
-        else:
-            subset = split_on
-        df.dropna(how='any', subset=subset, inplace=True)
-    elif split_on:
-        [df.loc[:, c].fillna('blank', inplace=True) for c in split_on]
+    if isinstance(split_on, str):
+        split_on = [split_on]
 
     if not split_on:
-        df = df.loc[:, fields]
+        if dropna:
+            df = df.dropna(how='any')
         file_path = os.path.join(dirname, source_base + source_ext)
-        exported_paths = dataframe_export_chunks(df, file_path, max_size=chunksize, **kwargs)
-
-    else:
-
-        combos = {c: list(df.loc[:, c].unique()) for c in split_on}
-        keys, exported_paths = [], []
-
-        # TODO: This feels like it should be some sort of recursive function...
-        # Learn this shit and make it split better using all available options
-        # From the combos.
-        for col, values in combos.items():
-            other_cols = [c for c in combos.keys() if c != col]
-            if other_cols:
-                for val in values:
-                    for other_col in other_cols:
-
-                        other_vals = combos[other_col]
-                        for other_val in other_vals:
-
-                            key = ''.join(list(sorted([str(val), str(other_val)])))
-                            if key not in keys:
-
-                                mask = ((df.loc[:, col] == val) & (df.loc[:, other_col] == other_val))
-                                df_part = df.loc[mask, fields]
-                                if not df_part.empty:
-
-                                    name_str = "{}_{}_{}_{}".format(str(col)[:5], val, str(other_col)[:5], other_val)
-                                    name_str = ''.join(e for e in str(name_str)
-                                                       if e.isalnum() or e == '_').strip().lower()
-                                    name_str = "{}_{}{}".format(source_base, name_str, source_ext)
-                                    out_path = os.path.join(dirname, name_str)
-
-                                    paths = dataframe_export_chunks(df_part, out_path, max_size=chunksize, **kwargs)
-                                    keys.append(key)
-                                    exported_paths.extend(paths)
-            else:
-                for val in values:
-
-                    df_part = df.loc[df[col] == val, fields]
-                    if not df_part.empty:
-
-                        val = ''.join(e for e in str(val) if e.isalnum() or e == '_').strip().lower()
-                        name_str = "{}_{}{}".format(source_base, val, source_ext)
-                        out_path = os.path.join(dirname, name_str)
-
-                        paths = dataframe_export_chunks(df_part, out_path, max_size=chunksize, **kwargs)
-                        exported_paths.extend(paths)
+        return dataframe_export_chunks(df.loc[:, fields], file_path, max_size=chunksize, **kwargs)
+
+    # Group positions in order of first appearance.
+    groups = df.groupby(list(split_on), sort=False, dropna=dropna).indices
+    parts, names = [], set()
+    for key, positions in groups.items():
+        if not isinstance(key, tuple):
+            key = (key,)
+        key = ['blank' if pd.isnull(v) else v for v in key]
+        name = _split_name(split_on, key)
+        # Values that only differ by special characters would share a file name.
+        unique_name, count = name, 2
+        while unique_name in names:
+            unique_name = "{}{}".format(name, count)
+            count += 1
+        names.add(unique_name)
+        out_path = os.path.join(dirname, "{}_{}{}".format(source_base, unique_name, source_ext))
+        parts.append((np.sort(positions), out_path))
+
+    col_idx = df.columns.get_indexer(fields)
+
+    def write(part):
+        positions, out_path = part
+        # The partitions are already written in parallel.
+        return dataframe_export_chunks(df.iloc[positions, col_idx], out_path,
+                                       max_size=chunksize, workers=1, **kwargs)
+
+    exported_paths = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for paths in pool.map(write, parts):
+            exported_paths.extend(paths)
 
     return exported_paths
 
@@ -692,15 +1310,44 @@ def string_strip(x):
 
 
 def series_strip(series: pd.Series):
-    return series.apply(string_strip)
+    """
+    Vectorized string_strip.
+    Converts cells to strings, strips whitespace and blanks NA_VALUES.
+    """
+    series = series.astype(str).str.strip()
+    series[_na_mask(series).values] = ''
+    return series
 
 
 def string_remove_special_chars(x, excludes=[' ']):
-    return string_blank_na(''.join(e for e in x if not e.isalnum() or e in excludes))
+    """
+    Removes non-alphanumeric characters from a single value
+    (see series_remove_special_chars). Characters in :param excludes are kept.
+    """
+    return string_blank_na(''.join(e for e in str(x) if e.isalnum() or e in excludes))
+
 
+def special_chars_regex(excludes=None):
+    """
+    Compiles a regex that matches every character that is not
+    alphanumeric (str.isalnum) and not in :param excludes.
+    """
+    excludes = ''.join(e for e in (excludes or []) if not e.isalnum())
+    pattern = '[^\\w{}]'.format(re.escape(excludes))
+    if '_' not in excludes:
+        # \w also matches underscores.
+        pattern += '|_'
+    return re.compile(pattern)
 
-def series_remove_special_chars(series: pd.Series):
-    return series.apply(string_remove_special_chars)
+
+def series_remove_special_chars(series: pd.Series, excludes=[' ']):
+    """
+    Vectorized removal of non-alphanumeric characters.
+    Characters in :param excludes are kept. NA_VALUES are blanked.
+    """
+    series = series.astype(str).str.replace(special_chars_regex(excludes), '', regex=True)
+    series[_na_mask(series).values] = ''
+    return series
 
 
 def integer_coerce(x):
@@ -809,10 +1456,20 @@ case_map = {str.upper: str.upper, 'upper': str.upper,
             'default': lambda x: str(x)}
 
 
+str_case_map = {str.upper: 'upper', str.title: 'title', str.lower: 'lower'}
+
+
 def series_set_case(series, how=str.upper):
     if not callable(how):
         how = case_map.get(str(how).lower(), case_map['default'])
-    return series.astype(str).apply(how)
+    series = series.astype(str)
+    if how is case_map['default']:
+        return series
+    try:
+        return getattr(series.str, str_case_map[how])()
+    except KeyError:
+        # A custom callable - no vectorized version.
+        return series.apply(how)
 
 
 DIGIT_ALLOWS = ['.']
@@ -832,13 +1489,38 @@ def float_force(x):
         return float(0)
 
 
+NON_DIGITS_RX = re.compile('[^0-9{}]'.format(re.escape(''.join(DIGIT_ALLOWS))))
+INT_RX = re.compile(r'\d+$')
+FLOAT_RX = re.compile(r'(\d+\.?\d*|\.\d+)$')
+
+
+def _series_digits(series, valid_rx):
+    """
+    Strips everything but digits (and DIGIT_ALLOWS) from each cell
+    and replaces cells that don't match :param valid_rx with '0'.
+    """
+    series = series.astype(str).str.replace(NON_DIGITS_RX, '', regex=True)
+    return series.where(series.str.match(valid_rx), '0')
+
+
+def series_int_force(series):
+    """Vectorized int_force."""
+    return pd.to_numeric(_series_digits(series, INT_RX))
+
+
+def series_float_force(series):
+    """Vectorized float_force."""
+    return pd.to_numeric(_series_digits(series, FLOAT_RX)).astype(float)
+
+
 DIGIT_FORCE_MAP = {int:int_force,float:float_force}
+SERIES_DIGIT_FORCE_MAP = {int: series_int_force, float: series_float_force}
 
 
 def series_to_numeric(series, errors='coerce', astype=int):
-    if errors is 'coerce':
-        method = DIGIT_FORCE_MAP.get(astype, int_force)
-        series = series.apply(method)
+    if errors == 'coerce':
+        method = SERIES_DIGIT_FORCE_MAP.get(astype, series_int_force)
+        series = method(series)
     return pd.to_numeric(series, errors=errors).astype(astype)
 
 
@@ -846,6 +1528,7 @@ def series_to_numeric(series, errors='coerce', astype=int):
 
 LINE_BREAKS_LIST = [r'\n', r'\t', r'\r']
 LINE_BREAKS_LIST_RX = [re.compile(x) for x in LINE_BREAKS_LIST]
+LINE_BREAKS_RX = re.compile('|'.join(LINE_BREAKS_LIST))
 
 
 def remove_line_breaks(x):
@@ -855,6 +1538,20 @@ def remove_line_breaks(x):
     return string_blank_na(x.lstrip().rstrip())
 
 
+def series_remove_linebreaks(series):
+    """
+    Vectorized remove_line_breaks.
+    Nulls become '', line breaks become spaces,
+    whitespace is stripped and NA_VALUES are blanked.
+    """
+    nulls = series.isnull()
+    series = series.astype(str)
+    series[nulls.values] = ''
+    series = series.str.replace(LINE_BREAKS_RX, ' ', regex=True).str.strip()
+    series[_na_mask(series).values] = ''
+    return series
+
+
 def dataframe_remove_linebreaks(df, columns=None, copy=False):
     if copy is True:
         df = df.copy()
@@ -862,7 +1559,7 @@ def dataframe_remove_linebreaks(df, columns=None, copy=False):
         columns = df.columns.tolist()
     for col in columns:
         if str(df[col].dtype) == 'object':
-            df.loc[:, col] = df.loc[:, col].apply(remove_line_breaks)
+            df.loc[:, col] = series_remove_linebreaks(df.loc[:, col])
     return df
 
 
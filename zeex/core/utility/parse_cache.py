@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+MIT License
+
+Copyright (c) 2016 Zeke Barge
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+A parse cache for data files. Parsed DataFrames are stored in a binary
+format (Feather when pyarrow is installed, otherwise pickle)
+and re-used until the source file changes.
+"""
+import os
+import re
+import json
+import glob
+import hashlib
+import logging
+import pandas as pd
+from zeex.core.utility.pandatools import superReadFile
+
+try:
+    import pyarrow
+    FEATHER_AVAILABLE = True
+except ImportError:
+    FEATHER_AVAILABLE = False
+
+PARSE_CACHE_DIRNAME = '.zeex_cache'
+PARSE_CACHE_EXTENSIONS = ['.feather', '.pkl']
+# <path key>_<state key>.<extension> - other files may share the directory.
+PARSE_CACHE_ENTRY = re.compile(r'^[0-9a-f]{16}_[0-9a-f]{16}\.(feather|pkl)$')
+
+
+def _feather_ok(df: pd.DataFrame):
+    return (FEATHER_AVAILABLE
+            and isinstance(df.index, pd.RangeIndex) and df.index.start == 0 and df.index.step == 1
+            and df.columns.is_unique and all(isinstance(c, str) for c in df.columns))
+
+
+class ParseCache(object):
+    """
+    Stores parsed DataFrames keyed by the source file's path, modified time,
+    size and the read kwargs. A file's old entries are removed
+    when it's cached again after changing.
+    """
+    def __init__(self, directory):
+        """
+        :param directory: (str)
+            The directory to store cached frames in (created when first needed).
+        """
+        self.directory = directory
+
+    @staticmethod
+    def path_key(filepath) -> str:
+        return hashlib.sha1(os.path.abspath(filepath).encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def state_key(filepath, **kwargs) -> str:
+        stat = os.stat(filepath)
+        state = json.dumps([stat.st_mtime_ns, stat.st_size, sorted((k, repr(v)) for k, v in kwargs.items())])
+        return hashlib.sha1(state.encode('utf-8')).hexdigest()[:16]
+
+    def entries(self, filepath=None) -> list:
+        """
+        Returns the cache file paths stored for a source file
+        (or for every file when None).
+        """
+        pattern = '*' if filepath is None else self.path_key(filepath) + '_*'
+        return [p for p in glob.glob(os.path.join(self.directory, pattern))
+                if PARSE_CACHE_ENTRY.match(os.path.basename(p))]
+
+    def lookup(self, filepath, **kwargs):
+        """
+        Returns the cache file path for the file's current state or None.
+        """
+        base = os.path.join(self.directory, "{}_{}".format(self.path_key(filepath),
+                                                           self.state_key(filepath, **kwargs)))
+        for ext in PARSE_CACHE_EXTENSIONS:
+            if os.path.exists(base + ext):
+                return base + ext
+        return None
+
+    def get(self, filepath, **kwargs):
+        """
+        Returns the cached DataFrame for the file or None
+        if the file has changed (or was never cached).
+        """
+        cache_path = self.lookup(filepath, **kwargs)
+        if cache_path is None:
+            return None
+        try:
+            if cache_path.endswith('.feather'):
+                return pd.read_feather(cache_path)
+            return pd.read_pickle(cache_path)
+        except Exception as e:
+            logging.warning("Ignoring unreadable parse cache {}: {}".format(cache_path, e))
+            os.remove(cache_path)
+            return None
+
+    def put(self, filepath, df: pd.DataFrame, **kwargs) -> str:
+        """
+        Caches the DataFrame parsed from the file
+        and removes the file's stale entries.
+        :return: (str)
+            The cache file path.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, "{}_{}".format(self.path_key(filepath),
+                                                           self.state_key(filepath, **kwargs)))
+        # Feather can't store some frames (e.g. mixed-type object columns) - pickle can.
+        exts = ['.feather', '.pkl'] if _feather_ok(df) else ['.pkl']
+        for ext in exts:
+            cache_path = base + ext
+            tmp_path = cache_path + '.tmp'
+            try:
+                if ext == '.feather':
+                    df.to_feather(tmp_path)
+                else:
+                    df.to_pickle(tmp_path)
+                os.replace(tmp_path, cache_path)
+                break
+            except Exception as e:
+                logging.warning("Failed to cache {} as {}: {}".format(filepath, ext, e))
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        else:
+            return None
+
+        for p in self.entries(filepath):
+            if os.path.splitext(p)[0] != base:
+                os.remove(p)
+        return cache_path
+
+    def read(self, filepath, **kwargs) -> pd.DataFrame:
+        """
+        Returns the cached DataFrame for the file or
+        parses it with superReadFile and caches the result.
+        :param kwargs: superReadFile(**kwargs)
+            Chunked reads are not cached.
+        """
+        if kwargs.get('chunksize') is not None:
+            return superReadFile(filepath, **kwargs)
+        df = self.get(filepath, **kwargs)
+        if df is None:
+            df = superReadFile(filepath, **kwargs)
+            self.put(filepath, df, **kwargs)
+        return df
+
+    def clear(self, filepath=None):
+        """
+        Removes the cached entries for a file (or all files when None).
+        Other files in the directory (row indexes, schemas...) are kept.
+        """
+        for p in self.entries(filepath):
+            os.remove(p)
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+MIT License
+
+Copyright (c) 2016 Zeke Barge
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Row-offset indexes over delimited text files. An index is built in
+one streaming pass and then used to count, sample or read any range
+of rows without parsing the rest of the file. Indexes are saved to
+a sidecar file and re-used until the text file changes.
+"""
+import io
+import os
+import json
+import codecs
+import hashlib
+import logging
+import tempfile
+import numpy as np
+import pandas as pd
+from zeex.core.utility.pandatools import sniff_file
+
+ROW_INDEX_BLOCK_SIZE = 16 * 1024 * 1024
+ROW_INDEX_EXTENSION = '.rowindex.npz'
+# Where indexes are saved without a cache directory - never next to the data.
+ROW_INDEX_DIRECTORY = os.path.join(tempfile.gettempdir(), 'zeex_row_indexes')
+# Codecs (codecs.lookup names) where a newline is always the single byte \n.
+ROW_INDEX_CODECS = ['utf-8', 'utf-8-sig', 'ascii', 'iso8859-1', 'cp1252']
+
+
+def sidecar_path(filepath, directory=None) -> str:
+    """
+    Returns where the RowIndex of a file is saved.
+    :param directory: (str, default None)
+        A directory to keep indexes in.
+        None uses ROW_INDEX_DIRECTORY.
+    """
+    name = os.path.basename(filepath)
+    if directory is None:
+        directory = ROW_INDEX_DIRECTORY
+    key = hashlib.sha1(os.path.abspath(filepath).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(directory, "{}_{}{}".format(name, key, ROW_INDEX_EXTENSION))
+
+
+class RowIndex(object):
+    """
+    The byte offset of the start of every row in a text file.
+    Line breaks inside quoted values don't start a new row.
+    Row 0 is the header, so data row n spans
+    offsets[n + 1]:offsets[n + 2].
+    """
+    def __init__(self, filepath, offsets: np.ndarray, encoding='utf8', sep=',', quotechar='"',
+                 mtime_ns=None, size=None):
+        self.filepath = filepath
+        self.offsets = offsets
+        self.encoding = encoding
+        self.sep = sep
+        self.quotechar = quotechar
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self._columns = None
+
+    @classmethod
+    def build(cls, filepath, first_codec='utf8', sep=None, quotechar='"', block_size=ROW_INDEX_BLOCK_SIZE):
+        """
+        Scans the file once, block by block, for line breaks
+        that aren't inside a quoted value.
+
+        :param filepath: (str)
+            A plain (uncompressed) delimited text file.
+        :param first_codec: (str, default 'utf8')
+            The codec to try first when sniffing the encoding.
+        :param sep: (str, default None)
+            The column separator - None sniffs it from the header.
+        :param quotechar: (str, default '"')
+            The quote character (None treats every line break as a new row).
+        :param block_size: (int, default 16MB)
+            The number of bytes to scan at a time.
+        :return: (RowIndex)
+        """
+        stat = os.stat(filepath)
+        # An empty file has no header to sniff the separator from.
+        info = sniff_file(filepath, first_codec=first_codec, sep=sep is None and stat.st_size > 0)
+        if codecs.lookup(info['encoding']).name not in ROW_INDEX_CODECS:
+            raise NotImplementedError("Can't index '{}' encoded files.".format(info['encoding']))
+        quote = None if not quotechar else ord(quotechar)
+
+        # A line break only ends a row when an even number of quotes come before it.
+        starts, pos, quotes_seen = [np.zeros(1, dtype=np.uint64)], 0, 0
+        with open(filepath, 'rb') as fh:
+            for block in iter(lambda: fh.read(block_size), b''):
+                data = np.frombuffer(block, dtype=np.uint8)
+                breaks = np.flatnonzero(data == 10)
+                if quote is not None:
+                    quotes = np.flatnonzero(data == quote)
+                    if quotes_seen % 2 or quotes.size:
+                        before = np.searchsorted(quotes, breaks) + quotes_seen
+                        breaks = breaks[before % 2 == 0]
+                    quotes_seen += quotes.size
+                starts.append((breaks + pos + 1).astype(np.uint64))
+                pos += len(block)
+        offsets = np.concatenate(starts)
+        if offsets[-1] != pos:
+            # The last row has no line break.
+            offsets = np.append(offsets, np.uint64(pos))
+        return cls(filepath, offsets, encoding=info['encoding'], sep=sep or info['sep'] or ',',
+                   quotechar=quotechar, mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+
+    @classmethod
+    def load(cls, filepath, directory=None):
+        """
+        Loads the saved index of a file.
+        :return: (RowIndex, None)
+            None when there's no saved index or the file has changed since it was saved.
+        """
+        path = sidecar_path(filepath, directory)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(str(data['meta']))
+                index = cls(filepath, data['offsets'], **meta)
+        except Exception as e:
+            logging.warning("Ignoring unreadable row index {}: {}".format(path, e))
+            return None
+        return index if index.is_current() else None
+
+    @classmethod
+    def open(cls, filepath, directory=None, save=True, **kwargs):
+        """
+        Loads the saved index of a file or builds (and saves) a new one.
+        :param directory: (str, default None)
+            See sidecar_path.
+        :param save: (bool, default True)
+            False doesn't save newly built indexes.
+        :param kwargs: RowIndex.build(**kwargs)
+        :return: (RowIndex)
+        """
+        index = cls.load(filepath, directory)
+        if index is not None and all(getattr(index, k) == kwargs[k] for k in ('sep', 'quotechar')
+                                     if kwargs.get(k) is not None):
+            return index
+        index = cls.build(filepath, **kwargs)
+        if save:
+            try:
+                index.save(directory)
+            except OSError as e:
+                logging.warning("Failed to save the row index of {}: {}".format(filepath, e))
+        return index
+
+    def save(self, directory=None) -> str:
+        """
+        Saves the index (see sidecar_path).
+        :return: (str)
+            The saved file path.
+        """
+        path = sidecar_path(self.filepath, directory)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        meta = json.dumps(dict(encoding=self.encoding, sep=self.sep, quotechar=self.quotechar,
+                               mtime_ns=self.mtime_ns, size=self.size))
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, offsets=self.offsets, meta=np.array(meta))
+        os.replace(tmp_path, path)
+        return path
+
+    def is_current(self) -> bool:
+        """False when the file's size or modified time changed since it was indexed."""
+        try:
+            stat = os.stat(self.filepath)
+        except OSError:
+            return False
+        return stat.st_mtime_ns == self.mtime_ns and stat.st_size == self.size
+
+    @property
+    def row_count(self) -> int:
+        """The number of data rows (not counting the header)."""
+        return max(0, self.offsets.size - 2)
+
+    @property
+    def columns(self) -> list:
+        if self._columns is None:
+            header = self.read_bytes(0, 1)
+            if not header.strip():
+                # An empty file has no header.
+                self._columns = []
+                return self._columns
+            self._columns = pd.read_csv(io.BytesIO(header), sep=self.sep, encoding=self.encoding,
+                                        nrows=0).columns.tolist()
+        return self._columns
+
+    def seek(self, row) -> int:
+        """Returns the byte offset where data row :param row starts."""
+        return int(self.offsets[min(row + 1, self.offsets.size - 1)])
+
+    def read_bytes(self, start_line, stop_line) -> bytes:
+        """Returns the raw bytes of lines start_line up to (not including) stop_line."""
+        start = int(self.offsets[start_line])
+        stop = int(self.offsets[min(stop_line, self.offsets.size - 1)])
+        with open(self.filepath, 'rb') as fh:
+            fh.seek(start)
+            return fh.read(stop - start)
+
+    def _parse(self, data: bytes, index, **kwargs) -> pd.DataFrame:
+        kwargs.setdefault('dtype', str)
+        encoding = 'utf8' if codecs.lookup(self.encoding).name == 'utf-8-sig' else self.encoding
+        if self.quotechar:
+            kwargs.setdefault('quotechar', self.quotechar)
+        df = pd.read_csv(io.BytesIO(data), sep=self.sep, encoding=encoding,
+                         header=None, names=self.columns, skip_blank_lines=False, **kwargs)
+        df.index = index[:df.index.size]
+        return df
+
+    def read_rows(self, start, stop, **kwargs) -> pd.DataFrame:
+        """
+        Parses data rows start up to (not including) stop.
+        :param kwargs: pd.read_csv(**kwargs) (defaults to dtype=str)
+        :return: (pd.DataFrame)
+            Indexed by row number.
+        """
+        stop = min(stop, self.row_count)
+        if stop <= start:
+            return pd.DataFrame(columns=self.columns)
+        return self._parse(self.read_bytes(start + 1, stop + 1), pd.RangeIndex(start, stop), **kwargs)
+
+    def sample(self, n, random_state=None, **kwargs) -> pd.DataFrame:
+        """
+        Parses :param n random data rows (in file order).
+        :param random_state: (int, default None)
+            A seed for repeatable samples.
+        :param kwargs: pd.read_csv(**kwargs) (defaults to dtype=str)
+        :return: (pd.DataFrame)
+            Indexed by row number.
+        """
+        n = min(n, self.row_count)
+        if n <= 0:
+            return pd.DataFrame(columns=self.columns)
+        rows = np.sort(np.random.RandomState(random_state).choice(self.row_count, size=n, replace=False))
+        chunks = []
+        with open(self.filepath, 'rb') as fh:
+            for row in rows:
+                start, stop = int(self.offsets[row + 1]), int(self.offsets[row + 2])
+                fh.seek(start)
+                chunk = fh.read(stop - start)
+                chunks.append(chunk if chunk.endswith(b'\n') else chunk + b'\n')
+        return self._parse(b''.join(chunks), pd.Index(rows), **kwargs)
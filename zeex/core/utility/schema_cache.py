@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+MIT License
+
+Copyright (c) 2016 Zeke Barge
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+A local cache of reflected database schemas (tables, columns, types
+and keys) keyed by connection URL, so the SQL window can list a
+database's tables without reflecting it on startup.
+"""
+import os
+import re
+import json
+import hashlib
+import logging
+import sqlalchemy
+from sqlalchemy import inspect
+from sqlalchemy.types import TypeEngine, NullType
+
+SCHEMA_CACHE_DIRNAME = 'schema_cache'
+
+
+def url_key(url) -> str:
+    """
+    Returns a file-safe key for a connection URL.
+    The password is never part of the key.
+    """
+    url = sqlalchemy.engine.url.make_url(url)
+    args = url.translate_connect_args()
+    args.pop('password', None)
+    data = json.dumps([url.drivername, sorted((k, str(v)) for k, v in args.items())])
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()[:16]
+
+
+def is_memory_url(url) -> bool:
+    """
+    Returns True for in-memory SQLite URLs (i.e. 'sqlite://').
+    Each of their connections can see a different (empty) database
+    so their schemas aren't cached or reflected in the background.
+    """
+    url = sqlalchemy.engine.url.make_url(url)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def column_type(dialect, type_string) -> TypeEngine:
+    """
+    Rebuilds a column type from the string reflect_schema stores (i.e. 'VARCHAR(20)').
+    :param dialect: (sqlalchemy.engine.interfaces.Dialect)
+        The connection's dialect - its ischema_names are tried first.
+    :param type_string: (str)
+    :return: (sqlalchemy.types.TypeEngine)
+        NullType when the type isn't known.
+    """
+    match = re.match(r'^\s*([A-Za-z_][\w ]*?)\s*(?:\((.*)\))?\s*$', type_string or '')
+    if match is None:
+        return NullType()
+    name, args = match.group(1), match.group(2)
+    names = getattr(dialect, 'ischema_names', {})
+    type_cls = names.get(name.upper()) or names.get(name.lower()) or getattr(sqlalchemy.types, name.upper(), None)
+    if not (isinstance(type_cls, type) and issubclass(type_cls, TypeEngine)):
+        return NullType()
+    args = [int(a) for a in (args or '').split(',') if a.strip().isdigit()]
+    try:
+        return type_cls(*args)
+    except TypeError:
+        return type_cls()
+
+
+def reflect_schema(engine, table_names: list = None) -> dict:
+    """
+    Reflects table names, columns, primary & foreign keys into
+    a JSON-serializable dictionary. Column types are stored as strings.
+
+    :param engine: (sqlalchemy.engine.base.Engine)
+    :param table_names: (list, default None)
+        The tables to reflect - None reflects every table.
+    :return: (dict)
+        {'tables': {table_name: {'columns': [...],
+                                 'primary_key': [...],
+                                 'foreign_keys': [...]}}}
+    """
+    inspector = inspect(engine)
+    if table_names is None:
+        table_names = inspector.get_table_names()
+    tables = {}
+    for name in table_names:
+        # Copied first - some dialects (i.e. SQLite) re-sort the cached columns in get_pk_constraint.
+        reflected = list(inspector.get_columns(name))
+        primary_key = inspector.get_pk_constraint(name).get('constrained_columns') or []
+        columns = [{'name': c['name'], 'type': str(c['type']), 'nullable': c.get('nullable', True),
+                    'default': (None if c.get('default') is None else str(c['default'])),
+                    'primary_key': c['name'] in primary_key}
+                   for c in reflected]
+        foreign_keys = [{'constrained_columns': fk['constrained_columns'],
+                         'referred_table': fk['referred_table'],
+                         'referred_columns': fk['referred_columns']}
+                        for fk in inspector.get_foreign_keys(name)]
+        tables[name] = {'columns': columns, 'primary_key': primary_key, 'foreign_keys': foreign_keys}
+    return {'tables': tables}
+
+
+class SchemaCache(object):
+    """
+    Stores reflect_schema dictionaries as JSON files,
+    one per connection URL.
+    """
+    def __init__(self, directory):
+        """
+        :param directory: (str)
+            The directory to store schemas in (created when first needed).
+        """
+        self.directory = directory
+
+    def path(self, url) -> str:
+        return os.path.join(self.directory, url_key(url) + '.json')
+
+    def load(self, url):
+        """
+        Returns the cached schema for the URL or None.
+        Unreadable cache files are ignored.
+        """
+        path = self.path(url)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r') as fh:
+                return json.load(fh)['schema']
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning("Ignoring unreadable schema cache {}: {}".format(path, e))
+            return None
+
+    def save(self, url, schema: dict) -> str:
+        """
+        Writes the schema for the URL (atomically) and returns the file path.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(url)
+        url = sqlalchemy.engine.url.make_url(url)
+        data = {'drivername': url.drivername, 'database': url.database, 'schema': schema}
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as fh:
+            json.dump(data, fh)
+        os.replace(tmp, path)
+        return path
+
+    def remove(self, url):
+        path = self.path(url)
+        if os.path.exists(path):
+            os.remove(path)
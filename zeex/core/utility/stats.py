@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+MIT License
+
+Copyright (c) 2016 Zeke Barge
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Per-column summary statistics that are cached between calls so only
+columns whose values changed get described again. Columns longer than
+STATS_EXACT_ROWS get approximate quantiles (from a sample) and distinct
+counts (from a K-minimum-values sketch) so large frames stay responsive.
+"""
+import logging
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype, is_object_dtype, is_string_dtype
+
+STATS_EXACT_ROWS = 1000000
+STATS_SAMPLE_ROWS = 100000
+STATS_SKETCH_SIZE = 4096
+STATS_SEED = 0
+STATS_PERCENTILES = [0.25, 0.5, 0.75]
+
+
+def series_hashes(series: pd.Series) -> np.ndarray:
+    """
+    Returns a uint64 hash of every value in a Series.
+    """
+    return pd.util.hash_pandas_object(series, index=False).values
+
+
+def series_fingerprint(series: pd.Series, hashes: np.ndarray = None):
+    """
+    Returns a value that changes when any value in the Series changes.
+    The hashes are summed, so the fingerprint ignores row order -
+    just like the statistics it guards.
+
+    :param hashes: (np.ndarray, default None)
+        The series_hashes of :param series - None computes them.
+    :return: (tuple)
+        (dtype, length, hash sum)
+    """
+    if hashes is None:
+        hashes = series_hashes(series)
+    return str(series.dtype), len(series), int(hashes.sum(dtype=np.uint64))
+
+
+def sketch_distinct_count(hashes: np.ndarray, k: int = STATS_SKETCH_SIZE) -> int:
+    """
+    Estimates the number of distinct values from their hashes using
+    a K-minimum-values sketch. The count is exact when there are fewer
+    than :param k distinct values.
+    """
+    if hashes.size == 0:
+        return 0
+    m = min(hashes.size, k * 4)
+    # The m smallest hashes hold every distinct value up to the m-th smallest.
+    smallest = np.unique(np.partition(hashes, m - 1)[:m])
+    if smallest.size < k:
+        if m == hashes.size:
+            return int(smallest.size)
+        smallest = np.unique(hashes)
+        if smallest.size < k:
+            return int(smallest.size)
+    kth = float(smallest[k - 1]) / float(np.iinfo(np.uint64).max)
+    return int(round((k - 1) / kth))
+
+
+def _sample_positions(size, sample_size, seed=STATS_SEED):
+    return np.random.RandomState(seed).randint(0, size, size=sample_size)
+
+
+def describe_numeric_approx(series: pd.Series, sample_size: int = STATS_SAMPLE_ROWS) -> pd.Series:
+    """
+    Describes a numeric Series like pd.Series.describe except
+    the quartiles are calculated from a random sample.
+    """
+    values = series.dropna()
+    sample = values.iloc[_sample_positions(values.size, sample_size)] if values.size else values
+    index = ['count', 'mean', 'std', 'min'] + ["{:g}%".format(p * 100) for p in STATS_PERCENTILES] + ['max']
+    data = [values.size, values.mean(), values.std(), values.min()]
+    data += [sample.quantile(p) if sample.size else np.nan for p in STATS_PERCENTILES]
+    data.append(values.max())
+    return pd.Series(data, index=index, name=series.name, dtype='float64')
+
+
+def describe_object_approx(series: pd.Series, hashes: np.ndarray = None,
+                           sample_size: int = STATS_SAMPLE_ROWS) -> pd.Series:
+    """
+    Describes an object Series like pd.Series.describe except
+    unique is estimated with a sketch and top is the most common
+    value in a random sample.
+    """
+    notnull = series.notnull().values
+    if hashes is None:
+        hashes = series_hashes(series)
+    count = int(notnull.sum())
+    top, freq = np.nan, np.nan
+    if count:
+        values = series[notnull]
+        top = values.iloc[_sample_positions(count, sample_size)].value_counts().index[0]
+        freq = int((values == top).sum())
+    return pd.Series([count, sketch_distinct_count(hashes[notnull]), top, freq],
+                     index=['count', 'unique', 'top', 'freq'], name=series.name, dtype='object')
+
+
+class FrameStatistics(object):
+    """
+    Caches a description of each column of a DataFrame.
+    Calling FrameStatistics.describe again only describes
+    the columns whose values changed since the last call.
+
+    Callers that know which columns changed can invalidate them and
+    describe with verify=False so the other columns aren't hashed again.
+    """
+    def __init__(self, exact_rows: int = STATS_EXACT_ROWS, sample_rows: int = STATS_SAMPLE_ROWS):
+        self.exact_rows = exact_rows
+        self.sample_rows = sample_rows
+        self._cache = {}
+
+    def clear(self):
+        self._cache.clear()
+
+    def invalidate(self, columns=None):
+        """
+        Drops the cached descriptions of :param columns (None drops all).
+        """
+        if columns is None:
+            return self.clear()
+        for column in columns:
+            self._cache.pop(column, None)
+
+    def is_approximate(self, series: pd.Series) -> bool:
+        return len(series) > self.exact_rows
+
+    def describe_column(self, series: pd.Series, hashes: np.ndarray = None) -> pd.Series:
+        """
+        Describes a Series without using the cache.
+        """
+        if self.is_approximate(series):
+            if is_numeric_dtype(series) and not is_bool_dtype(series):
+                return describe_numeric_approx(series, sample_size=self.sample_rows)
+            if is_object_dtype(series) or is_string_dtype(series):
+                return describe_object_approx(series, hashes=hashes, sample_size=self.sample_rows)
+        return series.describe()
+
+    def column(self, df: pd.DataFrame, column, verify: bool = True) -> pd.Series:
+        """
+        Returns the (cached) description of a column in :param df.
+        :param verify: (bool, default True)
+            True hashes the column's values to check the cached description.
+            False trusts the cached description while the column's dtype
+            and length are unchanged (see FrameStatistics.invalidate).
+        """
+        series = df[column]
+        shape = (str(series.dtype), len(series))
+        cached = self._cache.get(column)
+        if not verify and cached is not None and cached[0] == shape:
+            return cached[2]
+
+        hashes, key = None, None
+        if verify or (self.is_approximate(series) and not is_numeric_dtype(series)):
+            try:
+                hashes = series_hashes(series)
+                key = series_fingerprint(series, hashes=hashes)
+            except TypeError:
+                # Unhashable values (lists, dicts...) are described every time.
+                pass
+
+        if key is not None and cached is not None and cached[1] == key:
+            return cached[2]
+        desc = self.describe_column(series, hashes=hashes)
+        self._cache[column] = (shape, key, desc)
+        return desc
+
+    def describe(self, df: pd.DataFrame, verify: bool = True) -> pd.DataFrame:
+        """
+        Returns the same frame as df.describe(include='all').
+        :param verify: (bool, default True)
+            See FrameStatistics.column.
+        """
+        if df.columns.size == 0:
+            raise ValueError("Cannot describe a DataFrame without columns")
+        for column in list(self._cache.keys()):
+            if column not in df.columns:
+                self._cache.pop(column)
+
+        descs = [self.column(df, c, verify=verify) for c in df.columns]
+        # Row order matches pandas: shortest descriptions first.
+        names = []
+        for desc in sorted(descs, key=len):
+            names.extend(n for n in desc.index if n not in names)
+        logging.debug("FrameStatistics.describe: {} columns".format(len(descs)))
+        result = pd.concat([d.reindex(names) for d in descs], axis=1)
+        result.columns = df.columns
+        return result
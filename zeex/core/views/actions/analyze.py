@@ -43,13 +43,18 @@ class FileAnalyzerDialog(QtGui.QDialog, Ui_FileAnalyzerDialog):
 
     def configure(self):
         self.tableView.setModel(self.analyze_model)
-        self.btnRefresh.clicked.connect(self.sync)
+        self.btnRefresh.clicked.connect(self.refresh)
         # TODO: Make these buttons work and show them.
         self.btnExport.setVisible(False)
         self.btnPivot.setVisible(False)
         self.df_model.dataChanged.connect(self.sync)
         self.sync()
 
+    def refresh(self):
+        # Edits made in place without a dataChanged range are only found by hashing.
+        self.analyze_model.sync(verify=True)
+        self.sync()
+
     def sync(self):
         self.setWindowTitle("Analyze {}".format(os.path.basename(self.df_model.filePath)))
 
@@ -201,16 +201,20 @@ class FieldsEditDialog(QtGui.QDialog, Ui_FieldsEditDialog):
         df = self.dfmodel.dataFrame()
         dt_model = self.dfmodel.columnDtypeModel()
         dt_model.setEditable(True)
-        all_cols = df.columns.tolist()
-        new_df = df.copy()
-        new_df = dataframe_to_datetime(new_df)
-        new_cols = [c for c in all_cols
-                    if new_df[c].dtype != df[c].dtype
-                    and 'date' in str(new_df[c].dtype)]
+        # Converted columns are replaced in place so columns
+        # that would lose values to NaT are left as they are.
+        df, report = dataframe_to_datetime(df, report=True, max_loss=0)
+        lost = report.loc[report['lost'] > 0]
+        if not lost.empty:
+            msg = "Left {} column(s) unparsed - parsing them as dates loses values:\n{}".format(
+                  lost.index.size, lost.to_string(index=False))
+            self._date_loss_box = widgets.get_ok_msg_box(self, msg, title="Parse Dates")
+            self._date_loss_box.show()
+        new_cols = report.loc[report['converted'], 'column'].tolist()
         if new_cols:
-            self.dfmodel.setDataFrame(new_df, filePath=self.dfmodel.filePath)
+            self.dfmodel.setDataFrame(df, copyDataFrame=False, filePath=self.dfmodel.filePath)
             for n in new_cols:
-                self.fmodel.set_field(n, dtype=new_df[n].dtype)
+                self.fmodel.set_field(n, dtype=df[n].dtype)
 
     def export_template(self, filename=None, to_frame=False, **kwargs):
         fm = self.fmodel
@@ -24,6 +24,7 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 import os
+import logging
 import pandas as pd
 from zeex.core.ui.actions.import_ui import Ui_ImportFileDialog
 from zeex.core.compat import QtGui, QtCore
@@ -32,8 +33,14 @@ from zeex.core.ctrls.dataframe import DataFrameModelManager, DataFrameModel,SEPA
 from zeex.core.utility.widgets import configure_combo_box
 
 
+# Files larger than this (in megabytes) are streamed in chunks of IMPORT_CHUNKSIZE rows.
+IMPORT_CHUNK_MEGABYTES = 1000
+IMPORT_CHUNKSIZE = 500 * 1000
+
+
 class DataFrameModelImportDialog(QtGui.QDialog, Ui_ImportFileDialog):
     signalImported = QtCore.Signal(str) # file path
+    signalChunkImported = QtCore.Signal(str, int) # file path, rows imported so far
 
     def __init__(self, df_manager: DataFrameModelManager, file_path=None, dir='', **kwargs):
         QtGui.QDialog.__init__(self, **kwargs)
@@ -42,6 +49,8 @@ class DataFrameModelImportDialog(QtGui.QDialog, Ui_ImportFileDialog):
         self.dir = dir
         if file_path is not None and dir == '':
             self.dir = os.path.dirname(file_path)
+        self.compact_report = None
+        self.date_report = None
         self.setupUi(self)
         self.configure()
 
@@ -87,7 +96,94 @@ class DataFrameModelImportDialog(QtGui.QDialog, Ui_ImportFileDialog):
             df = pandatools.dataframe_remove_linebreaks(df, copy=False)
 
         if parse_dates:
-            df = pandatools.dataframe_to_datetime(df)
+            # Columns that would lose values to NaT are left as they are.
+            df, report = pandatools.dataframe_to_datetime(df, report=True, max_loss=0)
+            lost = report.loc[report['lost'] > 0]
+            if not lost.empty:
+                logging.warning("Left {} column(s) unparsed - parsing them as dates loses values:\n{}".format(
+                                lost.index.size, lost.to_string(index=False)))
+            if self.date_report is not None:
+                report = pd.concat([self.date_report, report], ignore_index=True)
+            self.date_report = report
+        return df
+
+    def process_chunks(self, chunks, **kwargs):
+        """
+        Generator stage that runs each chunk from a chunked
+        reader through DataFrameModelImportDialog.process_dataframe.
+
+        :param chunks: (iterable)
+            Yields pd.DataFrame chunks.
+        :param kwargs: (DataFrameModelImportDialog.process_dataframe(**kwargs))
+        :return: (pd.DataFrame)
+            Processed chunks one at a time.
+        """
+        for chunk in chunks:
+            yield self.process_dataframe(chunk, **kwargs)
+
+    def get_progress_dialog(self, file_path, chunksize) -> QtGui.QProgressDialog:
+        """
+        Creates a QProgressDialog for a chunked import.
+        The maximum is the estimated number of chunks in the file.
+
+        :param file_path: (str)
+            The file being imported.
+        :param chunksize: (int)
+            The number of rows per chunk.
+        :return: (QtGui.QProgressDialog)
+        """
+        rows = None
+        if os.path.splitext(file_path)[1].lower() in ['.txt', '.tsv', '.csv']:
+            # An exact count when the file has already been indexed.
+            rows = self.df_manager.row_count(file_path)
+        if rows is None:
+            rows = pandatools.estimate_row_count(file_path)
+        chunks = (0 if rows is None else int(rows / chunksize) + 1)
+        progress = QtGui.QProgressDialog("Importing {}...".format(os.path.basename(file_path)),
+                                         "Cancel", 0, chunks, self)
+        progress.setWindowTitle("Import")
+        progress.setWindowModality(QtCore.Qt.WindowModal)
+        progress.setMinimumDuration(0)
+        return progress
+
+    def import_chunks(self, file_path, reader, chunksize, **kwargs):
+        """
+        Streams a chunked reader through the processing stage
+        and collects the chunks once at the end while showing
+        per-chunk progress.
+
+        :param file_path: (str)
+            The file being imported.
+        :param reader: (pd.io.parsers.TextFileReader)
+            The chunked reader.
+        :param chunksize: (int)
+            The number of rows per chunk.
+        :param kwargs: (DataFrameModelImportDialog.process_dataframe(**kwargs))
+        :return: (pd.DataFrame, None)
+            None if the user canceled the import.
+        """
+        progress = self.get_progress_dialog(file_path, chunksize)
+        canceled = []
+
+        def update(count, rows):
+            if progress.maximum() > 0:
+                progress.setValue(min(count, progress.maximum() - 1))
+            progress.setLabelText("Imported {:,} rows from {}".format(rows, os.path.basename(file_path)))
+            self.signalChunkImported.emit(file_path, rows)
+            QtGui.QApplication.processEvents()
+            if progress.wasCanceled():
+                canceled.append(True)
+                return False
+
+        try:
+            df = pandatools.dataframe_collect_chunks(self.process_chunks(reader, **kwargs), callback=update)
+        finally:
+            progress.close()
+            reader.close()
+
+        if canceled:
+            logging.info("Canceled import of {}".format(file_path))
+            return None
         return df
 
     def set_separator(self, sep):
@@ -121,6 +217,7 @@ class DataFrameModelImportDialog(QtGui.QDialog, Ui_ImportFileDialog):
         trim_spaces = self.checkBoxTrimSpaces.isChecked()
         has_headers = self.checkBoxHasHeaders.isChecked()
         parse_dates = self.checkBoxParseDates.isChecked()
+        compact = self.checkBoxCompactLoad.isChecked()
         encoding = self.comboBoxEncoding.currentText()
 
         kwargs = dict()
@@ -135,24 +232,27 @@ class DataFrameModelImportDialog(QtGui.QDialog, Ui_ImportFileDialog):
             kwargs['header'] = 0
         kwargs['first_codec'] = ENCODINGS.get(encoding, 'utf8')
 
-        if file_megabytes > 1000:
-            kwargs['chunksize'] = 50 * 1000 * 1000
+        if file_megabytes > IMPORT_CHUNK_MEGABYTES:
+            kwargs['chunksize'] = IMPORT_CHUNKSIZE
         df_reader = pandatools.superReadFile(file_path, **kwargs)
+        self.date_report = None
+        process_kwargs = dict(trim_spaces=trim_spaces,
+                              remove_linebreaks=remove_linebreaks,
+                              parse_dates=parse_dates)
 
         if kwargs.get('chunksize', 0) > 0:
-            # Process the dataframe in chunks
-            df = pd.DataFrame()
-            for chunk in df_reader:
-
-                chunk = self.process_dataframe(chunk, trim_spaces=trim_spaces,
-                                               remove_linebreaks=remove_linebreaks,
-                                               parse_dates=parse_dates)
-                df = df.append(chunk)
+            # Stream the file through the processing stage in chunks.
+            df = self.import_chunks(file_path, df_reader, kwargs['chunksize'], **process_kwargs)
+            if df is None:
+                return None
         else:
+            df = self.process_dataframe(df_reader, **process_kwargs)
 
-            df = self.process_dataframe(df_reader, trim_spaces=trim_spaces,
-                                        remove_linebreaks=remove_linebreaks,
-                                        parse_dates=parse_dates)
+        if compact:
+            df, self.compact_report = pandatools.dataframe_compact(df)
+            logging.info("Compact load of {} saved {:.1f} MB:\n{}".format(
+                         file_path, self.compact_report['saved_bytes'].sum() / 1024 ** 2,
+                         self.compact_report.to_string(index=False)))
 
         dfm = DataFrameModel(dataFrame=df,filePath=file_path)
         self.df_manager.set_model(df_model=dfm, file_path=file_path)
@@ -23,21 +23,54 @@ SOFTWARE.
 """
 
 import os
-import pandas as pd
 import logging
 from functools import partial
 from zeex.core.compat import QtGui, QtCore
 from zeex.core.models.actions import FileViewModel
-from zeex.core.ctrls.dataframe import DataFrameModelManager
+from zeex.core.ctrls.dataframe import DataFrameModelManager, DataFrameModelLoader
 from zeex.core.ui.actions.merge_purge_ui import Ui_MergePurgeDialog
 from zeex.core.utility.collection import DictConfig, SettingsINI
-from zeex.core.utility.pandatools import gather_frame_fields
-from zeex.core.utility.widgets import create_standard_item_model
+from zeex.core.utility.merge_purge import MergePurgeEngine, MergePurgeCancelled
+from zeex.core.utility.widgets import create_standard_item_model, get_ok_msg_box
 from zeex.core.views.basic.map_grid import MapGridDialog
 from zeex.core.views.basic.push_grid import PushGridHandler
 from zeex.core.ctrls.dataframe import DataFrameModel
 
 
+class MergePurgeJob(QtCore.QThread):
+    """
+    Runs a MergePurgeEngine on a background thread so the
+    GUI stays responsive. Progress is reported per stage and the
+    job can be cancelled between chunks.
+    """
+    signalStage = QtCore.Signal(str, int) # stage name, rows processed
+    signalDone = QtCore.Signal(str) # report path
+    signalFailed = QtCore.Signal(str) # error message
+    signalCancelled = QtCore.Signal()
+
+    def __init__(self, engine: MergePurgeEngine, parent=None):
+        QtCore.QThread.__init__(self, parent)
+        self.engine = engine
+        self.engine.callback = self.signalStage.emit
+        self.report_path = None
+
+    def run(self):
+        try:
+            self.report_path = self.engine.execute()
+        except MergePurgeCancelled:
+            logging.info("Merge/purge cancelled: {}".format(self.engine.dest_path))
+            self.signalCancelled.emit()
+        except Exception as e:
+            logging.exception(e)
+            self.signalFailed.emit(str(e))
+        else:
+            self.signalDone.emit(self.report_path)
+
+    @QtCore.Slot()
+    def cancel(self):
+        self.engine.cancel()
+
+
 class MergePurgeDialog(QtGui.QDialog, Ui_MergePurgeDialog):
     """
     This dialog allows a user to do large updates on a given source DataFrameModel.
@@ -78,6 +111,19 @@ class MergePurgeDialog(QtGui.QDialog, Ui_MergePurgeDialog):
         self.dedupeOnHandler = None
         self.uniqueFieldsHandler = None
         self.gatherFieldsHandler = None
+        self.loader = DataFrameModelLoader(df_manager, parent=self)
+        self.loader.signalFileLoaded.connect(self._file_loaded)
+        self.loader.signalFileFailed.connect(self._file_failed)
+        self.loader.signalFileProgress.connect(self.update_load_progress)
+        self.loader.signalFinished.connect(self._files_loaded)
+        self._loader_signals = {}
+        self._load_errors = []
+        self._load_error_box = None
+        self._load_total = 0
+        self._load_progress = None
+        self.job = None
+        self._job_progress = None
+        self._job_paths = None
         self.configure()
         if self.source_model is not None:
             self.set_source_model(source_model, configure=True)
@@ -301,10 +347,12 @@ class MergePurgeDialog(QtGui.QDialog, Ui_MergePurgeDialog):
 
         return create_standard_item_model(columns)
 
-    def open_file(self, file_names: list=None, model_signal=None, allow_multi=True):
+    def open_file(self, file_names: list=None, model_signal=None, allow_multi=True, wait=False):
         """
         Opens a Merge or Purge file (or really any file) and calls the
         given model signal after registering the DataFrameModel with the DataFrameModelManager.
+        Files are read in the background by the dialog's DataFrameModelLoader
+        so the window stays responsive while several files load at once.
         :param file_names: (list, default None)
             An optional list of filenames to open.
             The user must select filenames otherwise.
@@ -313,6 +361,8 @@ class MergePurgeDialog(QtGui.QDialog, Ui_MergePurgeDialog):
         :param allow_multi: (bool, default True)
             True allows multiple files to be read (and the signal called each time).
             False allows only the first file to be read.
+        :param wait: (bool, default False)
+            True blocks until all of the files are loaded.
         :return: None
             You can call MergePurgeDialog.df_manager.get_frame(filename) to
             retrieve a DataFrameModel.
@@ -323,24 +373,80 @@ class MergePurgeDialog(QtGui.QDialog, Ui_MergePurgeDialog):
                                                             dir=dirname)[0]
 
         if isinstance(file_names, str):
-            file_names = list(file_names)
+            file_names = [file_names]
 
         assert not isinstance(file_names, str) and hasattr(file_names, "__iter__"), "file_names is not list-like!"
 
         if allow_multi is False:
-            file_names = list(file_names[0])
+            file_names = list(file_names[:1])
 
+        load_paths = []
         for f in file_names:
-            try:
-                if not isinstance(f, str) and hasattr(f, '__iter__'):
-                    f = f[0]
-                if os.path.exists(f):
-                    self.df_manager.read_file(f)
-                    if model_signal is not None:
-                        model_signal.emit(f)
-                        logging.info("Emitted signal: {}".format(f))
-            except Exception as e:
-                logging.error(e)
+            if not isinstance(f, str) and hasattr(f, '__iter__'):
+                f = f[0]
+            if os.path.exists(f):
+                self._loader_signals[f] = model_signal
+                load_paths.append(f)
+
+        if not load_paths:
+            return None
+
+        self._load_total += len(load_paths)
+        self.update_load_progress()
+        self.loader.load(load_paths)
+        if wait:
+            self.loader.wait()
+
+    def update_load_progress(self, file_path=None, rows=None):
+        """
+        Shows/updates a progress dialog while files are loading.
+        :param file_path: (str, default None)
+            The file path to report rows for.
+        :param rows: (int, default None)
+            The number of rows read so far from the file path.
+        :return: None
+        """
+        pending = self.loader.pending
+        if self._load_progress is None:
+            self._load_progress = QtGui.QProgressDialog("Loading files...", "Cancel", 0, 0, self)
+            self._load_progress.setWindowModality(QtCore.Qt.WindowModal)
+            self._load_progress.canceled.connect(self.loader.cancel)
+        done = self._load_total - len(pending)
+        label = "Loaded {} of {} files".format(done, self._load_total)
+        if file_path is not None:
+            label += "\n{}: {:,} rows".format(os.path.basename(file_path), rows)
+        self._load_progress.setMaximum(self._load_total)
+        self._load_progress.setValue(done)
+        self._load_progress.setLabelText(label)
+
+    @QtCore.Slot(str)
+    def _file_loaded(self, file_path):
+        model_signal = self._loader_signals.pop(file_path, None)
+        if model_signal is not None:
+            model_signal.emit(file_path)
+            logging.info("Emitted signal: {}".format(file_path))
+        if self._load_progress is not None:
+            self.update_load_progress()
+
+    @QtCore.Slot(str, str)
+    def _file_failed(self, file_path, error):
+        self._loader_signals.pop(file_path, None)
+        self._load_errors.append("{}: {}".format(file_path, error))
+        if self._load_progress is not None:
+            self.update_load_progress()
+
+    @QtCore.Slot()
+    def _files_loaded(self):
+        self._loader_signals.clear()
+        self._load_total = 0
+        if self._load_progress is not None:
+            self._load_progress.close()
+            self._load_progress = None
+        if self._load_errors:
+            msg = "Failed to load {} file(s):\n{}".format(len(self._load_errors), "\n".join(self._load_errors))
+            self._load_errors = []
+            self._load_error_box = get_ok_msg_box(self, msg, title="Merge/Purge - Load Failed")
+            self._load_error_box.show()
 
     @QtCore.Slot(str)
     def add_merge_file(self, file_path):
@@ -474,132 +580,65 @@ class MergePurgeDialog(QtGui.QDialog, Ui_MergePurgeDialog):
     def execute(self):
         """
         Executes the merge_purge based upon the given settings.
-        :return: None
+        The job is run by a MergePurgeEngine on a MergePurgeJob thread
+        using the DataFrames currently loaded in the dialog.
+        signalExecuted is emitted when the job finishes.
+        :return: (MergePurgeJob, None)
+            The running job - None if a job is already running.
         """
+        if self.job is not None and self.job.isRunning():
+            return None
+
         if self.source_model is None:
             self.set_source_model()
 
-        suppressed_results = {}
-        merged_results = {}
         source_path = self.sourcePathLineEdit.text()
         dest_path = self.destPathLineEdit.text()
-        source_df = self.source_model.dataFrame().copy()
-        source_df.loc[:, 'ORIG_IDXER'] = source_df.index
-        source_size = source_df.index.size
-        index_label = self.primaryKeyComboBox.currentText()
-
-        sort_on = self.sortOnHandler.get_model_list(left=False)
-        ascending = self.sortAscHandler.get_model_list(left=False)
-        dedupe_on = self.dedupeOnHandler.get_model_list(left=False)
-        gather_fields = self.gatherFieldsHandler.get_model_list(left=False)
-        overwrite_existing = self.gatherFieldsOverWriteCheckBox.isChecked()
-
-        # Make sure ascending/sort_on lists are equal.
-        while len(sort_on) < len(ascending):
-            ascending.append(False)
-
-        while len(sort_on) > len(ascending):
-            ascending.pop()
-
-        # Get all merge models and merge.
-        # Absorb all rows and columns
-        for file_path, merge_model in self._merge_files.items():
-            pre_size = source_df.index.size
-            other_df = merge_model.dataFrame()
-            if gather_fields:
-                assert index_label in other_df.columns, "DataFrameModel for {} missing column {}".format(
-                                                         merge_model.filePath, index_label)
-                source_df = gather_frame_fields(source_df, other_df, index_label=index_label,
-                                                fields=gather_fields, copy_frames=True,
-                                                append_missing=True, overwrite=overwrite_existing)
-            else:
-                source_df = pd.concat([source_df, other_df])
-            merged_results.update({merge_model.filePath: source_df.index.size - pre_size})
-        # Get all suppression models and suppress.
-        for file_path, suppress_model in self._purge_files.items():
-            map_dict = self._field_map_data.get(file_path, {})
-            sframe = suppress_model.dataFrame().copy()
-            sframe.drop(['ORIG_IDXER'], axis=1, inplace=True, errors='ignore')
-
-            if map_dict:
-                # A mapping exists - rename the data and get the key_cols
-                key_cols = list(map_dict.values())
-                sframe.rename(columns=map_dict, inplace=True)
-            else:
-                # No mapping exists - Try to use the dedupe_on cols as key_cols
-                key_cols = dedupe_on.copy()
-                missing = [x for x in key_cols if x not in sframe.columns]
-                if missing:
-                    raise KeyError("Suppression file {} must have a field mapping or \
-                                    have the dedupe column labels, it has neither!.".format(
-                                    suppress_model.filePath))
-
-            sframe = sframe.loc[:, key_cols].drop_duplicates(key_cols)
-            badframe = pd.merge(source_df, sframe, how='inner', left_on=key_cols, right_on=key_cols)
-            source_df = source_df.loc[~source_df.index.isin(badframe.loc[:, 'ORIG_IDXER'].tolist()), :]
-            suppressed_results.update({suppress_model.filePath: badframe.index.size})
-
-        # Sort the data
-        if sort_on and ascending:
-            source_df.sort_values(sort_on, ascending=ascending, inplace=True)
-
-        # Deduplicate the data.
-        if dedupe_on:
-            pre_size = source_df.index.size
-            source_df.drop_duplicates(dedupe_on, inplace=True)
-            dedupe_lost = pre_size - source_df.index.size
-        else:
-            dedupe_lost = 0
-
-        # Export the data - done!
-        source_df.drop(['ORIG_IDXER'], axis=1, inplace=True, errors='ignore')
-        source_df.to_csv(dest_path, index=False)
-        logging.info("Exported: {}".format(dest_path))
-
-        merge_string = "\n".join("Gained {} merging {}".format(v, k) for k, v in merged_results.items())
-        suppress_string = "\n".join("Lost {} suppressing {}".format(v, k) for k,v in suppressed_results.items())
-        report = """
-        Merge Purge Report
-        ==================
-        Original Size: {}
-        Final Size: {}
-        Source Path: {}
-        Output Path: {}
-
-
-        Merge:
-        ==================
-        {}
-
-
-        Purge:
-        ==================
-        {}
-
-
-        Sort:
-        ==================
-            SORT BY: {}
-            SORT ASCENDING: {}
-
-
-        Dedupe:
-        ==================
-            DEDUPE ON: {}
-            RECORDS LOST: {}
-
-
-
-        """.format(source_size, source_df.index.size, source_path,
-                   dest_path, merge_string, suppress_string,
-                   sort_on, ascending, dedupe_on, dedupe_lost)
-
-        report_path = os.path.splitext(dest_path)[0] + "_report.txt"
-        with open(report_path, "w") as fh:
-            fh.write(report)
+        engine = MergePurgeEngine(self.source_model.dataFrame(), dest_path,
+                                  source_path=source_path,
+                                  merge_files={p: m.dataFrame() for p, m in self._merge_files.items()},
+                                  purge_files={p: m.dataFrame() for p, m in self._purge_files.items()},
+                                  field_map_data=self._field_map_data,
+                                  primary_key=self.primaryKeyComboBox.currentText(),
+                                  dedupe_on=self.dedupeOnHandler.get_model_list(left=False),
+                                  sort_on=self.sortOnHandler.get_model_list(left=False),
+                                  sort_ascending=self.sortAscHandler.get_model_list(left=False),
+                                  gather_fields=self.gatherFieldsHandler.get_model_list(left=False),
+                                  gather_fields_overwrite=self.gatherFieldsOverWriteCheckBox.isChecked())
+        self._job_paths = (source_path, dest_path)
+        self._job_progress = QtGui.QProgressDialog("Starting merge/purge...", "Cancel", 0, 0, self)
+        self._job_progress.setWindowModality(QtCore.Qt.WindowModal)
+
+        self.job = MergePurgeJob(engine, parent=self)
+        self.job.signalStage.connect(self.update_job_progress)
+        self.job.signalDone.connect(self._job_done)
+        self.job.signalFailed.connect(self._job_failed)
+        self.job.finished.connect(self._job_finished)
+        self._job_progress.canceled.connect(self.job.cancel)
+        self._job_progress.show()
+        self.job.start()
+        return self.job
+
+    @QtCore.Slot(str, int)
+    def update_job_progress(self, stage, rows):
+        if self._job_progress is not None:
+            self._job_progress.setLabelText("Merge/purge: {} ({:,} rows)".format(stage.replace('_', ' '), rows))
 
+    @QtCore.Slot(str)
+    def _job_done(self, report_path):
+        source_path, dest_path = self._job_paths
         self.signalExecuted.emit(source_path, dest_path, report_path)
 
+    @QtCore.Slot(str)
+    def _job_failed(self, message):
+        QtGui.QMessageBox.critical(self, "Merge/Purge Failed", message)
+
+    @QtCore.Slot()
+    def _job_finished(self):
+        if self._job_progress is not None:
+            self._job_progress.close()
+            self._job_progress = None
+
     def get_settings(self, dc:DictConfig = None, section="MERGE_PURGE") -> DictConfig:
         """
         Gathers the settings out of the Dialog and
@@ -22,11 +22,10 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 import os
-import pandas as pd
 import logging
 from zeex.core.ui.actions.normalize_ui import Ui_ColumnNormalizerDialog
 from zeex.core.compat import QtGui, QtCore
-import zeex.core.utility.pandatools as pandatools
+from zeex.core.utility.normalize import NormalizePlan
 from zeex.core.ctrls.dataframe import DataFrameModel
 from zeex.core.utility.widgets import configure_combo_box
 from zeex.core.utility.collection import DictConfig, SettingsINI
@@ -205,95 +204,19 @@ class ColumnNormalizerDialog(QtGui.QDialog, Ui_ColumnNormalizerDialog):
     def execute(self):
         """
         Applies settings the user has chosen in the dialog to the DataFrameModel.dataFrame().
+        The settings are compiled into a NormalizePlan so each column
+        is only passed over once no matter how many options are active.
         :return: None
         """
-        df = self.df_model.dataFrame()
-        df.columns = [str(x) for x in df.columns]
-        columns = self.listViewColumns.model().get_items_checked()
-        columns = [i.text() for i in columns]
-        if not columns:
-            columns = [c for c in df.columns.tolist() if str(df[c].dtype) is 'object']
-
-        case_active = self.checkBoxSetCase.isChecked()
-        mos_active = self.checkBoxMergeOrSplit.isChecked()
-        replace_spaces_active = self.checkBoxReplaceSpaces.isChecked()
-        remove_special_chars_active = self.checkBoxRemoveSpecialChars.isChecked()
-        scrub_linebreaks_active = self.checkBoxScrubLineBreaks.isChecked()
-        trim_spaces_active = self.checkBoxTrimSpaces.isChecked()
-        drop_fill_active = self.checkBoxDropFillNA.isChecked()
         activation_options = [box.isChecked() for box in self.findChildren(QtGui.QCheckBox)]
-        case = self.comboBoxSetCase.currentText()
-        drop_fill = self.comboBoxDropFillNA.currentText().lower()
-        dof_how = self.comboBoxDropFillNAHow.currentText()
-        dof_with = self.lineEditDropFillNA.text()
-        merge_or_split = self.comboBoxMergeOrSplit.currentText().lower()
-        mos_sep = self.lineEditMergeOrSplitSep.text()
-        replace_spaces = self.lineEditReplaceSpaces.text()
-        trim_spaces = self.checkBoxTrimSpaces.isChecked()
-        remove_special_chars_keeps = [e for e in self.lineEditRemoveSpecialCharsKeeps.text()
-                                      if not e.isalnum() and e is not '']
-
-        if any(activation_options):
-            self.df_model.layoutAboutToBeChanged.emit()
-
-        if drop_fill_active:
-            if 'drop' in drop_fill:
-                df = df.dropna(axis=0, how=dof_how, subset=columns)
-                if dof_how == 'any':
-                    for c in columns:
-                        df = df.loc[~df[c].isin(['']), :]
-            else:
-                try:
-                    dof_with = int(dof_with)
-                except ValueError:
-                    try:
-                        dof_with = float(dof_with)
-                    except ValueError:
-                        pass
-                [df.loc[:, c].fillna(value=dof_with) for c in columns]
-
-        if scrub_linebreaks_active:
-            df = pandatools.dataframe_remove_linebreaks(df, columns=columns, copy=False)
-
-        if trim_spaces and trim_spaces_active:
-            for c in columns:
-                df.loc[:, c] = pandatools.series_strip(df.loc[:, c])
-
-        if remove_special_chars_active:
-            if not drop_fill_active:
-                for c in columns:
-                    df.loc[:, c] = df.loc[:, c].fillna(value='')
-            for c in columns:
-
-                df.loc[:, c] = df.loc[:, c].apply(lambda x: ''.join(e for e in str(x)
-                                                                    if e.isalnum()
-                                                                    or e in remove_special_chars_keeps))
-
-        if replace_spaces_active:
-            for c in columns:
-                df.loc[:, c] = df.loc[:, c].apply(lambda x: str(x).replace(' ', replace_spaces))
-
-        if case not in ['default', ''] and case_active:
-            for c in columns:
-                df.loc[:, c] = pandatools.series_set_case(df.loc[:, c], how=case)
-
-        if mos_active:
-            if merge_or_split == 'merge':
-                series = pandatools.dataframe_merge_to_series(df, columns, sep=mos_sep)
-                frame = series.to_frame()
-
-            elif merge_or_split == 'split':
-                column = columns[0]
-                frame = pandatools.series_split(df.loc[:, column],sep=mos_sep)
-
-            df = pd.merge(df, frame, left_index=True, right_index=True)
-            df.columns = pandatools.rename_dupe_cols(df.columns)
-
-        if any(activation_options):
-            logging.info("Executed normalization on {}".format(self.df_model.filePath))
-            self.df_model.setDataFrame(df, filePath=self.df_model.filePath)
-
-
-
+        if not any(activation_options):
+            return None
 
+        df = self.df_model.dataFrame()
+        df.columns = [str(x) for x in df.columns]
+        plan = NormalizePlan.from_settings(self.get_settings())
 
+        self.df_model.layoutAboutToBeChanged.emit()
+        df = plan.apply(df)
+        logging.info("Executed normalization on {}".format(self.df_model.filePath))
+        self.df_model.setDataFrame(df, filePath=self.df_model.filePath)
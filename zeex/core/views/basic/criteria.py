@@ -84,6 +84,8 @@ class CriteriaTableModel(QtGui.QStandardItemModel):
 
 
 class CriteriaDialog(QtGui.QDialog, Ui_CriteriaDialog):
+    signalCriteriaApplied = QtCore.Signal(list) # CriteriaDialog.criteria_values
+
     def __init__(self, *args, **kwargs):
         QtGui.QDialog.__init__(self, *args, **kwargs)
         self.configure()
@@ -102,12 +104,22 @@ class CriteriaDialog(QtGui.QDialog, Ui_CriteriaDialog):
         return [{h: d for h, d in zip(headers, c)}
                 for c in self.criteria_list]
 
+    @property
+    def criteria_values(self) -> list:
+        """
+        Returns the criteria as a list of dicts
+        of text (group, field, condition, value, andor).
+        """
+        return [{h: (None if d is None else d.text()) for h, d in c.items()}
+                for c in self.criteria_dict]
+
     def configure(self):
         self.setupUi(self)
         self.btnAddCriteria.clicked.connect(self.add_criteria)
         self.btnDeleteCriteria.clicked.connect(self.delete_criteria)
         self.btnPushDown.clicked.connect(self.push_field_down)
         self.btnPushUp.clicked.connect(self.push_field_up)
+        self.btnApplyCriteria.clicked.connect(self.apply_criteria)
         self.tableViewCriteria.setModel(CriteriaTableModel())
 
     def add_criteria(self):
@@ -118,6 +130,9 @@ class CriteriaDialog(QtGui.QDialog, Ui_CriteriaDialog):
                     self.comboBoxAndOr.currentText()]
         self.criteria_table_model.add_criterion(data)
 
+    def apply_criteria(self):
+        self.signalCriteriaApplied.emit(self.criteria_values)
+
     def add_group(self, name=None):
         if name is None:
             name = self.lineEditGroup.text()
@@ -21,6 +21,7 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
+import os
 import zeex.core.utility.pandatools as pandatools
 from zeex.core.compat import QtGui
 from zeex.core.ui.file_ui import Ui_FileWindow
@@ -33,8 +34,13 @@ from zeex.core.views.actions.normalize import ColumnNormalizerDialog
 from zeex.core.views.actions.split import SplitFileDialog
 from zeex.icons import icons_rc
 from zeex.core.ctrls.dataframe import DataFrameModel
+from zeex.core.models.filetable import LazyFileTableModel
 from qtpandas.views.DataTableView import DataTableWidget
 
+# Text files larger than this (in megabytes) are browsed in a LazyFileTableWindow.
+LAZY_VIEW_MEGABYTES = 1000
+LAZY_VIEW_EXTENSIONS = ['.txt', '.tsv', '.csv']
+
 
 class FileTableWindow(QtGui.QMainWindow, Ui_FileWindow):
     """
@@ -151,4 +157,27 @@ class FileTableWindow(QtGui.QMainWindow, Ui_FileWindow):
         self.dialog_export.export()
 
 
+class LazyFileTableWindow(QtGui.QMainWindow):
+    """
+    A read-only window for browsing files too large to load.
+    Rows are read from the file as the view scrolls to them
+    (see LazyFileTableModel).
+    """
+    def __init__(self, model: LazyFileTableModel, parent=None):
+        QtGui.QMainWindow.__init__(self, parent=parent)
+        self.model = model
+        self.view = QtGui.QTableView(self)
+        self.view.setModel(model)
+        self.setCentralWidget(self.view)
+        self.setWindowTitle("{} (read-only, {:,} rows)".format(model.filePath, model.rowCount()))
+        self.setWindowIcon(QtGui.QIcon(':/standard_icons/spreadsheet.png'))
+        self.resize(900, 600)
 
+    @staticmethod
+    def supports(file_path, megabytes=LAZY_VIEW_MEGABYTES) -> bool:
+        """
+        True when the file is a text file larger than :param megabytes.
+        """
+        ext = os.path.splitext(file_path)[1].lower()
+        return (ext in LAZY_VIEW_EXTENSIONS and os.path.isfile(file_path)
+                and os.path.getsize(file_path) / 1000 / 1000 > megabytes)
@@ -26,12 +26,15 @@ import os
 import logging
 from functools import partial
 from zeex.core.compat import QtGui, QtCore
-from zeex.core.ctrls.dataframe import DataFrameModelManager, DataFrameModel
+from zeex.core.ctrls.dataframe import DataFrameModelManager, DataFrameModelLoader, DataFrameModel
 from zeex.core.models.filetree import FileTreeModel
 from zeex.core.ui.project.main_ui import Ui_ProjectWindow
 from zeex.core.utility.collection import SettingsINI
+from zeex.core.utility.parse_cache import PARSE_CACHE_DIRNAME
 import zeex.core.utility.ostools as ostools
+from zeex.core.utility.widgets import get_ok_msg_box
 from zeex.core.views.settings import SettingsDialog
+from zeex.core.views.file import LazyFileTableWindow
 from zeex.core.views.actions.export import DataFrameModelExportDialog
 from zeex.core.views.actions.merge_purge import MergePurgeDialog
 from zeex.core.views.basic.directory import DropBoxViewDialog
@@ -71,6 +74,7 @@ class ProjectMainWindow(QtGui.QMainWindow, Ui_ProjectWindow):
         self.dialog_new_folder = DirectoryPathCreateDialog(self.treeView,
                                                            parent=self)
         self.dialog_cloud = None
+        self.df_loader = DataFrameModelLoader(self.df_manager, parent=self)
         self.key_delete = QtGui.QShortcut(self)
         self.key_enter = QtGui.QShortcut(self)
         self.key_zip = QtGui.QShortcut(self)
@@ -83,6 +87,8 @@ class ProjectMainWindow(QtGui.QMainWindow, Ui_ProjectWindow):
         self.connect_import_dialog()
         self.connect_export_dialog()
         self.connect_cloud_dialog()
+        self.connect_memory_budget()
+        self.connect_loader()
         self.current_model = None
 
     @property
@@ -115,6 +121,34 @@ class ProjectMainWindow(QtGui.QMainWindow, Ui_ProjectWindow):
         """
         self.connect_export_dialog()
         self.connect_import_dialog()
+        self.connect_memory_budget()
+
+    def connect_memory_budget(self):
+        """
+        Applies the GENERAL/MEMORY_BUDGET_MB setting to the DataFrameModelManager.
+        :return: None
+        """
+        budget = self.dialog_settings.settings_ini.get_safe('GENERAL', 'MEMORY_BUDGET_MB', fallback=None)
+        self.df_manager.set_memory_budget(budget)
+
+    def connect_loader(self):
+        """
+        Opens LazyFileTableWindows once their files are indexed in the background.
+        :return: None
+        """
+        self.df_loader.signalIndexLoaded.connect(self.open_lazy_window)
+        self.df_loader.signalFileFailed.connect(self._load_failed)
+
+    @QtCore.Slot(str)
+    def open_lazy_window(self, file_path):
+        self.statusbar.clearMessage()
+        self.df_manager.get_lazy_window(file_path).show()
+
+    @QtCore.Slot(str, str)
+    def _load_failed(self, file_path, error):
+        self.statusbar.clearMessage()
+        box = get_ok_msg_box(self, "Failed to open {}: {}".format(file_path, error), title="Error")
+        box.show()
 
     def connect_window_title(self):
         """
@@ -187,6 +221,8 @@ class ProjectMainWindow(QtGui.QMainWindow, Ui_ProjectWindow):
         self.treeView.setRootIndex(model.index(rootdir))
         self.treeView.setColumnWidth(0, 400)
         self.treeView.setSelectionMode(self.treeView.ExtendedSelection)
+        if rootdir:
+            self.df_manager.set_cache_directory(os.path.join(rootdir, PARSE_CACHE_DIRNAME))
 
     def connect_settings_dialog(self):
         """
@@ -256,6 +292,13 @@ class ProjectMainWindow(QtGui.QMainWindow, Ui_ProjectWindow):
         :return: None
         """
         if model is None:
+            # Files too large to load are browsed read-only.
+            file_path = self.get_tree_selected_path()
+            if file_path is not None and LazyFileTableWindow.supports(file_path):
+                # Indexing reads the whole file - open_lazy_window shows it when it's done.
+                self.statusbar.showMessage("Indexing {}...".format(file_path))
+                return self.df_loader.load_index(file_path)
+
             # Maybe it's selected on the tree?
             model = self.get_tree_selected_model()
             if model is None:
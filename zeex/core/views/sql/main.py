@@ -27,7 +27,8 @@ import os
 from zeex.core.ui.sql.main_ui import Ui_DatabasesMainWindow
 from zeex.core.compat import QtGui
 from zeex.core.models.fieldnames import connection_info as fieldnames_connection_info
-from zeex.core.ctrls.sql import AlchemyConnectionManager, AlchemyConnection
+from zeex.core.ctrls.sql import (AlchemyConnectionManager, AlchemyConnection,
+                                 SchemaRevalidator, DEFAULT_SCHEMA_CACHE_DIR)
 from zeex.core.utility.widgets import get_ok_msg_box
 from zeex.core.ctrls.dataframe import DataFrameModelManager
 from zeex.core.views.sql.add_connection import AlchemyConnectionDialog
@@ -59,6 +60,7 @@ class DatabasesMainWindow(QtGui.QMainWindow, Ui_DatabasesMainWindow):
         self.df_manager = df_manager
         self._dialog_add_con = None
         self._dialog_import = None
+        self._schema_revalidator = None
         self._key_enter = QtGui.QShortcut(self)
         self._key_ctrl_t = QtGui.QShortcut(self)
         self.configure()
@@ -87,6 +89,13 @@ class DatabasesMainWindow(QtGui.QMainWindow, Ui_DatabasesMainWindow):
                                                            parent=self)
         return self._dialog_import
 
+    @property
+    def schema_revalidator(self) -> SchemaRevalidator:
+        if self._schema_revalidator is None:
+            self._schema_revalidator = SchemaRevalidator(self.con_manager, parent=self)
+            self._schema_revalidator.signalSchemaChanged.connect(self.sync_connection_item)
+        return self._schema_revalidator
+
     @property
     def connection(self) -> AlchemyConnection:
         return self.con_manager.connection(self.comboBoxCurrentDatabase.currentText())
@@ -112,6 +121,8 @@ class DatabasesMainWindow(QtGui.QMainWindow, Ui_DatabasesMainWindow):
         others = self.con_manager.add_connections_from_settings()
         if new or others:
             self.treeView.setModel(self.con_manager.get_standard_item_model())
+        # Cached schemas are shown right away - check them against the databases in the background.
+        self.schema_revalidator.revalidate()
 
     def configure(self):
         """
@@ -124,7 +135,7 @@ class DatabasesMainWindow(QtGui.QMainWindow, Ui_DatabasesMainWindow):
         """
         self.setupUi(self)
         if self.con_manager is None:
-            self.con_manager = AlchemyConnectionManager()
+            self.con_manager = AlchemyConnectionManager(cache_dir=DEFAULT_SCHEMA_CACHE_DIR)
         if self.df_manager is None:
             self.df_manager = DataFrameModelManager()
         self._key_enter.setKey('return')
@@ -151,13 +162,48 @@ class DatabasesMainWindow(QtGui.QMainWindow, Ui_DatabasesMainWindow):
     def refresh_schemas(self):
         """
         Refreshes the database schemas for each connection.
-        Then resets the treeView with the new info.
+        Then resets the treeView with the new info and
+        updates the schema cache in the background.
         :return: (None)
         """
         for c in self.con_manager.connections.keys():
             con = self.con_manager.connection(c)
             con.refresh_schemas()
         self.treeView.setModel(self.con_manager.get_standard_item_model())
+        self.schema_revalidator.revalidate()
+
+    def sync_connection_item(self, name):
+        """
+        Replaces a connection's treeView item after its schema changes.
+        Tables the user expanded stay expanded (with their new columns),
+        the others keep a placeholder until they're expanded.
+        :param name: (str)
+            The name of the connection that changed.
+        :return: (None)
+        """
+        model = self.tree_model
+        con = self.con_manager.connection(name)
+        match = [i for i in model.findItems(name) if i.parent() is None]
+        if not match:
+            model.appendRow(con.get_standard_item())
+            return
+
+        old_item = match[0]
+        con_expanded = self.treeView.isExpanded(old_item.index())
+        expanded = [old_item.child(r).text() for r in range(old_item.rowCount())
+                    if self.treeView.isExpanded(old_item.child(r).index())]
+        item = con.get_standard_item(populate=expanded)
+        model.setItem(old_item.row(), item)
+
+        # Don't let restoring the expansion change the current database.
+        self.treeView.blockSignals(True)
+        try:
+            self.treeView.setExpanded(item.index(), con_expanded)
+            for r in range(item.rowCount()):
+                if item.child(r).text() in expanded:
+                    self.treeView.setExpanded(item.child(r).index(), True)
+        finally:
+            self.treeView.blockSignals(False)
 
     def delete(self, idx=None):
         """
@@ -185,8 +231,9 @@ class DatabasesMainWindow(QtGui.QMainWindow, Ui_DatabasesMainWindow):
                 table_name = item.text()
                 db_name = db_item.text()
                 con = self.con_manager.connection(db_name)
-                table = con.meta.tables[table_name]
+                table = con.get_table(table_name)
                 table.drop(checkfirst=True)
+                con.refresh_schemas(table_name=table_name)
                 db_item.removeRow(item.row())
             elif not item.hasChildren():
                 # It's a column
@@ -197,6 +244,7 @@ class DatabasesMainWindow(QtGui.QMainWindow, Ui_DatabasesMainWindow):
                 try:
                     sql = "ALTER TABLE '{}' DROP COLUMN '{}'".format(table_name, item.text())
                     con.engine.execute(sql)
+                    con.refresh_schemas(table_name=table_name)
                     table_item.removeRow(item.row())
                 except Exception:
                     raise NotImplementedError("Unable to drop columns for SQL version: {}".format(
@@ -307,8 +355,9 @@ class DatabasesMainWindow(QtGui.QMainWindow, Ui_DatabasesMainWindow):
             # It's a database
             self.set_current_database(item.text())
         elif not item.parent().parent():
-            # It's a table
+            # It's a table - load its columns the first time it's expanded.
             self.set_current_database(item.parent().text())
+            self.con_manager.connection(item.parent().text()).populate_table_item(item)
         elif not item.hasChildren():
             # It's a column
             self.set_current_database(item.parent().parent().text())
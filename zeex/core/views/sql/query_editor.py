@@ -27,6 +27,7 @@ from zeex.core.compat import QtGui, QtCore
 from zeex.core.ui.sql.query_editor_ui import Ui_QueryEditorWindow
 from zeex.core.views.basic.criteria import CriteriaDialog, CriteriaTableModel
 from zeex.core.models.sql import AlchemyTableModel
+from zeex.core.utility.widgets import get_ok_msg_box
 
 
 class AlchemyQueryEditorWindow(QtGui.QMainWindow,Ui_QueryEditorWindow):
@@ -43,8 +44,31 @@ class AlchemyQueryEditorWindow(QtGui.QMainWindow,Ui_QueryEditorWindow):
         self.actionUndo.triggered.connect(self._query_model.rollback)
         self.actionRefresh.triggered.connect(self._query_model.refresh)
         self.tableView.setModel(self._query_model)
+        # Sorting & criteria are applied by the database.
+        # Clear the header's default indicator first so enabling sorting
+        # doesn't sort (and re-query) the table before the user asks.
+        self.tableView.horizontalHeader().setSortIndicator(-1, QtCore.Qt.AscendingOrder)
+        self.tableView.setSortingEnabled(True)
         self.actionCriteria.triggered.connect(self._dialog_criteria.show)
         self.dialog_criteria.set_fields(self._query_model.fields)
+        self.dialog_criteria.signalCriteriaApplied.connect(self.apply_criteria)
+
+    @QtCore.Slot(list)
+    def apply_criteria(self, criteria: list):
+        """
+        Filters the query model with CriteriaDialog criteria.
+        Criteria with an unknown field or condition aren't applied
+        - the user is told why instead.
+        :param criteria: (list)
+            See CriteriaDialog.criteria_values.
+        :return: None
+        """
+        try:
+            self._query_model.set_criteria(criteria)
+        except KeyError as e:
+            self._criteria_error_box = get_ok_msg_box(self._dialog_criteria, str(e.args[0]),
+                                                      title="Criteria - Not Applied")
+            self._criteria_error_box.show()
 
     @property
     def query_model(self) -> AlchemyTableModel:
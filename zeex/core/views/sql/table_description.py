@@ -51,7 +51,7 @@ class AlchemyTableDescriptionDialog(QtGui.QDialog, Ui_AlchemyTableDescriptionDia
         self.btnDeleteColumn.hide()
 
     def set_table(self, table_name):
-        Table = self.con.meta.tables[table_name]
+        Table = self.con.get_table(table_name)
         data = [[c.name, c.type] for c in Table.columns]
         data = [[widgets.create_standard_item(str(c), editable=True) for c in x] for x in data]
         model = QtGui.QStandardItemModel()
@@ -82,7 +82,7 @@ class AlchemyTableDescriptionDialog(QtGui.QDialog, Ui_AlchemyTableDescriptionDia
         self._col_model.insertRow(self._col_model.rowCount(), data)
 
     def save(self):
-        Table = self.con.meta.tables[self.labelTableNameValue.text()]
+        Table = self.con.get_table(self.labelTableNameValue.text())
         add_sql = "ALTER TABLE {} ADD COLUMN {} {}"
         added = []
         for i in range(self._col_model.rowCount()):
@@ -97,7 +97,7 @@ class AlchemyTableDescriptionDialog(QtGui.QDialog, Ui_AlchemyTableDescriptionDia
                 finally:
                     added.append(col)
         if added:
-            self.con.refresh_schemas()
+            self.con.refresh_schemas(table_name=Table.name)
             self.set_table(Table.name)
 
 
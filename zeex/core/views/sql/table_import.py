@@ -110,7 +110,7 @@ class AlchemyTableImportDialog(QtGui.QDialog, Ui_AlchemyTableImportDialog):
         if_exists = self.comboBoxExistingTableOption.currentText()
 
         try:
-            Table = self.con.meta.tables[table_name]
+            Table = self.con.get_table(table_name)
         except (KeyError, AttributeError):
             Table = None
 
@@ -148,6 +148,7 @@ class AlchemyTableImportDialog(QtGui.QDialog, Ui_AlchemyTableImportDialog):
 
         if not df.empty:
             df.to_sql(table_name, self.con.engine, if_exists=if_exists, index_label=key_name, index=index)
+            self.con.refresh_schemas(table_name=table_name)
 
     def edit_source_model(self):
         source_path = self.lineEditSourcePath.text()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+MIT License
+
+Copyright (c) 2016 Zeke Barge
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Runs a merge/purge job from the settings MergePurgeDialog exports
+without starting the GUI (PySide is never imported).
+
+    python -m zeex.merge_purge config.ini
+"""
+import os
+import sys
+import logging
+import multiprocessing
+import argparse
+from zeex.core.utility.collection import SettingsINI
+from zeex.core.utility.merge_purge import MergePurgeEngine, MERGE_PURGE_CHUNKSIZE
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(prog='python -m zeex.merge_purge',
+                                     description='Runs a merge/purge job from a config file.')
+    parser.add_argument('config', help='The .ini file with the merge/purge settings.')
+    parser.add_argument('--section', default='MERGE_PURGE',
+                        help='The config section to read (default MERGE_PURGE).')
+    parser.add_argument('--dest', default=None,
+                        help='Overrides the dest_path in the config.')
+    parser.add_argument('--chunksize', type=int, default=MERGE_PURGE_CHUNKSIZE,
+                        help='Rows to process at a time (default {}).'.format(MERGE_PURGE_CHUNKSIZE))
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Threads used to read files (default CPU count).')
+    parser.add_argument('--quiet', action='store_true',
+                        help="Only log warnings and don't print the report.")
+    return parser
+
+
+def main(argv=None):
+    """
+    Runs the merge/purge job.
+    :param argv: (list, default None)
+        Command line arguments - None uses sys.argv.
+    :return: (int)
+        The exit code.
+    """
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO,
+                        format='%(asctime)s %(levelname)s %(message)s')
+
+    if not os.path.isfile(args.config):
+        parser.error("Config file not found: {}".format(args.config))
+    config = SettingsINI(filename=args.config)
+    if not config.has_section(args.section):
+        parser.error("Config file has no [{}] section: {}".format(args.section, args.config))
+
+    kwargs = dict(chunksize=args.chunksize, workers=args.workers,
+                  callback=lambda stage, rows: logging.debug("{}: {} rows".format(stage, rows)))
+    if args.dest is not None:
+        kwargs['dest_path'] = args.dest
+    engine = MergePurgeEngine.from_config(config, section=args.section, **kwargs)
+    report_path = engine.execute()
+
+    logging.info("Report: {}".format(report_path))
+    if not args.quiet:
+        print(engine.report())
+    return 0
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
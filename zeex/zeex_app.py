@@ -27,12 +27,15 @@ SOFTWARE.
 
 
 import sys
+import multiprocessing
 from zeex.core.main import ZeexApp
 
 __version__ = '1.2.0'
 
 
 if __name__ == '__main__':
+    # Worker processes of a frozen app re-run this module.
+    multiprocessing.freeze_support()
 
     #The main application
     app = ZeexApp(sys.argv)